@@ -0,0 +1,229 @@
+"""
+班级/群体学习分析引擎
+
+按列投影分块读取学习记录，每块先用 pandas 聚合为 (用户, 题目) 级别的部分统计，
+再合并计算知识点正确率分布、最慢题目和学习困难学生，全程不创建 ORM 对象，
+内存占用只与 (用户, 题目) 组合数有关，与记录条数无关。
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Integer, select, type_coerce
+
+from models import db, Question, KnowledgePoint, User, union_learning_records
+
+class CohortAnalyticsEngine:
+    """群体学习分析引擎"""
+
+    def __init__(self, chunk_size: int = 50000, cache_ttl: int = 300, max_cache_entries: int = 128):
+        self.chunk_size = chunk_size
+        self.cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def analyze(self, user_ids: Optional[List[int]] = None, start: datetime = None, end: datetime = None,
+                top: int = 10, struggling_threshold: float = 0.6, min_attempts: int = 5) -> Dict:
+        """分析一个群体（user_ids 为空表示全部用户），结果按群体和参数缓存"""
+        cache_key = (tuple(sorted(set(user_ids))) if user_ids else None, start, end,
+                     top, struggling_threshold, min_attempts)
+
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+
+        result = self._analyze(user_ids, start, end, top, struggling_threshold, min_attempts)
+
+        with self._lock:
+            if len(self._cache) >= self.max_cache_entries:
+                # 淘汰最早过期的条目
+                oldest_key = min(self._cache, key=lambda key: self._cache[key][0])
+                del self._cache[oldest_key]
+            self._cache[cache_key] = (time.monotonic() + self.cache_ttl, result)
+
+        return result
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _analyze(self, user_ids, start, end, top, struggling_threshold, min_attempts) -> Dict:
+        pairs = self._load_user_question_aggregates(user_ids, start, end)
+
+        if pairs.empty:
+            return {
+                'summary': {'students': 0, 'records': 0, 'accuracy_rate': 0.0},
+                'knowledge_points': [],
+                'slowest_questions': [],
+                'struggling_students': []
+            }
+
+        questions = self._load_question_metadata(pairs['question_id'].unique())
+        pairs = pairs.merge(questions[['question_id', 'knowledge_point_id']], on='question_id', how='left')
+
+        total_attempts = int(pairs['attempts'].sum())
+        return {
+            'summary': {
+                'students': int(pairs['user_id'].nunique()),
+                'records': total_attempts,
+                'accuracy_rate': float(pairs['correct'].sum() / total_attempts)
+            },
+            'knowledge_points': self._knowledge_point_distribution(pairs),
+            'slowest_questions': self._slowest_questions(pairs, questions, top, min_attempts),
+            'struggling_students': self._struggling_students(pairs, top, struggling_threshold, min_attempts)
+        }
+
+    def _load_user_question_aggregates(self, user_ids, start, end) -> pd.DataFrame:
+        """分块读取投影后的记录列，逐块聚合为 (用户, 题目) 的次数、正确数和总耗时"""
+        def build(records):
+            # 统一按整数读取，避免逐行的布尔类型转换
+            stmt = select(
+                records.user_id,
+                records.question_id,
+                type_coerce(records.is_correct, Integer),
+                records.time_spent
+            )
+            if user_ids:
+                stmt = stmt.where(records.user_id.in_(user_ids))
+            if start:
+                stmt = stmt.where(records.completed_at >= start)
+            if end:
+                stmt = stmt.where(records.completed_at <= end)
+            return stmt
+
+        # 热表与归档表的记录一并读取
+        stmt = union_learning_records(build)
+
+        columns = ['user_id', 'question_id', 'is_correct', 'time_spent']
+        partials = []
+        # 走 Core 连接而非 ORM 会话执行，省去 ORM 结果处理的开销
+        result = db.session.connection().execution_options(yield_per=self.chunk_size).execute(stmt)
+        for partition in result.partitions():
+            values = np.fromiter((value for row in partition for value in row),
+                                 dtype=np.int64, count=len(partition) * len(columns))
+            chunk = pd.DataFrame(values.reshape(-1, len(columns)), columns=columns)
+            partials.append(
+                chunk.groupby(['user_id', 'question_id'], sort=False)
+                     .agg(attempts=('is_correct', 'size'),
+                          correct=('is_correct', 'sum'),
+                          time_spent=('time_spent', 'sum'))
+            )
+
+        if not partials:
+            return pd.DataFrame(columns=['user_id', 'question_id', 'attempts', 'correct', 'time_spent'])
+
+        # 合并各块的部分统计
+        combined = pd.concat(partials)
+        if len(partials) > 1:
+            combined = combined.groupby(level=[0, 1], sort=False).sum()
+        return combined.reset_index()
+
+    def _load_question_metadata(self, question_ids) -> pd.DataFrame:
+        rows = db.session.execute(
+            select(Question.id, Question.title, Question.difficulty, Question.question_type,
+                   Question.knowledge_point_id)
+            .where(Question.id.in_([int(qid) for qid in question_ids]))
+        ).all()
+        return pd.DataFrame.from_records(
+            rows, columns=['question_id', 'title', 'difficulty', 'question_type', 'knowledge_point_id']
+        )
+
+    def _knowledge_point_distribution(self, pairs: pd.DataFrame) -> List[Dict]:
+        """各知识点的整体正确率及学生个人正确率的分布"""
+        per_student = pairs.groupby(['knowledge_point_id', 'user_id'], sort=False)[['attempts', 'correct', 'time_spent']].sum()
+        per_student['accuracy'] = per_student['correct'] / per_student['attempts']
+
+        names = dict(db.session.execute(
+            select(KnowledgePoint.id, KnowledgePoint.name)
+            .where(KnowledgePoint.id.in_([int(kp) for kp in per_student.index.get_level_values(0).unique()]))
+        ).all())
+
+        bins = np.linspace(0.0, 1.0, 11)
+        distribution = []
+        for kp_id, group in per_student.groupby(level=0):
+            accuracy = group['accuracy'].to_numpy()
+            attempts = int(group['attempts'].sum())
+            histogram, _ = np.histogram(accuracy, bins=bins)
+            q25, median, q75 = np.percentile(accuracy, [25, 50, 75])
+            distribution.append({
+                'knowledge_point_id': int(kp_id),
+                'knowledge_point_name': names.get(int(kp_id)),
+                'students': int(len(group)),
+                'attempts': attempts,
+                'accuracy_rate': float(group['correct'].sum() / attempts),
+                'average_time': float(group['time_spent'].sum() / attempts),
+                'student_accuracy': {
+                    'mean': float(accuracy.mean()),
+                    'std': float(accuracy.std()),
+                    'p25': float(q25),
+                    'median': float(median),
+                    'p75': float(q75),
+                    'histogram': histogram.tolist()  # 10个区间: [0,0.1), [0.1,0.2) ... [0.9,1.0]
+                }
+            })
+
+        distribution.sort(key=lambda item: item['accuracy_rate'])
+        return distribution
+
+    def _slowest_questions(self, pairs: pd.DataFrame, questions: pd.DataFrame,
+                           top: int, min_attempts: int) -> List[Dict]:
+        """平均耗时最长的题目"""
+        per_question = pairs.groupby('question_id', sort=False)[['attempts', 'correct', 'time_spent']].sum()
+        per_question = per_question[per_question['attempts'] >= min_attempts]
+        per_question['average_time'] = per_question['time_spent'] / per_question['attempts']
+        per_question['accuracy_rate'] = per_question['correct'] / per_question['attempts']
+
+        slowest = per_question.nlargest(top, 'average_time').reset_index()
+        slowest = slowest.merge(questions, on='question_id', how='left')
+
+        return [{
+            'question_id': int(row.question_id),
+            'title': row.title,
+            'difficulty': row.difficulty,
+            'question_type': row.question_type,
+            'knowledge_point_id': int(row.knowledge_point_id),
+            'attempts': int(row.attempts),
+            'average_time': float(row.average_time),
+            'accuracy_rate': float(row.accuracy_rate)
+        } for row in slowest.itertuples(index=False)]
+
+    def _struggling_students(self, pairs: pd.DataFrame, top: int,
+                             threshold: float, min_attempts: int) -> List[Dict]:
+        """整体正确率低于阈值的学生，附带其最薄弱的知识点"""
+        per_user = pairs.groupby('user_id', sort=False)[['attempts', 'correct', 'time_spent']].sum()
+        per_user = per_user[per_user['attempts'] >= min_attempts]
+        per_user['accuracy_rate'] = per_user['correct'] / per_user['attempts']
+        struggling = per_user[per_user['accuracy_rate'] < threshold].nsmallest(top, 'accuracy_rate')
+
+        if struggling.empty:
+            return []
+
+        per_user_kp = pairs[pairs['user_id'].isin(struggling.index)]\
+            .groupby(['user_id', 'knowledge_point_id'], sort=False)[['attempts', 'correct']].sum()
+        per_user_kp['accuracy_rate'] = per_user_kp['correct'] / per_user_kp['attempts']
+
+        usernames = dict(db.session.execute(
+            select(User.id, User.username).where(User.id.in_([int(uid) for uid in struggling.index]))
+        ).all())
+
+        students = []
+        for user_id, row in struggling.iterrows():
+            weakest = per_user_kp.loc[user_id].nsmallest(3, 'accuracy_rate')
+            students.append({
+                'user_id': int(user_id),
+                'username': usernames.get(int(user_id)),
+                'attempts': int(row['attempts']),
+                'accuracy_rate': float(row['accuracy_rate']),
+                'average_time': float(row['time_spent'] / row['attempts']),
+                'weakest_knowledge_points': [{
+                    'knowledge_point_id': int(kp_id),
+                    'attempts': int(kp_row['attempts']),
+                    'accuracy_rate': float(kp_row['accuracy_rate'])
+                } for kp_id, kp_row in weakest.iterrows()]
+            })
+        return students
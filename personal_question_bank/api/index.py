@@ -8,13 +8,13 @@ import os
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
-# 导入Flask应用
-from app import app
-
-# 确保在Vercel环境中初始化
+# Vercel环境使用生产配置（需在导入应用、加载配置之前设置）
 if os.environ.get('VERCEL'):
     os.environ['FLASK_ENV'] = 'production'
 
+# 导入Flask应用
+from app import app
+
 # 导出app供Vercel使用
 application = app
 app = app  # Vercel可能需要这个名称
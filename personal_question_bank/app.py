@@ -1,49 +1,115 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, abort, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime, timedelta
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.orm import joinedload
+from datetime import date, datetime, timedelta
+import base64
+import binascii
+import io
 import json
 import os
+import time
 from dotenv import load_dotenv
 
-from models import db, User, Question, LearningRecord, KnowledgePoint, UserKnowledgeStats
+# 加载环境变量（需在导入读取环境变量的模块之前）
+load_dotenv()
+
+from config import get_config
+from database import init_database, use_read_replica
+import metrics
+from catalog import CatalogCache
+from models import (db, User, Question, LearningRecord, KnowledgePoint, UserKnowledgeStats, AnswerEvent,
+                    DailyUserActivity, migrate_schema, union_learning_records)
 from recommendation_engine import RecommendationEngine
+from analytics import CohortAnalyticsEngine
+from serializers import (FastJSONProvider, parse_question_fields, question_load_options, serialize_question,
+                         serialize_questions, serialize_records)
+from streaming import STREAM_BATCH_SIZE, iter_json_array, json_stream_response
+from search import ensure_search_index, search_questions
+from question_import import DEFAULT_THRESHOLD, IMPORT_FORMATS, import_questions
+from exports import build_export_queries, iter_record_batches, encode_csv, encode_ndjson, gzip_stream
 from external_platforms import platform_manager
+from event_log import (AnswerEventProcessor, KnowledgeStatsConsumer, DailyActivityConsumer,
+                       build_answer_event, backfill_daily_activity)
 from data_generator import generate_sample_data
 
-# 加载环境变量
-load_dotenv()
-
 app = Flask(__name__)
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-here')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///question_bank.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# 安装了 orjson 时使用其编码 JSON 响应
+app.json = FastJSONProvider(app)
+# 按 FLASK_ENV 加载配置（数据库连接、连接池、SQLite 参数、只读副本）
+app.config.from_object(get_config())
+# 答题事件默认由后台线程处理；Serverless 环境没有常驻线程，改为在请求内同步处理
+app.config['ANSWER_EVENTS_ASYNC'] = os.getenv(
+    'ANSWER_EVENTS_ASYNC', 'false' if os.environ.get('VERCEL') else 'true'
+).lower() == 'true'
 
 # 初始化扩展
-db.init_app(app)
+init_database(app, db)
 CORS(app)
+metrics.init_app(app)
+
+# 初始化题目目录缓存（题目、知识点按ID查找）
+catalog_cache = CatalogCache()
+catalog_cache.init_app(app)
 
 # 初始化推荐引擎
-recommendation_engine = RecommendationEngine()
+recommendation_engine = RecommendationEngine(catalog=catalog_cache)
+
+# 初始化群体分析引擎
+cohort_analytics = CohortAnalyticsEngine()
+
+# 初始化答题事件处理器
+event_processor = AnswerEventProcessor([
+    KnowledgeStatsConsumer(),
+    DailyActivityConsumer()
+])
+event_processor.init_app(app)
+
+def dispatch_answer_events():
+    """提交后触发答题事件处理：后台模式唤醒处理线程，同步模式在请求内处理"""
+    if app.config['ANSWER_EVENTS_ASYNC']:
+        event_processor.ensure_started()
+    else:
+        event_processor.process_pending()
+
+def clear_process_caches():
+    """清空本进程的读缓存（题目目录、题目总数、群体分析），用于测量冷启动时的查询数"""
+    catalog_cache.invalidate()
+    _question_count_cache.clear()
+    cohort_analytics.clear_cache()
 
 def create_tables():
     """创建数据库表"""
     with app.app_context():
         db.create_all()
+        migrate_schema()
+        ensure_search_index()
         
         # 检查是否需要生成示例数据
         if User.query.count() == 0:
             print("生成示例数据...")
             generate_sample_data()
             print("示例数据生成完成！")
+        
+        backfill_daily_activity()
+        
+        # 处理重启前积压的答题事件
+        if app.config['ANSWER_EVENTS_ASYNC']:
+            event_processor.ensure_started()
 
 # ==================== 用户相关API ====================
 
+# 活动时间序列单次查询的最长日期范围
+MAX_ACTIVITY_RANGE_DAYS = 366 * 3
+
 @app.route('/api/users', methods=['GET'])
 def get_users():
-    """获取所有用户"""
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """获取所有用户（按ID分批读取并流式输出）"""
+    users = db.session.execute(
+        select(User).order_by(User.id).execution_options(yield_per=STREAM_BATCH_SIZE)
+    ).scalars()
+    return json_stream_response(iter_json_array(users.partitions(), User.to_dict))
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
@@ -52,19 +118,30 @@ def get_user(user_id):
     return jsonify(user.to_dict())
 
 @app.route('/api/users/<int:user_id>/stats', methods=['GET'])
+@use_read_replica
 def get_user_stats(user_id):
     """获取用户学习统计"""
     user = User.query.get_or_404(user_id)
     
-    # 基础统计
-    total_questions = LearningRecord.query.filter_by(user_id=user_id).count()
-    correct_answers = LearningRecord.query.filter_by(user_id=user_id, is_correct=True).count()
-    
-    # 知识点统计
-    knowledge_stats = UserKnowledgeStats.query.filter_by(user_id=user_id).all()
-    
-    # 最近学习记录
+    # 基础统计（热表和归档表各一条条件聚合）
+    total_questions = correct_answers = 0
+    for total, correct in db.session.execute(union_learning_records(
+        lambda records: select(func.count(records.id),
+                               func.coalesce(func.sum(case((records.is_correct, 1), else_=0)), 0))
+        .where(records.user_id == user_id)
+    )):
+        total_questions += total
+        correct_answers += correct
+    
+    # 知识点统计（同时加载知识点）
+    knowledge_stats = UserKnowledgeStats.query.filter_by(user_id=user_id)\
+                                              .options(joinedload(UserKnowledgeStats.knowledge_point))\
+                                              .all()
+    
+    # 最近学习记录（同时加载题目及其知识点）
     recent_records = LearningRecord.query.filter_by(user_id=user_id)\
+                                        .options(joinedload(LearningRecord.question)
+                                                 .joinedload(Question.knowledge_point))\
                                         .order_by(LearningRecord.completed_at.desc())\
                                         .limit(10).all()
     
@@ -74,23 +151,131 @@ def get_user_stats(user_id):
         'correct_answers': correct_answers,
         'accuracy_rate': correct_answers / total_questions if total_questions > 0 else 0,
         'knowledge_stats': [stat.to_dict() for stat in knowledge_stats],
-        'recent_records': [record.to_dict() for record in recent_records]
+        'recent_records': serialize_records(recent_records)
     }
     
     return jsonify(stats)
 
+@app.route('/api/users/<int:user_id>/activity', methods=['GET'])
+@use_read_replica
+def get_user_activity(user_id):
+    """获取用户学习活动时间序列（读取按天预聚合的汇总表）
+
+    参数: start/end (YYYY-MM-DD) 或 days（默认30天），granularity=day|week|month，
+    可选 knowledge_point_id。
+    """
+    User.query.get_or_404(user_id)
+    
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'week', 'month'):
+        return jsonify({'error': 'granularity 必须是 day、week 或 month'}), 400
+    
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow().date()
+        if request.args.get('start'):
+            start = date.fromisoformat(request.args['start'])
+        else:
+            start = end - timedelta(days=request.args.get('days', 30, type=int) - 1)
+    except ValueError:
+        return jsonify({'error': '日期格式应为 YYYY-MM-DD'}), 400
+    
+    if start > end or (end - start).days > MAX_ACTIVITY_RANGE_DAYS:
+        return jsonify({'error': f'日期范围无效（最长 {MAX_ACTIVITY_RANGE_DAYS} 天）'}), 400
+    
+    query = db.session.query(
+        DailyUserActivity.activity_date,
+        func.sum(DailyUserActivity.attempts),
+        func.sum(DailyUserActivity.correct_attempts),
+        func.sum(DailyUserActivity.time_spent)
+    ).filter(
+        DailyUserActivity.user_id == user_id,
+        DailyUserActivity.activity_date >= start,
+        DailyUserActivity.activity_date <= end
+    )
+    knowledge_point_id = request.args.get('knowledge_point_id', type=int)
+    if knowledge_point_id:
+        query = query.filter(DailyUserActivity.knowledge_point_id == knowledge_point_id)
+    daily = {row[0]: row[1:] for row in query.group_by(DailyUserActivity.activity_date)}
+    
+    # 按粒度分桶，没有活动的日期补零
+    buckets = {}
+    current = start
+    while current <= end:
+        if granularity == 'week':
+            bucket = current - timedelta(days=current.weekday())
+        elif granularity == 'month':
+            bucket = current.replace(day=1)
+        else:
+            bucket = current
+        totals = buckets.setdefault(bucket, [0, 0, 0])
+        for i, value in enumerate(daily.get(current, (0, 0, 0))):
+            totals[i] += value or 0
+        current += timedelta(days=1)
+    
+    return jsonify({
+        'user_id': user_id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'series': [{
+            'date': bucket.isoformat(),
+            'attempts': attempts,
+            'correct_attempts': correct,
+            'accuracy_rate': correct / attempts if attempts > 0 else 0,
+            'time_spent': time_spent
+        } for bucket, (attempts, correct, time_spent) in sorted(buckets.items())]
+    })
+
 # ==================== 题目相关API ====================
 
+# 题目总数缓存: 过滤条件 -> (过期时间, 总数)
+QUESTION_COUNT_CACHE_TTL = 60
+_question_count_cache = {}
+
+def encode_cursor(last_id: int) -> str:
+    """生成不透明的分页游标"""
+    return base64.urlsafe_b64encode(json.dumps({'id': last_id}).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> int:
+    """解析分页游标，格式错误时抛出 ValueError"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return int(payload['id'])
+    except (TypeError, KeyError, binascii.Error, json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise ValueError('无效的分页游标') from e
+
+def count_questions(query, cache_key) -> int:
+    """统计符合过滤条件的题目总数，结果短时间缓存"""
+    now = time.monotonic()
+    cached = _question_count_cache.get(cache_key)
+    if cached and cached[0] > now:
+        return cached[1]
+    total = query.order_by(None).count()
+    _question_count_cache[cache_key] = (now + QUESTION_COUNT_CACHE_TTL, total)
+    return total
+
 @app.route('/api/questions', methods=['GET'])
+@use_read_replica
 def get_questions():
-    """获取题目列表"""
+    """获取题目列表
+
+    传入 after 参数（首页传空字符串）时使用游标分页：按 (过滤列, id) 索引定位，
+    不执行 OFFSET 扫描，任意页耗时相同；总数仅在 include_total=1 时返回（带缓存）。
+    不传 after 时保持原有的 page/per_page 分页。
+    fields 参数（如 fields=id,title,difficulty 或 fields=summary）只查询和返回指定字段。
+    """
+    try:
+        fields = parse_question_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     question_type = request.args.get('type')
     difficulty = request.args.get('difficulty')
     knowledge_point_id = request.args.get('knowledge_point_id', type=int)
     
-    query = Question.query
+    query = Question.query.options(*question_load_options(fields))
     
     # 过滤条件
     if question_type:
@@ -100,136 +285,237 @@ def get_questions():
     if knowledge_point_id:
         query = query.filter(Question.knowledge_point_id == knowledge_point_id)
     
+    after = request.args.get('after')
+    if after is not None:
+        per_page = min(max(per_page, 1), 100)
+        try:
+            after_id = decode_cursor(after) if after else 0
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        questions = query.filter(Question.id > after_id)\
+                         .order_by(Question.id)\
+                         .limit(per_page + 1).all()
+        has_more = len(questions) > per_page
+        questions = questions[:per_page]
+        
+        response_data = {
+            'questions': serialize_questions(questions, fields),
+            'next_cursor': encode_cursor(questions[-1].id) if has_more else None,
+            'has_more': has_more
+        }
+        if request.args.get('include_total', '').lower() in ('1', 'true'):
+            response_data['total'] = count_questions(query, (question_type, difficulty, knowledge_point_id))
+        return jsonify(response_data)
+    
     questions = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return jsonify({
-        'questions': [q.to_dict() for q in questions.items],
+        'questions': serialize_questions(questions.items, fields),
         'total': questions.total,
         'pages': questions.pages,
         'current_page': page
     })
 
+# 检索结果单次返回的最大条数
+MAX_SEARCH_RESULTS = 100
+
+@app.route('/api/questions/search', methods=['GET'])
+@use_read_replica
+def search_question_list():
+    """全文检索题目（标题、内容、解析），按相关度排序并返回高亮片段
+
+    支持 type / difficulty / knowledge_point_id 过滤和 fields 参数。
+    """
+    query_text = (request.args.get('q') or '').strip()
+    if not query_text:
+        return jsonify({'error': '缺少检索词 q'}), 400
+    try:
+        fields = parse_question_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_SEARCH_RESULTS)
+    
+    hits = search_questions(
+        query_text,
+        limit=limit,
+        question_type=request.args.get('type'),
+        difficulty=request.args.get('difficulty'),
+        knowledge_point_id=request.args.get('knowledge_point_id', type=int)
+    )
+    
+    questions = {q.id: q for q in Question.query.options(*question_load_options(fields))
+                                                .filter(Question.id.in_([hit['id'] for hit in hits]))}
+    serialized = serialize_questions([questions[hit['id']] for hit in hits], fields)
+    results = [dict(data, score=hit['score'], snippet=hit['snippet']) for data, hit in zip(serialized, hits)]
+    
+    return jsonify({
+        'query': query_text,
+        'results': results,
+        'count': len(results)
+    })
+
+# 导入请求的 Content-Type 与格式对应关系
+IMPORT_CONTENT_TYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+    'application/json': 'json'
+}
+
+@app.route('/api/questions/import', methods=['POST'])
+def import_question_list():
+    """批量导入题目（请求体流式解析，按块批量插入，跳过与题库重复或近似重复的题目）
+
+    参数: format=ndjson|csv|json（缺省按 Content-Type 判断）、dry_run=1、threshold（相似度阈值）。
+    """
+    import_format = request.args.get('format') or IMPORT_CONTENT_TYPES.get(request.mimetype)
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'error': f"format 必须是 {', '.join(IMPORT_FORMATS)} 之一"}), 400
+    threshold = request.args.get('threshold', DEFAULT_THRESHOLD, type=float)
+    if not 0 < threshold <= 1:
+        return jsonify({'error': 'threshold 必须在 (0, 1] 之间'}), 400
+    
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    report = import_questions(
+        stream,
+        import_format,
+        threshold=threshold,
+        dry_run=request.args.get('dry_run', '').lower() in ('1', 'true')
+    )
+    if report['imported'] and not report['dry_run']:
+        _question_count_cache.clear()
+    return jsonify(report), 400 if report.get('error') else 200
+
 @app.route('/api/questions/<int:question_id>', methods=['GET'])
 def get_question(question_id):
     """获取题目详情"""
-    question = Question.query.get_or_404(question_id)
-    return jsonify(question.to_dict())
+    question = catalog_cache.get_question(question_id)
+    if question is None:
+        abort(404)
+    return jsonify(question)
+
+def build_recommendations(user_id: int, count: int, fields=None) -> dict:
+    """生成推荐响应数据"""
+    recommended_questions = recommendation_engine.recommend_questions(user_id, count)
+    
+    # 推荐引擎只加载打分所需的列，这里按请求的字段一次性补齐选中的题目
+    question_ids = [q.id for q in recommended_questions]
+    Question.query.options(*question_load_options(fields)).filter(Question.id.in_(question_ids)).all()
+    
+    return {
+        'user_id': user_id,
+        'recommendations': serialize_questions(recommended_questions, fields),
+        'count': len(recommended_questions)
+    }
 
 @app.route('/api/recommendations/<int:user_id>', methods=['GET'])
+@use_read_replica
 def get_recommendations(user_id):
-    """获取个性化推荐题目"""
-    user = User.query.get_or_404(user_id)
+    """获取个性化推荐题目（支持 fields 参数）"""
+    User.query.get_or_404(user_id)
     count = request.args.get('count', 10, type=int)
+    try:
+        fields = parse_question_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     try:
-        recommended_questions = recommendation_engine.recommend_questions(user_id, count)
-        return jsonify({
-            'user_id': user_id,
-            'recommendations': [q.to_dict() for q in recommended_questions],
-            'count': len(recommended_questions)
-        })
+        return jsonify(build_recommendations(user_id, count, fields))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ==================== 学习记录API ====================
 
-@app.route('/api/learning-records', methods=['POST'])
-def submit_answer():
-    """提交答案并记录学习过程"""
-    data = request.get_json()
-    
-    required_fields = ['user_id', 'question_id', 'user_answer', 'time_spent', 'interaction_type']
-    if not all(field in data for field in required_fields):
-        return jsonify({'error': '缺少必要字段'}), 400
-    
+# 批量提交单次允许的最大记录数
+MAX_BATCH_RECORDS = 500
+
+# 单次答题耗时上限（秒）
+MAX_TIME_SPENT = 24 * 3600
+
+def is_integer(value) -> bool:
+    """JSON 中的整数（bool 是 int 的子类，true/false 不算整数）"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def check_answer(question, user_answer):
+    """判断非编程题答案是否正确"""
+    return user_answer.strip().lower() == (question.correct_answer or '').strip().lower()
+
+# 提交答案的必填字段
+SUBMIT_REQUIRED_FIELDS = ['user_id', 'question_id', 'user_answer', 'time_spent', 'interaction_type']
+
+def validate_submission(data):
+    """校验提交答案的字段和类型，返回错误信息，通过时返回 None（单条、批量和异步提交接口共用）"""
+    if not isinstance(data, dict) or not all(field in data for field in SUBMIT_REQUIRED_FIELDS):
+        return '缺少必要字段'
+    if not is_integer(data['user_id']) or not is_integer(data['question_id']):
+        return 'user_id 和 question_id 必须是整数'
+    if not is_integer(data['time_spent']) or not 0 <= data['time_spent'] <= MAX_TIME_SPENT:
+        return f'time_spent 必须是 0 到 {MAX_TIME_SPENT} 之间的整数'
+    if not isinstance(data['user_answer'], str) or not isinstance(data['interaction_type'], str):
+        return 'user_answer 和 interaction_type 必须是字符串'
+    return None
+
+def coding_judge_args(question, user_answer):
+    """编程题的判题参数 (代码, 语言, 测试用例)，没有测试用例时只检查语法"""
+    test_cases = json.loads(question.test_cases) if question.test_cases else None
+    return user_answer, question.programming_language or 'python', test_cases
+
+def judged_correct(execution_result, test_cases) -> bool:
+    """有测试用例时要求全部通过，否则以代码能否成功运行为准"""
+    if test_cases:
+        return execution_result.test_cases_passed == execution_result.total_test_cases
+    return execution_result.success
+
+def record_answer(data, question, is_correct: bool, execution_result=None) -> dict:
+    """写入学习记录和答题事件并返回响应数据（同步和异步提交接口共用）"""
     user_id = data['user_id']
-    question_id = data['question_id']
-    user_answer = data['user_answer']
     time_spent = data['time_spent']
-    interaction_type = data['interaction_type']
-    
-    # 获取题目和用户
-    question = Question.query.get_or_404(question_id)
-    user = User.query.get_or_404(user_id)
-    
-    # 判断答案正确性
-    is_correct = False
-    execution_result = None
-    
-    if question.question_type == 'coding':
-        # 编程题需要运行代码测试
-        if question.test_cases:
-            test_cases = json.loads(question.test_cases)
-            execution_result = platform_manager.execute_code(
-                user_answer, 
-                question.programming_language or 'python',
-                test_cases
-            )
-            is_correct = execution_result.test_cases_passed == execution_result.total_test_cases
-        else:
-            # 没有测试用例，只检查语法
-            execution_result = platform_manager.execute_code(
-                user_answer,
-                question.programming_language or 'python'
-            )
-            is_correct = execution_result.success
-    else:
-        # 其他类型题目直接比较答案
-        is_correct = user_answer.strip().lower() == question.correct_answer.strip().lower()
     
     # 创建学习记录
     learning_record = LearningRecord(
         user_id=user_id,
-        question_id=question_id,
+        question_id=question.id,
         is_correct=is_correct,
         time_spent=time_spent,
-        user_answer=user_answer,
-        interaction_type=interaction_type,
+        user_answer=data['user_answer'],
+        interaction_type=data['interaction_type'],
         started_at=datetime.utcnow() - timedelta(seconds=time_spent),
         completed_at=datetime.utcnow()
     )
     
     db.session.add(learning_record)
     
-    # 更新用户知识点统计
-    knowledge_point_id = question.knowledge_point_id
-    user_stats = UserKnowledgeStats.query.filter_by(
-        user_id=user_id, 
-        knowledge_point_id=knowledge_point_id
-    ).first()
-    
-    if not user_stats:
-        user_stats = UserKnowledgeStats(
-            user_id=user_id,
-            knowledge_point_id=knowledge_point_id
+    # 答题事件与学习记录在同一事务中写入，统计由事件消费者更新
+    db.session.add(build_answer_event(learning_record, question.knowledge_point_id))
+    if app.config['ANSWER_EVENTS_ASYNC']:
+        # 后台消费者稍后才更新统计：提交前（本次事件尚不可见）读取已有统计并计入本次答题
+        updated_stats = UserKnowledgeStats.projected_dict(
+            user_id, question.knowledge_point_id, is_correct, time_spent, learning_record.completed_at,
+            catalog_cache.get_knowledge_point(question.knowledge_point_id)
         )
-        db.session.add(user_stats)
-    
-    # 更新统计数据
-    user_stats.total_attempts += 1
-    if is_correct:
-        user_stats.correct_attempts += 1
-    
-    user_stats.total_time_spent += time_spent
-    user_stats.average_time = user_stats.total_time_spent / user_stats.total_attempts
-    user_stats.last_practice_time = datetime.utcnow()
-    
-    # 计算掌握程度 (简单算法: 正确率 * 0.7 + 练习频率 * 0.3)
-    accuracy = user_stats.correct_attempts / user_stats.total_attempts
-    practice_frequency = min(user_stats.total_attempts / 10.0, 1.0)  # 最多10次达到满分
-    user_stats.mastery_level = accuracy * 0.7 + practice_frequency * 0.3
-    
     db.session.commit()
     
+    dispatch_answer_events()
+    
     # 准备响应
     response_data = {
         'is_correct': is_correct,
         'correct_answer': question.correct_answer,
         'explanation': question.explanation,
-        'learning_record_id': learning_record.id,
-        'updated_stats': user_stats.to_dict()
+        'learning_record_id': learning_record.id
     }
     
+    if app.config['ANSWER_EVENTS_ASYNC']:
+        response_data['updated_stats'] = updated_stats
+        response_data['stats_pending'] = True
+    else:
+        user_stats = UserKnowledgeStats.query.filter_by(
+            user_id=user_id,
+            knowledge_point_id=question.knowledge_point_id
+        ).first()
+        response_data['updated_stats'] = user_stats.to_dict() if user_stats else None
+    
     # 如果是编程题，包含执行结果
     if execution_result:
         response_data['execution_result'] = {
@@ -241,10 +527,186 @@ def submit_answer():
             'total_test_cases': execution_result.total_test_cases
         }
     
-    return jsonify(response_data)
+    return response_data
+
+@app.route('/api/learning-records', methods=['POST'])
+def submit_answer():
+    """提交答案并记录学习过程"""
+    data = request.get_json()
+    
+    error = validate_submission(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    # 获取题目和用户
+    question = Question.query.get_or_404(data['question_id'])
+    User.query.get_or_404(data['user_id'])
+    
+    # 判断答案正确性
+    execution_result = None
+    
+    if question.question_type == 'coding':
+        # 编程题需要运行代码测试
+        code, language, test_cases = coding_judge_args(question, data['user_answer'])
+        execution_result = platform_manager.execute_code(code, language, test_cases)
+        
+        # 判题服务不可用时不记录本次答题，由客户端稍后重试
+        if execution_result.platform_error:
+            return jsonify({'error': execution_result.error}), 503
+        is_correct = judged_correct(execution_result, test_cases)
+    else:
+        # 其他类型题目直接比较答案
+        is_correct = check_answer(question, data['user_answer'])
+    
+    return jsonify(record_answer(data, question, is_correct, execution_result))
+
+def insert_learning_records(rows) -> list:
+    """批量插入学习记录，按 rows 的顺序返回新记录的ID
+
+    支持 RETURNING 的数据库按参数顺序返回主键（PostgreSQL 为分批的多行 INSERT，
+    SQLite 由 SQLAlchemy 逐行执行）；MySQL 不支持 RETURNING，逐行插入并读取各自的主键。
+    """
+    if db.session.get_bind().dialect.insert_returning:
+        return db.session.scalars(
+            insert(LearningRecord).returning(LearningRecord.id, sort_by_parameter_order=True), rows
+        ).all()
+    return [db.session.execute(insert(LearningRecord.__table__).values(**row)).inserted_primary_key[0]
+            for row in rows]
+
+@app.route('/api/learning-records/batch', methods=['POST'])
+def submit_answers_batch():
+    """批量提交答案（考场离线模式同步）
+
+    一次性校验并判分所有非编程题，批量插入学习记录和答题事件并统一提交一次，
+    知识点统计由事件消费者按用户聚合后用一条语句累加。
+    """
+    data = request.get_json()
+    records = data.get('records') if isinstance(data, dict) else None
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': '缺少必要字段: records'}), 400
+    if len(records) > MAX_BATCH_RECORDS:
+        return jsonify({'error': f'单次最多提交 {MAX_BATCH_RECORDS} 条记录'}), 400
+    
+    # 先逐条校验字段和类型，再一次性加载涉及的题目和用户
+    invalid = {}
+    for index, item in enumerate(records):
+        error = validate_submission(item)
+        if error:
+            invalid[index] = error
+    
+    valid_items = [item for index, item in enumerate(records) if index not in invalid]
+    question_ids = {item['question_id'] for item in valid_items}
+    user_ids = {item['user_id'] for item in valid_items}
+    questions = {q.id: q for q in Question.query.filter(Question.id.in_(question_ids))} if question_ids else {}
+    existing_user_ids = {uid for (uid,) in db.session.query(User.id).filter(User.id.in_(user_ids))} \
+        if user_ids else set()
+    
+    now = datetime.utcnow()
+    results = []
+    rows = []
+    accepted = []
+    
+    for index, item in enumerate(records):
+        if index in invalid:
+            results.append({'index': index, 'error': invalid[index]})
+            continue
+        
+        question = questions.get(item['question_id'])
+        time_spent = item['time_spent']
+        if question is None:
+            results.append({'index': index, 'error': '题目不存在'})
+            continue
+        if item['user_id'] not in existing_user_ids:
+            results.append({'index': index, 'error': '用户不存在'})
+            continue
+        if question.question_type == 'coding':
+            results.append({'index': index, 'error': '编程题需要单独提交以运行代码'})
+            continue
+        
+        completed_at = now
+        if item.get('completed_at'):
+            try:
+                completed_at = datetime.fromisoformat(item['completed_at'])
+            except (TypeError, ValueError):
+                results.append({'index': index, 'error': 'completed_at 格式错误'})
+                continue
+        try:
+            started_at = completed_at - timedelta(seconds=time_spent)
+        except OverflowError:
+            results.append({'index': index, 'error': 'completed_at 超出范围'})
+            continue
+        
+        is_correct = check_answer(question, item['user_answer'])
+        rows.append({
+            'user_id': item['user_id'],
+            'question_id': question.id,
+            'is_correct': is_correct,
+            'time_spent': time_spent,
+            'attempt_count': 1,
+            'user_answer': item['user_answer'],
+            'interaction_type': item['interaction_type'],
+            'started_at': started_at,
+            'completed_at': completed_at
+        })
+        
+        result = {
+            'index': index,
+            'is_correct': is_correct,
+            'correct_answer': question.correct_answer,
+            'explanation': question.explanation
+        }
+        results.append(result)
+        accepted.append(result)
+    
+    if rows:
+        record_ids = insert_learning_records(rows)
+        events = []
+        for result, row, record_id in zip(accepted, rows, record_ids):
+            result['learning_record_id'] = record_id
+            # created_at 由列默认值在插入时生成
+            events.append({
+                'learning_record_id': record_id,
+                'user_id': row['user_id'],
+                'question_id': row['question_id'],
+                'knowledge_point_id': questions[row['question_id']].knowledge_point_id,
+                'is_correct': row['is_correct'],
+                'time_spent': row['time_spent'],
+                'completed_at': row['completed_at']
+            })
+        db.session.execute(insert(AnswerEvent), events)
+        
+        db.session.commit()
+        dispatch_answer_events()
+    
+    return jsonify({
+        'accepted': len(accepted),
+        'rejected': len(results) - len(accepted),
+        'results': results
+    })
+
+@app.route('/api/learning-records/events/lag', methods=['GET'])
+def get_answer_event_lag():
+    """获取答题事件消费者的积压情况"""
+    return jsonify(event_processor.get_lag())
 
 # ==================== 编程题执行API ====================
 
+def code_run_response(result):
+    """代码运行结果的响应数据和状态码（判题服务不可用时为 503）"""
+    if result.platform_error:
+        return {'error': result.error}, 503
+    
+    return {
+        'success': result.success,
+        'output': result.output,
+        'error': result.error,
+        'execution_time': result.execution_time,
+        'memory_usage': result.memory_usage,
+        'test_cases_passed': result.test_cases_passed,
+        'total_test_cases': result.total_test_cases
+    }, 200
+
 @app.route('/api/code/run', methods=['POST'])
 def run_code():
     """运行代码（不保存记录）"""
@@ -253,28 +715,27 @@ def run_code():
     if not all(field in data for field in ['code', 'language']):
         return jsonify({'error': '缺少必要字段: code, language'}), 400
     
-    code = data['code']
-    language = data['language']
-    test_cases = data.get('test_cases', [])
-    
     try:
-        if test_cases:
-            result = platform_manager.execute_code(code, language, test_cases)
-        else:
-            result = platform_manager.execute_code(code, language)
-        
-        return jsonify({
-            'success': result.success,
-            'output': result.output,
-            'error': result.error,
-            'execution_time': result.execution_time,
-            'memory_usage': result.memory_usage,
-            'test_cases_passed': result.test_cases_passed,
-            'total_test_cases': result.total_test_cases
-        })
+        result = platform_manager.execute_code(data['code'], data['language'], data.get('test_cases') or None)
+        body, status = code_run_response(result)
+        return jsonify(body), status
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/code/judge-status', methods=['GET'])
+def get_judge_status():
+    """获取判题服务的限流和熔断状态"""
+    return jsonify(platform_manager.get_judge_stats())
+
+# ==================== 监控指标API ====================
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """当前进程的监控指标（Prometheus 文本格式）"""
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
 # ==================== 外部平台API ====================
 
 @app.route('/api/external/leetcode/problems', methods=['GET'])
@@ -300,19 +761,101 @@ def get_leetcode_problem(problem_slug):
 @app.route('/api/knowledge-points', methods=['GET'])
 def get_knowledge_points():
     """获取知识点列表"""
-    knowledge_points = KnowledgePoint.query.all()
-    return jsonify([kp.to_dict() for kp in knowledge_points])
+    return jsonify(catalog_cache.get_knowledge_points())
 
 @app.route('/api/knowledge-points/<int:kp_id>/questions', methods=['GET'])
+@use_read_replica
 def get_knowledge_point_questions(kp_id):
-    """获取知识点相关题目"""
-    knowledge_point = KnowledgePoint.query.get_or_404(kp_id)
-    questions = Question.query.filter_by(knowledge_point_id=kp_id).all()
+    """获取知识点相关题目（支持 fields 参数）"""
+    try:
+        fields = parse_question_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    knowledge_point = catalog_cache.get_knowledge_point(kp_id)
+    if knowledge_point is None:
+        abort(404)
+    # 查询在视图内执行（只读副本路由在视图返回后失效），结果按批流式输出
+    questions = db.session.execute(
+        select(Question).options(*question_load_options(fields))
+        .where(Question.knowledge_point_id == kp_id)
+        .order_by(Question.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    ).scalars()
+    knowledge_point_cache = {}
+    
+    return json_stream_response(iter_json_array(
+        questions.partitions(),
+        lambda question: serialize_question(question, knowledge_point_cache, fields),
+        prefix='{"knowledge_point":' + app.json.dumps(knowledge_point) + ',"questions":',
+        suffix='}'
+    ))
+
+# ==================== 分析API ====================
+
+@app.route('/api/analytics/cohort', methods=['GET'])
+@use_read_replica
+def get_cohort_analytics():
+    """群体学习分析（教师视图）
+
+    参数: user_ids（逗号分隔，缺省为全部用户）、start/end（ISO日期时间）、
+    top、threshold（学习困难的正确率阈值）、min_attempts。
+    """
+    try:
+        user_ids = [int(uid) for uid in request.args['user_ids'].split(',') if uid.strip()] \
+            if request.args.get('user_ids') else None
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': '参数格式错误'}), 400
+    
+    result = cohort_analytics.analyze(
+        user_ids=user_ids,
+        start=start,
+        end=end,
+        top=request.args.get('top', 10, type=int),
+        struggling_threshold=request.args.get('threshold', 0.6, type=float),
+        min_attempts=request.args.get('min_attempts', 5, type=int)
+    )
+    return jsonify(result)
+
+# ==================== 导出API ====================
+
+@app.route('/api/export/learning-records', methods=['GET'])
+@use_read_replica
+def export_learning_records():
+    """流式导出学习记录
+
+    参数: format=csv|ndjson（默认csv）、gzip=1、user_id（可重复或逗号分隔）、
+    start/end（ISO日期时间，按完成时间过滤）。
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return jsonify({'error': 'format 必须是 csv 或 ndjson'}), 400
     
-    return jsonify({
-        'knowledge_point': knowledge_point.to_dict(),
-        'questions': [q.to_dict() for q in questions]
-    })
+    try:
+        user_ids = [int(uid) for value in request.args.getlist('user_id')
+                    for uid in value.split(',') if uid.strip()]
+        start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': '参数格式错误'}), 400
+    
+    batches = iter_record_batches(build_export_queries(user_ids, start, end))
+    chunks = encode_csv(batches) if export_format == 'csv' else encode_ndjson(batches)
+    
+    filename = f"learning_records.{export_format}"
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    if request.args.get('gzip') in ('1', 'true'):
+        chunks = gzip_stream(chunks)
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
 
 # ==================== 前端页面 ====================
 
@@ -348,6 +891,8 @@ def init_for_deployment():
     try:
         with app.app_context():
             db.create_all()
+            migrate_schema()
+            ensure_search_index()
             
             # 生成示例数据（如果数据库为空）
             if User.query.count() == 0:
@@ -355,6 +900,8 @@ def init_for_deployment():
                 from data_generator import generate_sample_data
                 generate_sample_data()
                 print("示例数据生成完成！")
+            
+            backfill_daily_activity()
     except Exception as e:
         print(f"初始化数据库时出错: {e}")
 
@@ -366,6 +913,8 @@ if os.environ.get('VERCEL'):
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        migrate_schema()
+        ensure_search_index()
         
         # 生成示例数据（如果数据库为空）
         if User.query.count() == 0:
@@ -373,5 +922,10 @@ if __name__ == '__main__':
             from data_generator import generate_sample_data
             generate_sample_data()
             print("示例数据生成完成！")
+        
+        backfill_daily_activity()
+    
+    if app.config['ANSWER_EVENTS_ASYNC']:
+        event_processor.ensure_started()
     
     app.run(debug=True, host='0.0.0.0', port=5000)
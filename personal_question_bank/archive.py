@@ -0,0 +1,134 @@
+"""
+学习记录冷热分离归档
+
+把完成时间早于归档期限的学习记录从 learning_records 迁入 learning_records_archive，
+热表和索引只保留近期数据。推荐引擎只读取最近30天和最近50条记录，因此：
+
+- 归档期限不得短于 MIN_HORIZON_DAYS
+- 每个用户最近 keep_recent 条记录无论多旧都保留在热表
+
+UserKnowledgeStats 和 daily_user_activity 由答题事件增量维护，归档不修改它们；
+只归档答题事件已被所有消费者处理的记录（随后删除这些已消费的事件），
+统计贡献因此不会丢失或重复。群体分析、快照、每日活动重建和学习统计
+通过 models.union_learning_records 同时读取热表和归档表；导出分别按ID顺序读取两表后归并。
+
+    python archive.py --days 180
+    python archive.py --days 180 --dry-run
+"""
+import os
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, or_, select
+
+from models import db, AnswerEvent, ArchivedLearningRecord, EventConsumerOffset, LearningRecord
+from event_log import get_consumer_offset
+
+# 默认归档期限（天）
+DEFAULT_HORIZON_DAYS = int(os.getenv('LEARNING_RECORD_ARCHIVE_DAYS', 180))
+
+# 推荐引擎读取的最长时间窗口（_build_user_profile 的最近30天）
+MIN_HORIZON_DAYS = 30
+
+# 推荐引擎读取的最近记录条数（_analyze_learning_pattern 的最近50条）
+KEEP_RECENT_PER_USER = 50
+
+ARCHIVE_COLUMNS = ['id', 'user_id', 'question_id', 'is_correct', 'time_spent', 'attempt_count',
+                   'user_answer', 'interaction_type', 'started_at', 'completed_at']
+
+def find_archivable_record_ids(horizon_days: int = DEFAULT_HORIZON_DAYS,
+                               keep_recent: int = KEEP_RECENT_PER_USER,
+                               consumer_names: Optional[List[str]] = None) -> List[int]:
+    """返回可归档的学习记录ID（升序）
+
+    consumer_names 为答题事件消费者名称，缺省时取 event_consumer_offsets 中登记的全部消费者。
+    """
+    if horizon_days < MIN_HORIZON_DAYS:
+        raise ValueError(f"归档期限不能短于 {MIN_HORIZON_DAYS} 天")
+
+    if consumer_names is None:
+        consumer_names = db.session.execute(select(EventConsumerOffset.consumer)).scalars().all()
+    consumed_event_id = min((get_consumer_offset(name) for name in consumer_names), default=0)
+
+    # SQLite 的自增ID取当前最大值加一，最新的记录和事件不能删除，否则ID会被重新使用
+    max_record_id = db.session.query(func.max(LearningRecord.id)).scalar() or 0
+    max_event_id = db.session.query(func.max(AnswerEvent.id)).scalar() or 0
+    unconsumed_record_ids = select(AnswerEvent.learning_record_id).where(
+        or_(AnswerEvent.id > consumed_event_id, AnswerEvent.id >= max_event_id)
+    )
+
+    ranked = select(
+        LearningRecord.id,
+        LearningRecord.completed_at,
+        func.row_number().over(
+            partition_by=LearningRecord.user_id,
+            order_by=(LearningRecord.completed_at.desc(), LearningRecord.id.desc())
+        ).label('recency')
+    ).subquery()
+
+    cutoff = datetime.utcnow() - timedelta(days=horizon_days)
+    return db.session.execute(
+        select(ranked.c.id).where(
+            ranked.c.completed_at < cutoff,
+            ranked.c.recency > keep_recent,
+            ranked.c.id < max_record_id,
+            ranked.c.id.notin_(unconsumed_record_ids)
+        ).order_by(ranked.c.id)
+    ).scalars().all()
+
+def archive_learning_records(horizon_days: int = DEFAULT_HORIZON_DAYS,
+                             keep_recent: int = KEEP_RECENT_PER_USER,
+                             consumer_names: Optional[List[str]] = None,
+                             batch_size: int = 500) -> int:
+    """把旧记录分批迁入归档表，返回归档条数（需在应用上下文中调用）
+
+    每批在一个事务中复制记录、删除对应的已消费事件和热表记录，中断后可重新运行。
+    """
+    record_ids = find_archivable_record_ids(horizon_days, keep_recent, consumer_names)
+    db.session.rollback()
+
+    columns = [getattr(LearningRecord, name) for name in ARCHIVE_COLUMNS]
+    archived = 0
+    for offset in range(0, len(record_ids), batch_size):
+        batch = record_ids[offset:offset + batch_size]
+        try:
+            db.session.execute(
+                insert(ArchivedLearningRecord).from_select(
+                    ARCHIVE_COLUMNS, select(*columns).where(LearningRecord.id.in_(batch))
+                )
+            )
+            db.session.execute(delete(AnswerEvent).where(AnswerEvent.learning_record_id.in_(batch)))
+            archived += db.session.execute(
+                delete(LearningRecord).where(LearningRecord.id.in_(batch))
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    return archived
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='学习记录冷热分离归档')
+    parser.add_argument('--days', type=int, default=DEFAULT_HORIZON_DAYS, help='归档早于该天数的记录')
+    parser.add_argument('--keep-recent', type=int, default=KEEP_RECENT_PER_USER,
+                        help='每个用户始终保留在热表的最近记录数')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help='只统计可归档的记录数')
+    args = parser.parse_args()
+
+    from app import app, event_processor
+    consumer_names = [consumer.name for consumer in event_processor.consumers]
+    with app.app_context():
+        db.create_all()
+        if args.dry_run:
+            record_ids = find_archivable_record_ids(args.days, args.keep_recent, consumer_names)
+            print(f"可归档记录: {len(record_ids)} 条")
+            return
+        archived = archive_learning_records(args.days, args.keep_recent, consumer_names, args.batch_size)
+    print(f"归档记录: {archived} 条")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+ASGI 入口（异步服务模式）
+
+    uvicorn asgi:application --workers 4
+
+启动时执行 init_for_deployment（建表、迁移，空库时生成示例数据）。
+
+同步 Flask 工作线程在等待 Judge0 或数据库时被占满，并发上限等于线程总数。
+本入口用 Starlette 协程实现以等待 I/O 为主的接口，其余路由原样交给 Flask 应用
+（a2wsgi 在线程池中执行）：
+
+- POST /api/code/run: httpx 异步调用 Judge0，限流排队时只挂起协程
+- POST /api/learning-records: 题目和用户由 AsyncSession 读取，编程题异步判题；
+  学习记录和答题事件仍由 app.record_answer 在线程池中写入主库
+- GET /api/recommendations/{user_id}: 用户由 AsyncSession 读取；推荐引擎以 CPU 计算为主，
+  在线程池中执行，不阻塞事件循环；同时处理的推荐请求数由 ASGI_RECOMMENDATION_CONCURRENCY 限制（默认8）
+
+响应内容与同步接口一致；题目或用户不存在时返回 JSON 格式的 404。
+
+依赖: pip install starlette uvicorn httpx aiosqlite a2wsgi（PostgreSQL 另需 asyncpg）
+"""
+import asyncio
+import contextlib
+import os
+
+# 未指定配置环境时使用生产配置（需在导入应用、加载配置之前设置）
+os.environ.setdefault('FLASK_ENV', 'production')
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from app import (app as flask_app, build_recommendations, check_answer, code_run_response, coding_judge_args,
+                 init_for_deployment, judged_correct, record_answer, validate_submission)
+from database import create_async_sessionmaker, use_read_replica
+from external_platforms import platform_manager
+import metrics
+from models import db, Question, User
+from serializers import parse_question_fields
+
+# 只读查询使用的异步会话（有副本时连接副本）
+async_session = create_async_sessionmaker(flask_app, db)
+
+# 同时处理的推荐请求数：CPU 密集的计算线程过多只会争抢 GIL、拖慢事件循环，
+# 并占满连接池导致等待连接超时；超出的请求在协程中排队
+recommendation_slots = asyncio.Semaphore(int(os.getenv('ASGI_RECOMMENDATION_CONCURRENCY', 8)))
+
+def json_response(data, status: int = 200) -> Response:
+    """与 Flask jsonify 相同编码的 JSON 响应"""
+    return Response(
+        flask_app.json.dumps(data, separators=(',', ':')) + '\n',
+        status_code=status,
+        media_type='application/json',
+        # 与 flask-cors 的默认配置一致（预检请求仍由 Flask 应用处理）
+        headers={'Access-Control-Allow-Origin': '*'}
+    )
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+async def run_code(request):
+    """运行代码（不保存记录）"""
+    data = await read_json(request)
+    if not isinstance(data, dict) or not all(field in data for field in ['code', 'language']):
+        return json_response({'error': '缺少必要字段: code, language'}, 400)
+
+    try:
+        result = await platform_manager.execute_code_async(
+            data['code'], data['language'], data.get('test_cases') or None
+        )
+        body, status = code_run_response(result)
+        return json_response(body, status)
+    except Exception as e:
+        return json_response({'error': str(e)}, 500)
+
+def _record_answer(data, question, is_correct, execution_result):
+    """在应用上下文中写入学习记录（线程池中执行）"""
+    with flask_app.app_context():
+        return record_answer(data, question, is_correct, execution_result)
+
+async def submit_answer(request):
+    """提交答案并记录学习过程"""
+    data = await read_json(request)
+    error = validate_submission(data)
+    if error:
+        return json_response({'error': error}, 400)
+
+    async with async_session() as session:
+        question = await session.get(Question, data['question_id'])
+        if question is None:
+            return json_response({'error': '题目不存在'}, 404)
+        if await session.scalar(select(User.id).where(User.id == data['user_id'])) is None:
+            return json_response({'error': '用户不存在'}, 404)
+
+    execution_result = None
+    if question.question_type == 'coding':
+        code, language, test_cases = coding_judge_args(question, data['user_answer'])
+        execution_result = await platform_manager.execute_code_async(code, language, test_cases)
+
+        # 判题服务不可用时不记录本次答题，由客户端稍后重试
+        if execution_result.platform_error:
+            return json_response({'error': execution_result.error}, 503)
+        is_correct = judged_correct(execution_result, test_cases)
+    else:
+        is_correct = check_answer(question, data['user_answer'])
+
+    body = await run_in_threadpool(_record_answer, data, question, is_correct, execution_result)
+    return json_response(body)
+
+@use_read_replica
+def _build_recommendations(user_id, count, fields):
+    """生成推荐（线程池中执行）
+
+    推荐引擎的耗时主要在加载候选题目对象和逐题打分（CPU），不在等待数据库，
+    放在 AsyncSession.run_sync 中会阻塞事件循环，拖慢同一进程中等待判题的请求。
+    """
+    with flask_app.app_context():
+        return build_recommendations(user_id, count, fields)
+
+async def get_recommendations(request):
+    """获取个性化推荐题目（支持 fields 参数）"""
+    user_id = request.path_params['user_id']
+    try:
+        count = int(request.query_params.get('count', 10))
+    except ValueError:
+        count = 10
+    try:
+        fields = parse_question_fields(request.query_params.get('fields'))
+    except ValueError as e:
+        return json_response({'error': str(e)}, 400)
+
+    async with recommendation_slots:
+        async with async_session() as session:
+            if await session.scalar(select(User.id).where(User.id == user_id)) is None:
+                return json_response({'error': '用户不存在'}, 404)
+
+        try:
+            body = await run_in_threadpool(_build_recommendations, user_id, count, fields)
+        except Exception as e:
+            return json_response({'error': str(e)}, 500)
+    return json_response(body)
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    await run_in_threadpool(init_for_deployment)
+    yield
+    await platform_manager.aclose()
+    await async_session.kw['bind'].dispose()
+
+def instrumented(route: str, endpoint):
+    """记录与 Flask 路由相同的请求指标，route 为对应的 Flask 路由模板"""
+    async def wrapper(request):
+        if not flask_app.config['METRICS_ENABLED']:
+            return await endpoint(request)
+        token = metrics.start_request()
+        status = 500
+        try:
+            response = await endpoint(request)
+            status = response.status_code
+            return response
+        finally:
+            metrics.finish_request(token, request.method, route, status)
+    return wrapper
+
+application = Starlette(routes=[
+    Route('/api/code/run', instrumented('/api/code/run', run_code), methods=['POST']),
+    Route('/api/learning-records', instrumented('/api/learning-records', submit_answer), methods=['POST']),
+    Route('/api/recommendations/{user_id:int}',
+          instrumented('/api/recommendations/<int:user_id>', get_recommendations), methods=['GET']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+], lifespan=lifespan)
@@ -0,0 +1,165 @@
+"""
+同步 / 异步服务模式吞吐基准测试
+
+启动本地 Judge0 桩服务（固定判题延迟），在临时数据库中生成数据后分别运行：
+
+- 同步: gunicorn gthread（gunicorn.conf.py，工作进程数 × 线程数个并发请求）
+- 异步: uvicorn asgi:application（协程等待 Judge0 和数据库）
+
+每种模式用 --clients 个并发客户端（默认500）在 --duration 秒内持续请求
+POST /api/code/run 和 GET /api/recommendations/<user_id>（逐个接口），报告每秒请求数、p50/p95 延迟和状态码分布。
+两种模式下判题限流都放宽到并发数，比较的是服务模式本身。
+
+    python benchmarks/bench_async_serving.py --clients 500 --duration 20 --workers 2 --latency 1.0
+
+依赖: gunicorn、uvicorn、starlette、httpx、aiosqlite、a2wsgi
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'服务进程已退出: {url}')
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f'服务未在 {timeout}s 内就绪: {url}')
+
+def stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+async def drive(base_url: str, requests, clients: int, duration: float) -> dict:
+    """clients 个协程轮流发送 requests 中的请求，持续 duration 秒"""
+    latencies, statuses = {name: [] for name, _, _, _ in requests}, {name: Counter() for name, _, _, _ in requests}
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker(index: int):
+            position = index
+            while time.monotonic() < deadline:
+                name, method, path, body = requests[position % len(requests)]
+                position += 1
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    statuses[name][response.status_code] += 1
+                except httpx.HTTPError as e:
+                    statuses[name][type(e).__name__] += 1
+                    continue
+                latencies[name].append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.monotonic() - started
+
+    report = {}
+    for name in latencies:
+        values = sorted(latencies[name])
+        ok = statuses[name][200]
+        report[name] = {
+            'rps': ok / elapsed,
+            'p50_ms': values[len(values) // 2] * 1000 if values else 0,
+            'p95_ms': values[int(len(values) * 0.95)] * 1000 if values else 0,
+            'statuses': dict(statuses[name])
+        }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='同步 / 异步服务模式吞吐基准测试')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--workers', type=int, default=2, help='两种模式的工作进程数')
+    parser.add_argument('--threads', type=int, default=4, help='同步模式每个工作进程的线程数')
+    parser.add_argument('--latency', type=float, default=1.0, help='Judge0 桩服务判题延迟（秒）')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--records', type=int, default=50000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    database_url = f"sqlite:///{os.path.join(workdir, 'bench_async.db')}"
+    env = dict(os.environ, DATABASE_URL=database_url, FLASK_ENV='production', PYTHONPATH=project_root)
+    subprocess.run([sys.executable, 'data_generator.py', 'scale', '--users', str(args.users),
+                    '--questions', str(args.questions), '--records', str(args.records)],
+                   cwd=project_root, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    stub_port = free_port()
+    stub = subprocess.Popen([sys.executable, 'judge0_stub.py', '--port', str(stub_port),
+                             '--latency', str(args.latency), '--seed', '1'],
+                            cwd=project_root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    env.update({
+        'JUDGE0_API_URL': f'http://127.0.0.1:{stub_port}',
+        'JUDGE0_INITIAL_CONCURRENCY': str(args.clients),
+        'JUDGE0_MAX_CONCURRENCY': str(args.clients),
+        'JUDGE0_MAX_QUEUE_DEPTH': str(args.clients),
+        'JUDGE0_QUEUE_TIMEOUT': '30',
+        'JUDGE0_ASYNC_MAX_CONNECTIONS': str(args.clients),
+        'WEB_CONCURRENCY': str(args.workers),
+        'GUNICORN_THREADS': str(args.threads),
+    })
+
+    requests = [
+        ('POST /api/code/run', 'POST', '/api/code/run', {
+            'code': 'print(input())', 'language': 'python',
+            'test_cases': [{'input': '1', 'expected_output': '1'}]
+        }),
+        ('GET /api/recommendations', 'GET', '/api/recommendations/1', None),
+    ]
+    modes = {
+        f'同步 gunicorn（{args.workers} 进程 × {args.threads} 线程）': lambda port: [
+            'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', '--backlog', '2048',
+            'wsgi:application'],
+        f'异步 uvicorn（{args.workers} 进程）': lambda port: [
+            'uvicorn', 'asgi:application', '--port', str(port), '--workers', str(args.workers),
+            '--backlog', '2048', '--log-level', 'warning', '--no-access-log'],
+    }
+
+    try:
+        wait_until_ready(f'http://127.0.0.1:{stub_port}/submissions/missing', stub)
+        for label, command in modes.items():
+            port = free_port()
+            server = subprocess.Popen([sys.executable, '-m', *command(port)], cwd=project_root, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                wait_until_ready(f'http://127.0.0.1:{port}/api/knowledge-points', server)
+                print(f"{label}，{args.clients} 个并发客户端，判题延迟 {args.latency}s:")
+                # 逐个接口压测，避免 CPU 密集的推荐请求掩盖等待 I/O 的判题请求
+                for request in requests:
+                    report = asyncio.run(drive(f'http://127.0.0.1:{port}', [request], args.clients, args.duration))
+                    for name, stats in report.items():
+                        print(f"  {name}: {stats['rps']:.1f} req/s，p50 {stats['p50_ms']:.0f}ms，"
+                              f"p95 {stats['p95_ms']:.0f}ms，状态 {stats['statuses']}")
+            finally:
+                stop(server)
+    finally:
+        stop(stub)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+群体分析引擎基准测试
+
+在临时 SQLite 数据库中批量生成指定数量的学习记录，测量 CohortAnalyticsEngine
+首次分析（分块读取 + pandas 聚合）和命中缓存时的耗时。
+
+    python benchmarks/bench_cohort_analytics.py --records 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def populate(db, models, users: int, questions: int, knowledge_points: int, records: int, seed: int):
+    """用 executemany 批量写入基准数据"""
+    from sqlalchemy import insert
+
+    rng = np.random.default_rng(seed)
+    db.session.execute(insert(models.KnowledgePoint), [
+        {'id': i, 'name': f'知识点{i}', 'category': '基准', 'difficulty_level': 1 + i % 5}
+        for i in range(1, knowledge_points + 1)
+    ])
+    db.session.execute(insert(models.User), [
+        {'id': i, 'username': f'bench_user_{i}', 'email': f'bench_{i}@example.com'}
+        for i in range(1, users + 1)
+    ])
+    db.session.execute(insert(models.Question), [
+        {'id': i, 'title': f'题目{i}', 'content': '基准题目', 'question_type': 'theory',
+         'difficulty': ('easy', 'medium', 'hard')[i % 3], 'estimated_time': 10,
+         'knowledge_point_id': 1 + i % knowledge_points}
+        for i in range(1, questions + 1)
+    ])
+
+    now = datetime.utcnow()
+    ability = rng.uniform(0.3, 0.95, users + 1)
+    chunk = 100000
+    for offset in range(0, records, chunk):
+        size = min(chunk, records - offset)
+        user_ids = rng.integers(1, users + 1, size)
+        question_ids = rng.integers(1, questions + 1, size)
+        is_correct = rng.random(size) < ability[user_ids]
+        time_spent = rng.lognormal(5.5, 0.6, size).astype(int)
+        days_ago = rng.integers(0, 365, size)
+        db.session.execute(insert(models.LearningRecord), [{
+            'user_id': int(user_ids[i]),
+            'question_id': int(question_ids[i]),
+            'is_correct': bool(is_correct[i]),
+            'time_spent': int(time_spent[i]),
+            'started_at': now - timedelta(days=int(days_ago[i]), seconds=int(time_spent[i])),
+            'completed_at': now - timedelta(days=int(days_ago[i]))
+        } for i in range(size)])
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description='群体分析引擎基准测试')
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--knowledge-points', type=int, default=50)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_analytics.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import app
+    from analytics import CohortAnalyticsEngine
+    import models
+
+    with app.app_context():
+        models.db.create_all()
+
+        started = time.perf_counter()
+        populate(models.db, models, args.users, args.questions, args.knowledge_points, args.records, args.seed)
+        print(f"生成 {args.records} 条记录耗时: {time.perf_counter() - started:.1f}s")
+
+        engine = CohortAnalyticsEngine(chunk_size=args.chunk_size)
+
+        started = time.perf_counter()
+        result = engine.analyze()
+        elapsed = time.perf_counter() - started
+        print(f"全体分析（冷）: {elapsed:.2f}s  ({args.records / elapsed:,.0f} 条/秒)")
+
+        started = time.perf_counter()
+        engine.analyze()
+        print(f"全体分析（缓存）: {(time.perf_counter() - started) * 1000:.2f}ms")
+
+        cohort = list(range(1, min(args.users, 40) + 1))
+        started = time.perf_counter()
+        engine.analyze(user_ids=cohort)
+        print(f"{len(cohort)} 人班级分析（冷）: {time.perf_counter() - started:.2f}s")
+
+        print(f"汇总: {result['summary']}  困难学生: {len(result['struggling_students'])}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+监控指标开销基准测试
+
+在临时数据库中生成数据，用测试客户端循环请求一组常用接口，在同一进程中交替开启和关闭
+请求与 SQL 统计（metrics.set_enabled），每轮先后各跑一批，按轮配对比较平均耗时，
+报告开启指标后额外开销的中位数（同一进程内交替测量，机器负载波动对两种模式的影响相同）。
+引擎注册过事件监听后即使移除也保留事件分发路径，其开销（每条 SQL 约数微秒）两种模式都包含。
+
+    python benchmarks/bench_metrics_overhead.py --rounds 30 --iterations 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+PATHS = [
+    '/api/users/1',
+    '/api/users/1/stats',
+    '/api/questions?per_page=20&fields=summary',
+    '/api/questions/1',
+    '/api/knowledge-points',
+    '/api/recommendations/1',
+]
+
+def main():
+    parser = argparse.ArgumentParser(description='监控指标开销基准测试')
+    parser.add_argument('--rounds', type=int, default=30)
+    parser.add_argument('--iterations', type=int, default=20, help='每批请求整组接口的次数')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--records', type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_metrics.db')}"
+    os.environ['FLASK_ENV'] = 'production'
+    os.environ['ANSWER_EVENTS_ASYNC'] = 'false'
+
+    from app import app
+    from data_generator import generate_scale_data
+    import metrics
+    import models
+
+    with app.app_context():
+        models.db.create_all()
+        generate_scale_data(users=args.users, questions=args.questions,
+                            knowledge_points=20, records=args.records)
+
+    client = app.test_client()
+    for path in PATHS:
+        response = client.get(path)
+        assert response.status_code == 200, (path, response.status_code)
+
+    def run_batch(enabled: bool) -> float:
+        metrics.set_enabled(app, enabled)
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            for path in PATHS:
+                client.get(path).close()
+        return (time.perf_counter() - started) * 1000 / (args.iterations * len(PATHS))
+
+    baseline, instrumented, ratios = [], [], []
+    for index in range(args.rounds):
+        # 每轮交换先后顺序，抵消缓存预热等顺序效应
+        if index % 2 == 0:
+            off, on = run_batch(False), run_batch(True)
+        else:
+            on, off = run_batch(True), run_batch(False)
+        baseline.append(off)
+        instrumented.append(on)
+        ratios.append(on / off - 1)
+
+    print(f"接口: {', '.join(PATHS)}")
+    print(f"关闭指标: {statistics.median(baseline):.3f}ms/请求（中位数）")
+    print(f"开启指标: {statistics.median(instrumented):.3f}ms/请求（中位数）")
+    print(f"额外开销: {statistics.median(ratios) * 100:+.2f}%（逐轮配对的中位数），"
+          f"合计 {(sum(instrumented) / sum(baseline) - 1) * 100:+.2f}%")
+
+if __name__ == '__main__':
+    main()
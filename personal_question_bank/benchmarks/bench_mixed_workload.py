@@ -0,0 +1,129 @@
+"""
+读写混合负载基准测试
+
+在临时 SQLite 数据库中生成学习记录，若干读线程持续请求学习统计和题目列表，
+若干写线程持续提交答案（答题事件在请求内同步处理），比较 SQLite 默认的
+回滚日志模式（journal_mode=DELETE, synchronous=FULL）与 WAL 配置
+（journal_mode=WAL, synchronous=NORMAL, mmap）下的吞吐量和延迟。
+
+每种配置在独立的子进程中运行（SQLite 参数在导入 config 时读取）。
+
+    python benchmarks/bench_mixed_workload.py --readers 4 --writers 2 --duration 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+MODES = {
+    '回滚日志 (DELETE/FULL)': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_MMAP_SIZE': '0'},
+    'WAL (WAL/NORMAL/mmap)': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL',
+                              'SQLITE_MMAP_SIZE': str(256 * 1024 * 1024)},
+}
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def run_worker(args) -> dict:
+    """在当前进程中生成数据并运行混合负载，返回统计结果"""
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_mixed.db')}"
+    os.environ['ANSWER_EVENTS_ASYNC'] = 'false'
+
+    from sqlalchemy import text
+    from app import app
+    from benchmarks.bench_cohort_analytics import populate
+    import models
+
+    with app.app_context():
+        models.db.create_all()
+        populate(models.db, models, args.users, args.questions, 20, args.records, seed=42)
+        journal_mode = models.db.session.execute(text('PRAGMA journal_mode')).scalar()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    results = {'read': [], 'write': [], 'errors': 0}
+
+    def loop(kind: str, index: int):
+        client = app.test_client()
+        latencies, errors, i = [], 0, 0
+        while not stop.is_set():
+            i += 1
+            user_id = 1 + (index * 7919 + i) % args.users
+            started = time.perf_counter()
+            if kind == 'write':
+                response = client.post('/api/learning-records', json={
+                    'user_id': user_id,
+                    'question_id': 1 + (index * 104729 + i) % args.questions,
+                    'user_answer': 'A',
+                    'time_spent': 30,
+                    'interaction_type': 'practice'
+                })
+            elif i % 2:
+                response = client.get(f'/api/users/{user_id}/stats')
+            else:
+                response = client.get(f'/api/questions?fields=summary&per_page=20&page={1 + i % 50}')
+            if response.status_code == 200:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors += 1
+        with lock:
+            results[kind].extend(latencies)
+            results['errors'] += errors
+
+    threads = [threading.Thread(target=loop, args=('read', i)) for i in range(args.readers)] + \
+              [threading.Thread(target=loop, args=('write', i)) for i in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'journal_mode': journal_mode,
+        'reads_per_second': len(results['read']) / args.duration,
+        'writes_per_second': len(results['write']) / args.duration,
+        'read_p95_ms': percentile(results['read'], 0.95),
+        'write_p95_ms': percentile(results['write'], 0.95),
+        'errors': results['errors']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='读写混合负载基准测试')
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0, help='每种配置的运行秒数')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    for label, env in MODES.items():
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker'] + sys.argv[1:],
+            env=dict(os.environ, **env), cwd=project_root, capture_output=True, text=True, check=True
+        ).stdout
+        stats = json.loads(output.strip().splitlines()[-1])
+        print(f"{label}（journal_mode={stats['journal_mode']}）: "
+              f"读 {stats['reads_per_second']:.0f} 次/秒 p95 {stats['read_p95_ms']:.1f}ms；"
+              f"写 {stats['writes_per_second']:.0f} 次/秒 p95 {stats['write_p95_ms']:.1f}ms；"
+              f"失败 {stats['errors']} 次")
+
+if __name__ == '__main__':
+    main()
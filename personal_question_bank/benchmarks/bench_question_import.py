@@ -0,0 +1,103 @@
+"""
+题目批量导入基准测试
+
+生成包含一定比例重复和近似重复题目的 NDJSON 文件，比较逐个 db.session.add
+（data_generator 的写法）与 question_import 流式导入（校验 + MinHash 去重 +
+executemany 分块插入）的每秒行数，并验证重复导入同一文件不会新增题目。
+
+    python benchmarks/bench_question_import.py --questions 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+TOPICS = ['数组', '链表', '哈希表', '二叉树', '堆', '图', '动态规划', '贪心', '排序', '二分查找', '栈', '队列']
+VERBS = ['实现', '分析', '比较', '优化', '证明', '解释', '设计', '推导']
+ASPECTS = ['时间复杂度', '空间复杂度', '边界条件', '稳定性', '适用场景', '最坏情况', '递推关系', '不变量']
+
+def generate_rows(count: int, duplicate_ratio: float, knowledge_points: int, seed: int):
+    """生成题目行，其中 duplicate_ratio 比例为此前题目的原样或轻微改写"""
+    rng = random.Random(seed)
+    originals = []
+    for i in range(count):
+        if originals and rng.random() < duplicate_ratio:
+            row = dict(rng.choice(originals))
+            if rng.random() < 0.5:
+                # 轻微改写：改动标点
+                row['content'] = row['content'].replace('。', '！', 1)
+            yield row
+            continue
+
+        topic, verb, aspect = rng.choice(TOPICS), rng.choice(VERBS), rng.choice(ASPECTS)
+        row = {
+            'title': f'{verb}{topic}的{aspect}（{i}）',
+            'content': f'第{i}题：请{verb}{topic}在第{rng.randint(1, 10 ** 6)}组输入下的{aspect}，'
+                       f'并说明{rng.choice(TOPICS)}与{rng.choice(TOPICS)}在{rng.choice(ASPECTS)}上的差异。',
+            'question_type': rng.choice(['theory', 'coding', 'practical']),
+            'difficulty': rng.choice(['easy', 'medium', 'hard']),
+            'estimated_time': rng.randint(5, 60),
+            'knowledge_point_id': rng.randint(1, knowledge_points),
+            'explanation': f'{aspect}取决于{topic}的结构。'
+        }
+        originals.append(row)
+        yield row
+
+def main():
+    parser = argparse.ArgumentParser(description='题目批量导入基准测试')
+    parser.add_argument('--questions', type=int, default=50000)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.1)
+    parser.add_argument('--knowledge-points', type=int, default=20)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench_import.db')}"
+
+    from sqlalchemy import delete, insert
+    from app import app
+    from question_import import import_questions
+    import models
+
+    path = os.path.join(workdir, 'questions.ndjson')
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in generate_rows(args.questions, args.duplicate_ratio, args.knowledge_points, args.seed):
+            f.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    with app.app_context():
+        models.db.create_all()
+        models.db.session.execute(insert(models.KnowledgePoint), [
+            {'id': i, 'name': f'知识点{i}', 'category': '基准', 'difficulty_level': 1 + i % 5}
+            for i in range(1, args.knowledge_points + 1)
+        ])
+        models.db.session.commit()
+
+        # 逐个创建 ORM 对象（不去重）
+        started = time.perf_counter()
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                models.db.session.add(models.Question(**json.loads(line)))
+        models.db.session.commit()
+        elapsed = time.perf_counter() - started
+        print(f"逐个 session.add: {args.questions / elapsed:,.0f} 行/秒 ({elapsed:.2f}s，不去重)")
+
+        models.db.session.execute(delete(models.Question))
+        models.db.session.commit()
+
+        for label in ('流式导入（空题库）', '重复导入同一文件'):
+            with open(path, encoding='utf-8', newline='') as f:
+                report = import_questions(f, 'ndjson', chunk_size=args.chunk_size)
+            print(f"{label}: {report['rows_per_second']:,.0f} 行/秒 ({report['elapsed_seconds']}s，"
+                  f"去重索引 {report['index_seconds']}s)；导入 {report['imported']}，重复 {report['duplicates']}，"
+                  f"无效 {report['invalid']}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+题目列表分页基准测试
+
+在临时 SQLite 数据库中生成大量题目，比较 /api/questions 的 OFFSET 分页
+（page=N）和游标分页（after=<cursor>）在第1页与深页的延迟。
+
+    python benchmarks/bench_question_pagination.py --questions 300000 --page 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def populate(models, questions: int, knowledge_points: int):
+    from sqlalchemy import insert
+
+    models.db.session.execute(insert(models.KnowledgePoint), [
+        {'id': i, 'name': f'知识点{i}', 'category': '基准', 'difficulty_level': 1 + i % 5}
+        for i in range(1, knowledge_points + 1)
+    ])
+    chunk = 50000
+    for offset in range(0, questions, chunk):
+        models.db.session.execute(insert(models.Question), [{
+            'id': i,
+            'title': f'题目{i}',
+            'content': '基准题目内容',
+            'question_type': ('theory', 'coding', 'multiple_choice', 'practical')[i % 4],
+            'difficulty': ('easy', 'medium', 'hard')[i % 3],
+            'estimated_time': 10,
+            'knowledge_point_id': 1 + i % knowledge_points
+        } for i in range(offset + 1, min(offset + chunk, questions) + 1)])
+    models.db.session.commit()
+
+def timed_get(client, url: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='题目列表分页基准测试')
+    parser.add_argument('--questions', type=int, default=300000)
+    parser.add_argument('--knowledge-points', type=int, default=50)
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--page', type=int, default=10000, help='深页页码')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_pagination.db')}"
+
+    from app import app, encode_cursor
+    import models
+
+    filters = {
+        '无过滤': {},
+        '按类型': {'type': 'coding'},
+        '按知识点': {'knowledge_point_id': 7},
+        '类型+难度': {'type': 'coding', 'difficulty': 'easy'},
+        '类型+难度+知识点': {'type': 'coding', 'difficulty': 'easy', 'knowledge_point_id': 8},
+    }
+
+    with app.app_context():
+        models.db.create_all()
+        populate(models, args.questions, args.knowledge_points)
+        client = app.test_client()
+
+        for label, params in filters.items():
+            query = '&'.join(f'{key}={value}' for key, value in params.items())
+            query = (query + '&') if query else ''
+
+            # 取深页起点对应的记录ID作为游标（若过滤后不足则取最后一页）
+            matching = models.Question.query.filter_by(**{
+                {'type': 'question_type'}.get(key, key): value for key, value in params.items()
+            }).count()
+            deep_page = min(args.page, max(matching // args.per_page, 1))
+            offset = (deep_page - 1) * args.per_page
+            url = f"/api/questions?{query}per_page={args.per_page}&page={deep_page}"
+            deep_ids = [q['id'] for q in client.get(url).get_json()['questions']]
+            cursor = encode_cursor(deep_ids[0] - 1) if offset else ''
+
+            offset_first = timed_get(client, f"/api/questions?{query}per_page={args.per_page}&page=1", args.repeat)
+            offset_deep = timed_get(client, url, args.repeat)
+            cursor_first = timed_get(client, f"/api/questions?{query}per_page={args.per_page}&after=", args.repeat)
+            cursor_deep = timed_get(client, f"/api/questions?{query}per_page={args.per_page}&after={cursor}",
+                                    args.repeat)
+            print(f"{label}（{matching} 题，深页第 {deep_page} 页）: "
+                  f"OFFSET 第1页 {offset_first:.1f}ms / 深页 {offset_deep:.1f}ms；"
+                  f"游标 第1页 {cursor_first:.1f}ms / 深页 {cursor_deep:.1f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+题目全文检索基准测试
+
+在临时 SQLite 数据库中生成指定数量的中英文混合题目（经触发器同步到 FTS5 索引），
+测量 /api/questions/search 对长词、中文短词和多词组合查询的延迟。
+
+    python benchmarks/bench_question_search.py --questions 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+VOCABULARY = [
+    '数组', '链表', '二叉树', '哈希表', '动态规划', '贪心算法', '冒泡排序', '快速排序', '归并排序', '二分查找',
+    '时间复杂度', '空间复杂度', '递归', '回溯', '广度优先搜索', '深度优先搜索', '最短路径', '拓扑排序', '并查集',
+    '字符串', '滑动窗口', '双指针', '栈', '队列', '堆', '图', '前缀和', '位运算', '数据库', '索引', '事务',
+    'Python', 'Java', 'algorithm', 'binary', 'search', 'recursion', 'pointer', 'memory', 'complexity',
+]
+
+# 填充用的常用汉字，随机组成词语，使检索词的文档频率接近真实题库
+FILLER_CHARACTERS = (
+    '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定'
+    '行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些'
+    '然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公'
+)
+
+def populate(models, questions: int, seed: int):
+    from sqlalchemy import insert
+
+    rng = random.Random(seed)
+    filler_words = [''.join(rng.choice(FILLER_CHARACTERS) for _ in range(rng.randint(2, 4))) for _ in range(2000)]
+    words = VOCABULARY + filler_words
+    models.db.session.execute(insert(models.KnowledgePoint), [
+        {'id': i, 'name': f'知识点{i}', 'category': '基准', 'difficulty_level': 1 + i % 5}
+        for i in range(1, 51)
+    ])
+
+    def sentence(words_count: int) -> str:
+        return '，'.join('请分析' + rng.choice(words) + '的' + rng.choice(words) for _ in range(words_count))
+
+    chunk = 20000
+    for offset in range(0, questions, chunk):
+        models.db.session.execute(insert(models.Question), [{
+            'id': i,
+            'title': f'{rng.choice(words)}与{rng.choice(words)}',
+            'content': sentence(8),
+            'question_type': ('theory', 'coding', 'multiple_choice', 'practical')[i % 4],
+            'difficulty': ('easy', 'medium', 'hard')[i % 3],
+            'knowledge_point_id': 1 + i % 50,
+            'explanation': sentence(4)
+        } for i in range(offset + 1, min(offset + chunk, questions) + 1)])
+    models.db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description='题目全文检索基准测试')
+    parser.add_argument('--questions', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_search.db')}"
+
+    from app import app
+    from search import ensure_search_index
+    import models
+
+    queries = ['动态规划', '广度优先搜索', 'algorithm', '排序', '动态规划 二叉树', 'Python 复杂度',
+               '数组&type=coding', '快速排序&fields=summary', '不存在的词语',
+               '请分析']  # 最后一个出现在每道题中，为需要对全部题目排序的最坏情况
+
+    with app.app_context():
+        models.db.create_all()
+        ensure_search_index()
+
+        started = time.perf_counter()
+        populate(models, args.questions, args.seed)
+        print(f"写入 {args.questions} 道题目（含索引同步）: {time.perf_counter() - started:.1f}s")
+
+        client = app.test_client()
+        for query in queries:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                response = client.get(f'/api/questions/search?q={query}&limit=20')
+            elapsed = (time.perf_counter() - started) / args.repeat * 1000
+            print(f"q={query}: {elapsed:.1f}ms  ({response.get_json()['count']} 条)")
+
+if __name__ == '__main__':
+    main()
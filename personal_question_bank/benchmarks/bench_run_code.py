@@ -0,0 +1,97 @@
+"""
+/api/code/run 吞吐量基准测试
+
+在本进程内启动 Judge0 桩服务，并发调用代码运行接口，
+输出吞吐量、延迟分位数以及限流/熔断的拒绝情况，不需要网络和 RapidAPI 配额。
+
+    python benchmarks/bench_run_code.py --concurrency 32 --requests 500 --latency 0.2
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from judge0_stub import Judge0Stub, parse_status_weights
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(len(ordered) * q), len(ordered) - 1)
+    return ordered[index]
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/code/run 吞吐量基准测试')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--requests', type=int, default=200, help='总请求数')
+    parser.add_argument('--test-cases', type=int, default=3, help='每次运行的测试用例数')
+    parser.add_argument('--latency', type=float, default=0.05, help='桩服务平均判题延迟（秒）')
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'exponential'], default='fixed')
+    parser.add_argument('--status', default='accepted=1')
+    parser.add_argument('--http-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = Judge0Stub(
+        port=0,
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        status_weights=parse_status_weights(args.status),
+        http_error_rate=args.http_error_rate,
+        seed=42
+    )
+    os.environ['JUDGE0_API_URL'] = stub.start()
+    os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
+
+    from app import app, platform_manager
+
+    client = app.test_client()
+    payload = {
+        'code': 'print(input())',
+        'language': 'python',
+        'test_cases': [{'input': str(i), 'expected_output': str(i)} for i in range(args.test_cases)]
+    }
+
+    latencies = []
+    status_codes = {}
+    lock = threading.Lock()
+    remaining = [args.requests]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            response = client.post('/api/code/run', json=payload)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                status_codes[response.status_code] = status_codes.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    stub.stop()
+
+    print(f"请求数: {len(latencies)}  并发: {args.concurrency}  桩服务延迟: {args.latency}s ({args.latency_dist})")
+    print(f"吞吐量: {len(latencies) / wall_time:.1f} req/s  总耗时: {wall_time:.2f}s")
+    print(f"延迟 p50: {percentile(latencies, 0.5) * 1000:.1f}ms  "
+          f"p95: {percentile(latencies, 0.95) * 1000:.1f}ms  "
+          f"p99: {percentile(latencies, 0.99) * 1000:.1f}ms")
+    print(f"状态码: {status_codes}")
+    print(f"桩服务收到提交: {stub.submission_count}")
+    print(f"判题保护状态: {platform_manager.get_judge_stats()}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+题目序列化微基准测试
+
+在临时 SQLite 数据库中生成带选项和测试用例的题目，比较原先逐行 to_dict
+（每次 json.loads、每行重新序列化知识点）加标准库 json 编码，
+与 serializers 中预编译序列化器加 FastJSONProvider 编码的每秒行数。
+
+    python benchmarks/bench_serialization.py --questions 20000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def legacy_question_to_dict(question):
+    """改造前的 Question.to_dict() 实现"""
+    return {
+        'id': question.id,
+        'title': question.title,
+        'content': question.content,
+        'question_type': question.question_type,
+        'difficulty': question.difficulty,
+        'estimated_time': question.estimated_time,
+        'knowledge_point': question.knowledge_point.to_dict() if question.knowledge_point else None,
+        'options': json.loads(question.options) if question.options else None,
+        'correct_answer': question.correct_answer,
+        'explanation': question.explanation,
+        'programming_language': question.programming_language,
+        'starter_code': question.starter_code,
+        'test_cases': json.loads(question.test_cases) if question.test_cases else None,
+        'external_platform': question.external_platform,
+        'external_id': question.external_id
+    }
+
+def populate(models, questions: int, knowledge_points: int):
+    from sqlalchemy import insert
+
+    models.db.session.execute(insert(models.KnowledgePoint), [
+        {'id': i, 'name': f'知识点{i}', 'category': '基准', 'description': '基准知识点描述' * 5,
+         'difficulty_level': 1 + i % 5}
+        for i in range(1, knowledge_points + 1)
+    ])
+    models.db.session.execute(insert(models.Question), [{
+        'id': i,
+        'title': f'题目{i}',
+        'content': '请阅读以下代码并回答问题。' * 10,
+        'question_type': ('coding', 'multiple_choice')[i % 2],
+        'difficulty': ('easy', 'medium', 'hard')[i % 3],
+        'estimated_time': 10,
+        'knowledge_point_id': 1 + i % knowledge_points,
+        'options': json.dumps([f'选项{c}' for c in 'ABCD'], ensure_ascii=False),
+        'correct_answer': 'A',
+        'explanation': '解析内容' * 20,
+        'programming_language': 'python',
+        'starter_code': 'def solution(nums):\n    pass\n',
+        'test_cases': json.dumps([{'input': [1, 2, 3], 'expected': 6}] * 5)
+    } for i in range(1, questions + 1)])
+    models.db.session.commit()
+
+def measure(label: str, rows: int, func, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label}: {rows / elapsed:,.0f} 行/秒  ({elapsed * 1000:.1f}ms)")
+
+def main():
+    parser = argparse.ArgumentParser(description='题目序列化微基准测试')
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--knowledge-points', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}"
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import app
+    from serializers import FastJSONProvider, orjson, serialize_questions
+    import models
+
+    with app.app_context():
+        models.db.create_all()
+        populate(models, args.questions, args.knowledge_points)
+        questions = models.Question.query.all()
+        for question in questions:
+            question.knowledge_point  # 预先加载，只测量序列化本身
+
+        standard = DefaultJSONProvider(app)
+        fast = FastJSONProvider(app)
+        rows = len(questions)
+
+        measure('改造前 to_dict', rows, lambda: [legacy_question_to_dict(q) for q in questions], args.repeat)
+        measure('serialize_questions', rows, lambda: serialize_questions(questions), args.repeat)
+
+        payload = {'questions': serialize_questions(questions)}
+        measure('标准库 json 编码', rows, lambda: standard.response(payload), args.repeat)
+        if orjson is not None:
+            measure('orjson 编码', rows, lambda: fast.response(payload), args.repeat)
+        else:
+            print('未安装 orjson，跳过 orjson 编码测试')
+
+        measure('改造前 to_dict + 标准库编码', rows,
+                lambda: standard.response({'questions': [legacy_question_to_dict(q) for q in questions]}),
+                args.repeat)
+        measure('改造后 序列化 + 编码', rows,
+                lambda: fast.response({'questions': serialize_questions(questions)}), args.repeat)
+
+if __name__ == '__main__':
+    main()
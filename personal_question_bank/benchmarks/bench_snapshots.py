@@ -0,0 +1,84 @@
+"""
+学习记录列式快照基准测试
+
+在临时 SQLite 数据库中批量生成学习记录，测量全量导出、增量导出，
+以及训练任务从 Parquet / Arrow 快照加载列的耗时，并与直接查询数据库对比。
+
+    python benchmarks/bench_snapshots.py --records 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from benchmarks.bench_cohort_analytics import populate
+
+def main():
+    parser = argparse.ArgumentParser(description='学习记录列式快照基准测试')
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--knowledge-points', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(work_dir, 'bench_snapshots.db')}"
+
+    from sqlalchemy import insert, select
+    from app import app
+    from snapshots import LearningSnapshot
+    import models
+
+    training_columns = ['user_id', 'question_id', 'knowledge_point_id', 'is_correct', 'time_spent']
+
+    with app.app_context():
+        models.db.create_all()
+        populate(models.db, models, args.users, args.questions, args.knowledge_points, args.records, args.seed)
+
+        started = time.perf_counter()
+        rows = models.db.session.execute(
+            select(models.LearningRecord.user_id, models.LearningRecord.question_id,
+                   models.Question.knowledge_point_id, models.LearningRecord.is_correct,
+                   models.LearningRecord.time_spent)
+            .join(models.Question, models.LearningRecord.question_id == models.Question.id)
+        ).all()
+        print(f"直接查询数据库加载 {len(rows)} 行: {time.perf_counter() - started:.2f}s")
+        del rows
+
+        for file_format in ('parquet', 'arrow'):
+            snapshot = LearningSnapshot(os.path.join(work_dir, file_format), file_format)
+
+            started = time.perf_counter()
+            exported = snapshot.export()
+            print(f"[{file_format}] 全量导出 {exported} 行: {time.perf_counter() - started:.2f}s")
+
+            # 追加一批新记录后再次导出，只处理水位之后的部分
+            now = datetime.utcnow()
+            models.db.session.execute(insert(models.LearningRecord), [
+                {'user_id': 1, 'question_id': 1, 'is_correct': True, 'time_spent': 30,
+                 'started_at': now, 'completed_at': now}
+            ] * 1000)
+            models.db.session.commit()
+            started = time.perf_counter()
+            exported = snapshot.export()
+            print(f"[{file_format}] 增量导出 {exported} 行: {(time.perf_counter() - started) * 1000:.1f}ms")
+
+            started = time.perf_counter()
+            arrays = snapshot.to_numpy(training_columns)
+            print(f"[{file_format}] 加载 {len(arrays['user_id'])} 行训练列为 NumPy: "
+                  f"{time.perf_counter() - started:.2f}s")
+
+            started = time.perf_counter()
+            frame = snapshot.to_pandas()
+            print(f"[{file_format}] 加载全部列为 pandas: {time.perf_counter() - started:.2f}s  "
+                  f"({frame.memory_usage(deep=True).sum() / 1e6:.0f} MB)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+流式 JSON 响应基准测试
+
+在临时数据库中生成一个包含大量题目的知识点和大量用户，比较先构造完整列表再
+jsonify（原实现）与 yield_per 流式输出在首字节时间、总耗时和峰值内存（tracemalloc）
+上的差异，并给出 gzip 压缩后的大小。
+
+    python benchmarks/bench_streaming_responses.py --questions 50000 --users 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+def measure(produce) -> dict:
+    """运行 produce() 得到响应，逐段读取响应体，记录首字节时间、总耗时、字节数和峰值内存"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_byte, size = None, 0
+    response = produce()
+    for chunk in response.response:
+        if chunk and first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'ttfb_ms': first_byte * 1000, 'elapsed_ms': elapsed * 1000, 'bytes': size, 'peak_mb': peak / 2 ** 20}
+
+def main():
+    parser = argparse.ArgumentParser(description='流式 JSON 响应基准测试')
+    parser.add_argument('--questions', type=int, default=50000)
+    parser.add_argument('--users', type=int, default=50000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_streaming.db')}"
+    os.environ['FLASK_ENV'] = 'production'
+
+    from flask import jsonify
+    from app import app, get_knowledge_point_questions, get_users
+    from data_generator import generate_scale_data
+    from serializers import question_load_options, serialize_questions
+    import models
+
+    with app.app_context():
+        models.db.create_all()
+        generate_scale_data(users=args.users, questions=args.questions, knowledge_points=1, records=0)
+
+    def list_users():
+        return jsonify([user.to_dict() for user in models.User.query.all()])
+
+    def list_questions():
+        knowledge_point = models.db.session.get(models.KnowledgePoint, 1)
+        questions = models.Question.query.options(*question_load_options()).filter_by(knowledge_point_id=1).all()
+        return jsonify({'knowledge_point': knowledge_point.to_dict(), 'questions': serialize_questions(questions)})
+
+    cases = [
+        ('/api/users', {}, list_users, get_users),
+        ('/api/knowledge-points/1/questions', {'kp_id': 1}, list_questions, get_knowledge_point_questions),
+    ]
+    for path, kwargs, build_list, view in cases:
+        for label, produce, headers in (
+            ('jsonify 完整列表', build_list, {}),
+            ('流式输出', lambda: view(**kwargs), {}),
+            ('流式输出 + gzip', lambda: view(**kwargs), {'Accept-Encoding': 'gzip'}),
+        ):
+            with app.test_request_context(path, headers=headers):
+                stats = measure(produce)
+            print(f"{path} {label}: 首字节 {stats['ttfb_ms']:.1f}ms，总耗时 {stats['elapsed_ms']:.0f}ms，"
+                  f"{stats['bytes'] / 2 ** 20:.1f}MB，峰值内存 {stats['peak_mb']:.1f}MB")
+
+if __name__ == '__main__':
+    main()
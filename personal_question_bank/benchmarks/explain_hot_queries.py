@@ -0,0 +1,123 @@
+"""
+热点查询执行计划检查
+
+对当前数据库（DATABASE_URL，默认 instance/question_bank.db）补齐索引后，
+用 EXPLAIN 检查各热点查询是否命中预期的索引，有查询走全表扫描时以非零状态退出。
+可在迁移后或 CI 中运行：
+
+    python benchmarks/explain_hot_queries.py
+"""
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from sqlalchemy import select, text
+
+def hot_queries(models):
+    """(说明, 查询, 可接受的索引) 列表，与 app.py / recommendation_engine.py 中的查询对应
+
+    游标分页查询按主键定位同样不需要扫描，主键也在可接受之列。
+    """
+    LearningRecord = models.LearningRecord
+    ArchivedLearningRecord = models.ArchivedLearningRecord
+    Question = models.Question
+    UserKnowledgeStats = models.UserKnowledgeStats
+    DailyUserActivity = models.DailyUserActivity
+    now = datetime.utcnow()
+
+    return [
+        ('用户最近学习记录',
+         select(LearningRecord).where(LearningRecord.user_id == 1)
+         .order_by(LearningRecord.completed_at.desc()).limit(10),
+         ('ix_learning_records_user_completed',)),
+        ('用户最近30天记录',
+         select(LearningRecord).where(LearningRecord.user_id == 1,
+                                      LearningRecord.completed_at >= now - timedelta(days=30)),
+         ('ix_learning_records_user_completed',)),
+        ('按时间范围导出记录',
+         select(LearningRecord).where(LearningRecord.completed_at >= now - timedelta(days=7),
+                                      LearningRecord.completed_at <= now),
+         ('ix_learning_records_completed',)),
+        ('用户最近归档记录',
+         select(ArchivedLearningRecord).where(ArchivedLearningRecord.user_id == 1)
+         .order_by(ArchivedLearningRecord.completed_at.desc()).limit(10),
+         ('ix_learning_records_archive_user_completed',)),
+        ('按时间范围导出归档记录',
+         select(ArchivedLearningRecord).where(ArchivedLearningRecord.completed_at >= now - timedelta(days=400),
+                                              ArchivedLearningRecord.completed_at <= now - timedelta(days=180)),
+         ('ix_learning_records_archive_completed',)),
+        ('用户知识点统计',
+         select(UserKnowledgeStats).where(UserKnowledgeStats.user_id == 1),
+         ('uq_user_knowledge_stats_user_kp',)),
+        ('单个知识点统计',
+         select(UserKnowledgeStats).where(UserKnowledgeStats.user_id == 1,
+                                          UserKnowledgeStats.knowledge_point_id == 1),
+         ('uq_user_knowledge_stats_user_kp',)),
+        ('题目列表（类型+难度+知识点）',
+         select(Question).where(Question.question_type == 'coding', Question.difficulty == 'easy',
+                                Question.knowledge_point_id == 1),
+         ('ix_questions_type_difficulty_kp',)),
+        ('题目列表（类型）',
+         select(Question).where(Question.question_type == 'coding'),
+         ('ix_questions_type_difficulty_kp', 'ix_questions_type_id')),
+        ('题目游标分页（类型）',
+         select(Question).where(Question.question_type == 'coding', Question.id > 100)
+         .order_by(Question.id).limit(21),
+         ('ix_questions_type_id', 'PRIMARY KEY', 'questions_pkey')),
+        ('题目游标分页（知识点）',
+         select(Question).where(Question.knowledge_point_id == 1, Question.id > 100)
+         .order_by(Question.id).limit(21),
+         ('ix_questions_kp_id', 'PRIMARY KEY', 'questions_pkey')),
+        ('知识点题目（按难度排序）',
+         select(Question).where(Question.knowledge_point_id == 1).order_by(Question.difficulty),
+         ('ix_questions_kp_difficulty',)),
+        ('用户每日活动',
+         select(DailyUserActivity).where(DailyUserActivity.user_id == 1,
+                                         DailyUserActivity.activity_date >= date.today() - timedelta(days=30)),
+         ('uq_daily_user_activity_user_date_kp',)),
+    ]
+
+def explain(connection, stmt) -> str:
+    """返回查询计划文本"""
+    compiled = stmt.compile(dialect=connection.dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+        return '\n'.join(row[-1] for row in rows)
+    rows = connection.exec_driver_sql('EXPLAIN ' + str(compiled), params).all()
+    return '\n'.join(row[0] for row in rows)
+
+def main() -> int:
+    from app import app
+    import models
+
+    failures = 0
+    with app.app_context():
+        models.db.create_all()
+        models.migrate_schema()
+
+        with models.db.engine.connect() as connection:
+            if connection.dialect.name == 'postgresql':
+                # 小表上 PostgreSQL 会倾向顺序扫描，这里只检查索引是否可用
+                connection.execute(text('SET enable_seqscan = off'))
+
+            for description, stmt, expected_indexes in hot_queries(models):
+                plan = explain(connection, stmt)
+                ok = any(index in plan for index in expected_indexes)
+                failures += 0 if ok else 1
+                print(f"[{'OK' if ok else 'FAIL'}] {description}: 预期索引 {' / '.join(expected_indexes)}")
+                if not ok:
+                    print('    ' + plan.replace('\n', '\n    '))
+
+    print(f"{failures} 个查询未命中预期索引" if failures else '所有热点查询均命中索引')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+题目目录缓存（进程内读穿透）
+
+知识点和题目几乎不变，按 ID 查找和序列化它们的请求（知识点列表、题目详情、
+学习路径）可以完全不访问数据库：
+
+- CatalogSnapshot: 某一目录版本的快照。知识点全量加载，题目和知识点题目列表按需
+  加载并按 LRU 保留，条目数有上限。快照中的字典与 to_dict() 输出一致，调用方不得修改
+- 失效: 会话 flush 或批量执行（executemany / UPDATE / DELETE）涉及 Question、KnowledgePoint
+  时，提交前把 catalog_version 表中的版本号加一，提交后丢弃本进程的快照
+- 跨进程: 其他工作进程每隔 version_check_seconds 读取一次版本号，变化时重建快照；
+  设为 0 时只做本进程失效（单进程部署）
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, CatalogVersion, KnowledgePoint, Question, on_conflict_update, upsert_insert
+from serializers import knowledge_point_serializer, question_serializer
+
+# 会话 info 中标记本事务修改了目录的键
+_CHANGED_KEY = 'catalog_changed'
+
+CATALOG_MODELS = (Question, KnowledgePoint)
+
+def get_catalog_version() -> int:
+    """读取目录版本号，不存在时初始化为0"""
+    version = db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar()
+    if version is None:
+        try:
+            db.session.add(CatalogVersion(id=1, version=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        version = db.session.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1)).scalar()
+    return version
+
+class _LRU:
+    """线程安全的定长 LRU（None 也作为结果缓存，用于记住不存在的ID）"""
+
+    _MISSING = object()
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            value = self._items.get(key, self._MISSING)
+            if value is not self._MISSING:
+                self._items.move_to_end(key)
+            return value if value is not self._MISSING else default
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+class CatalogSnapshot:
+    """某一目录版本的快照"""
+
+    missing = _LRU._MISSING
+
+    def __init__(self, version: int, knowledge_points: Dict[int, Dict], max_questions: int):
+        self.version = version
+        self.knowledge_points = knowledge_points
+        self.knowledge_point_list = [knowledge_points[kp_id] for kp_id in sorted(knowledge_points)]
+        self.questions = _LRU(max_questions)
+        self.knowledge_point_question_ids = _LRU(max(len(knowledge_points), 1))
+
+    def serialize_question(self, question) -> Dict:
+        data = question_serializer(question)
+        data['knowledge_point'] = self.knowledge_points.get(question.knowledge_point_id)
+        return data
+
+class CatalogCache:
+    """题目目录缓存（需在应用上下文中调用查询方法）"""
+
+    def __init__(self, max_questions: int = 10000, version_check_seconds: float = 2.0):
+        self.max_questions = max_questions
+        self.version_check_seconds = version_check_seconds
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        config = app.config.get('CATALOG_CACHE_CONFIG') or {}
+        self.max_questions = config.get('max_questions', self.max_questions)
+        self.version_check_seconds = config.get('version_check_seconds', self.version_check_seconds)
+        self._register_session_events()
+
+    # ---------- 失效 ----------
+
+    def _register_session_events(self):
+        session_class = db.session.session_factory.class_
+
+        @event.listens_for(session_class, 'after_flush')
+        def mark_flushed_changes(session, flush_context):
+            if any(isinstance(obj, CATALOG_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+                session.info[_CHANGED_KEY] = True
+
+        @event.listens_for(session_class, 'do_orm_execute')
+        def mark_bulk_changes(orm_execute_state):
+            if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+                return
+            if orm_execute_state.bind_mapper.class_ in CATALOG_MODELS:
+                orm_execute_state.session.info[_CHANGED_KEY] = True
+
+        @event.listens_for(session_class, 'before_commit')
+        def bump_version(session):
+            # before_commit 在提交时的自动 flush 之前触发，先 flush 才能发现待写入的目录修改
+            session.flush()
+            if session.info.get(_CHANGED_KEY):
+                stmt = upsert_insert(CatalogVersion).values(id=1, version=1)
+                session.execute(on_conflict_update(stmt, [CatalogVersion.id],
+                                                   {'version': CatalogVersion.version + 1}))
+
+        @event.listens_for(session_class, 'after_commit')
+        def drop_snapshot(session):
+            if session.info.pop(_CHANGED_KEY, False):
+                self.invalidate()
+
+        @event.listens_for(session_class, 'after_rollback')
+        def clear_mark(session):
+            session.info.pop(_CHANGED_KEY, None)
+
+    def invalidate(self):
+        """丢弃本进程的快照，下次查询时重新加载"""
+        with self._lock:
+            self._snapshot = None
+
+    # ---------- 快照 ----------
+
+    def snapshot(self) -> CatalogSnapshot:
+        """返回当前版本的快照，必要时检查版本号并重建"""
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None:
+            if self.version_check_seconds <= 0 or now - self._checked_at < self.version_check_seconds:
+                return snapshot
+            self._checked_at = now
+            if get_catalog_version() == snapshot.version:
+                return snapshot
+
+        # 先读版本号再加载数据：加载期间发生的修改会在下次检查时触发重建
+        version = get_catalog_version()
+        knowledge_points = {kp.id: knowledge_point_serializer(kp) for kp in KnowledgePoint.query.all()}
+        snapshot = CatalogSnapshot(version, knowledge_points, self.max_questions)
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = now
+        return snapshot
+
+    def get_knowledge_points(self) -> List[Dict]:
+        """全部知识点（按ID排序）"""
+        return self.snapshot().knowledge_point_list
+
+    def get_knowledge_point(self, kp_id: int) -> Optional[Dict]:
+        return self.snapshot().knowledge_points.get(kp_id)
+
+    def get_question(self, question_id: int) -> Optional[Dict]:
+        return self.get_questions([question_id]).get(question_id)
+
+    def get_questions(self, question_ids: Iterable[int]) -> Dict[int, Dict]:
+        """按ID批量取题目，未缓存的用一次查询加载；不存在的ID不出现在结果中"""
+        snapshot = self.snapshot()
+        found, missing = {}, []
+        for question_id in question_ids:
+            data = snapshot.questions.get(question_id)
+            if data is snapshot.missing:
+                missing.append(question_id)
+            elif data is not None:
+                found[question_id] = data
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if missing:
+            loaded = {question.id: question for question in Question.query.filter(Question.id.in_(missing))}
+            for question_id in missing:
+                question = loaded.get(question_id)
+                data = snapshot.serialize_question(question) if question is not None else None
+                snapshot.questions.put(question_id, data)
+                if data is not None:
+                    found[question_id] = data
+        return found
+
+    def get_knowledge_point_questions(self, kp_id: int, limit: Optional[int] = None) -> List[Dict]:
+        """知识点下的题目，按难度排序（与 order_by(Question.difficulty) 相同，同难度按ID）"""
+        snapshot = self.snapshot()
+        question_ids = snapshot.knowledge_point_question_ids.get(kp_id, None)
+        if question_ids is None:
+            question_ids = tuple(db.session.execute(
+                select(Question.id).where(Question.knowledge_point_id == kp_id)
+                .order_by(Question.difficulty, Question.id)
+            ).scalars())
+            snapshot.knowledge_point_question_ids.put(kp_id, question_ids)
+
+        question_ids = question_ids[:limit] if limit is not None else question_ids
+        questions = self.get_questions(question_ids)
+        return [questions[question_id] for question_id in question_ids if question_id in questions]
+
+    def get_stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'version': snapshot.version if snapshot else None,
+            'knowledge_points': len(snapshot.knowledge_points) if snapshot else 0,
+            'cached_questions': len(snapshot.questions) if snapshot else 0,
+            'hits': self.hits,
+            'misses': self.misses
+        }
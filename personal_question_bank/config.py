@@ -18,6 +18,21 @@ class Config:
         'pool_recycle': 300,
     }
     
+    # 只读副本（如 PostgreSQL 流复制备库），设置后只读接口的查询路由到副本
+    SQLALCHEMY_BINDS = {'replica': os.getenv('DATABASE_REPLICA_URL')} if os.getenv('DATABASE_REPLICA_URL') else {}
+    
+    # 异步服务模式（asgi.py）只读接口的连接地址，缺省由副本或主库地址换成异步驱动推导
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
+    
+    # SQLite 连接参数（按顺序在每个新连接上执行 PRAGMA，值为空时跳过）
+    # WAL 模式下读者与写者互不阻塞，synchronous=NORMAL 在 WAL 下仍保证数据库一致
+    SQLITE_PRAGMAS = {
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    }
+    
     # Judge0 API配置
     JUDGE0_API_URL = os.getenv('JUDGE0_API_URL', 'https://judge0-ce.p.rapidapi.com')
     RAPIDAPI_KEY = os.getenv('RAPIDAPI_KEY', '')
@@ -40,10 +55,19 @@ class Config:
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300
     
+    # 题目目录缓存：每个进程最多缓存的题目数、检查其他进程目录修改的间隔（秒，0 为不检查）
+    CATALOG_CACHE_CONFIG = {
+        'max_questions': int(os.getenv('CATALOG_CACHE_MAX_QUESTIONS', 10000)),
+        'version_check_seconds': float(os.getenv('CATALOG_VERSION_CHECK_SECONDS', 2.0))
+    }
+    
     # 日志配置
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'logs/app.log')
     
+    # 监控指标：接口耗时、SQL 统计，GET /metrics 输出 Prometheus 文本格式
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    
     # Session配置
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
@@ -54,10 +78,6 @@ class DevelopmentConfig(Config):
     """开发环境配置"""
     DEBUG = True
     TESTING = False
-    
-    # 开发环境使用SQLite
-    if not os.getenv('DATABASE_URL'):
-        SQLALCHEMY_DATABASE_URI = 'sqlite:///dev_question_bank.db'
 
 class TestingConfig(Config):
     """测试环境配置"""
@@ -75,10 +95,6 @@ class ProductionConfig(Config):
     DEBUG = False
     TESTING = False
     
-    # 生产环境必须使用环境变量中的数据库URL
-    if not os.getenv('DATABASE_URL'):
-        raise ValueError("生产环境必须设置DATABASE_URL环境变量")
-    
     # 生产环境安全配置
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
@@ -98,4 +114,10 @@ config = {
 def get_config():
     """获取当前配置"""
     config_name = os.getenv('FLASK_ENV', 'development')
-    return config.get(config_name, config['default'])
+    config_class = config.get(config_name, config['default'])
+    
+    # 生产环境必须使用环境变量中的数据库URL
+    if config_class is ProductionConfig and not os.getenv('DATABASE_URL'):
+        raise ValueError("生产环境必须设置DATABASE_URL环境变量")
+    
+    return config_class
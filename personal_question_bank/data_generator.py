@@ -1,7 +1,24 @@
+"""
+示例数据生成器
+
+- generate_sample_data: 固定的小规模示例数据（应用首次启动时使用）
+- generate_scale_data: 按参数生成任意规模的合成数据（用户能力、题目难度、答题耗时服从
+  给定分布，固定随机种子可复现），executemany 分块批量插入，知识点统计和每日活动
+  由一条 GROUP BY 推导
+
+    python data_generator.py
+    python data_generator.py scale --users 20000 --questions 50000 --records 5000000 --seed 42
+"""
 import random
 import json
+import time
 from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import func, insert, text
+
 from models import db, User, Question, LearningRecord, KnowledgePoint, UserKnowledgeStats
+from event_log import rebuild_daily_activity, rebuild_knowledge_stats
 
 def generate_sample_data():
     """生成示例数据"""
@@ -213,6 +230,7 @@ def generate_sample_data():
     
     # 4. 生成学习记录
     interaction_types = ["theory_read", "practice_code", "quick_answer", "deep_think", "review"]
+    record_rows = []
     
     for user in users:
         # 每个用户生成20-50条学习记录
@@ -266,50 +284,23 @@ def generate_sample_data():
             completed_time = datetime.utcnow() - timedelta(days=days_ago)
             started_time = completed_time - timedelta(seconds=time_spent)
             
-            record = LearningRecord(
-                user_id=user.id,
-                question_id=question.id,
-                is_correct=is_correct,
-                time_spent=time_spent,
-                user_answer=user_answer,
-                interaction_type=random.choice(interaction_types),
-                started_at=started_time,
-                completed_at=completed_time
-            )
-            
-            db.session.add(record)
+            record_rows.append({
+                'user_id': user.id,
+                'question_id': question.id,
+                'is_correct': is_correct,
+                'time_spent': time_spent,
+                'user_answer': user_answer,
+                'interaction_type': random.choice(interaction_types),
+                'started_at': started_time,
+                'completed_at': completed_time
+            })
     
-    # 5. 生成用户知识点统计
-    for user in users:
-        for kp in knowledge_points:
-            # 获取该用户在该知识点的所有记录
-            records = LearningRecord.query.join(Question).filter(
-                LearningRecord.user_id == user.id,
-                Question.knowledge_point_id == kp.id
-            ).all()
-            
-            if records:
-                total_attempts = len(records)
-                correct_attempts = sum(1 for r in records if r.is_correct)
-                total_time = sum(r.time_spent for r in records)
-                
-                # 计算掌握程度
-                accuracy = correct_attempts / total_attempts if total_attempts > 0 else 0
-                practice_frequency = min(total_attempts / 10.0, 1.0)
-                mastery_level = accuracy * 0.7 + practice_frequency * 0.3
-                
-                stats = UserKnowledgeStats(
-                    user_id=user.id,
-                    knowledge_point_id=kp.id,
-                    total_attempts=total_attempts,
-                    correct_attempts=correct_attempts,
-                    total_time_spent=total_time,
-                    average_time=total_time / total_attempts,
-                    mastery_level=mastery_level,
-                    last_practice_time=max(r.completed_at for r in records)
-                )
-                
-                db.session.add(stats)
+    # 学习记录不需要取回ID，一条 executemany 插入（逐个 add 时每条记录各执行一次 INSERT ... RETURNING）
+    db.session.execute(insert(LearningRecord), record_rows)
+    
+    # 5. 由学习记录一次 GROUP BY 推导用户知识点统计（内部提交）
+    db.session.flush()
+    rebuild_knowledge_stats()
     
     # 提交所有更改
     db.session.commit()
@@ -321,8 +312,226 @@ def generate_sample_data():
     print(f"- 学习记录: {LearningRecord.query.count()} 条")
     print(f"- 知识点统计: {UserKnowledgeStats.query.count()} 条")
 
-if __name__ == "__main__":
+# ==================== 规模化合成数据 ====================
+
+SCALE_CHUNK_SIZE = 50000
+
+KNOWLEDGE_CATEGORIES = ["数据结构", "算法", "编程语言", "编程思想"]
+QUESTION_TYPES = ["theory", "multiple_choice", "coding", "practical"]
+QUESTION_TYPE_WEIGHTS = [0.3, 0.3, 0.25, 0.15]
+DIFFICULTIES = ["easy", "medium", "hard"]
+DIFFICULTY_WEIGHTS = [0.35, 0.45, 0.2]
+# 各难度的基准预估时间（分钟）和答对概率的 logit 偏移
+DIFFICULTY_MINUTES = np.array([5, 12, 25])
+DIFFICULTY_OFFSET = np.array([-1.0, 0.0, 1.2])
+INTERACTION_TYPES = ["theory_read", "practice_code", "quick_answer", "deep_think", "review"]
+CHOICE_OPTIONS = json.dumps(["A", "B", "C", "D"])
+
+def _next_id(model) -> int:
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+def _sync_id_sequences(*models):
+    """显式写入ID后把 PostgreSQL 的自增序列推进到当前最大ID，否则之后的插入会主键冲突
+
+    SQLite 和 MySQL 的自增计数会自动越过显式写入的ID，无需处理。
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return
+    for model in models:
+        table = model.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+        ))
+
+def generate_scale_data(users: int = 1000, questions: int = 5000, knowledge_points: int = 50,
+                        records: int = 1000000, days: int = 365, seed: int = 42,
+                        chunk_size: int = SCALE_CHUNK_SIZE) -> dict:
+    """生成指定规模的合成数据并返回各表行数和耗时（需在应用上下文中调用）
+
+    分布：
+    - 用户能力 ~ N(0, 1)，活跃度 ~ 对数正态（少数用户贡献大部分记录）
+    - 题目难度按 35%/45%/20% 分布，热度 ~ 对数正态
+    - 答对概率 = sigmoid(能力 - 难度偏移 + 0.8)，整体正确率约 65%
+    - 耗时 = 预估时间 × 对数正态(0, 0.5)，答错时再长 25%
+    - 完成时间均匀分布在最近 days 天内，记录ID随完成时间递增
+
+    ID 接在已有数据之后分配，可向已有数据库追加（PostgreSQL 的自增序列随后推进到
+    最大ID）；相同参数和种子生成相同的数据（时间相对于当前时刻）。
+    """
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    # 1. 知识点
+    kp_base = _next_id(KnowledgePoint)
+    kp_ids = np.arange(kp_base, kp_base + knowledge_points)
+    kp_levels = rng.integers(1, 6, knowledge_points)
+    db.session.execute(insert(KnowledgePoint), [{
+        'id': int(kp_id),
+        'name': f'知识点{kp_id}',
+        'category': KNOWLEDGE_CATEGORIES[i % len(KNOWLEDGE_CATEGORIES)],
+        'description': f'合成知识点{kp_id}',
+        'difficulty_level': int(kp_levels[i])
+    } for i, kp_id in enumerate(kp_ids)])
+
+    # 2. 用户
+    user_base = _next_id(User)
+    user_ids = np.arange(user_base, user_base + users)
+    ability = rng.normal(0.0, 1.0, users)
+    activity = rng.lognormal(0.0, 1.0, users)
+    preferred = np.digitize(ability, [-0.43, 0.43])  # 按能力三等分：hard / medium / easy
+    interaction_prefs = rng.choice(["theory", "practice", "mixed"], users)
+    db.session.execute(insert(User), [{
+        'id': int(user_id),
+        'username': f'user_{user_id}',
+        'email': f'user_{user_id}@example.com',
+        'preferred_difficulty': DIFFICULTIES[2 - int(preferred[i])],
+        'preferred_question_types': json.dumps(QUESTION_TYPES[:2 + i % 3]),
+        'preferred_interaction_type': str(interaction_prefs[i])
+    } for i, user_id in enumerate(user_ids)])
+
+    # 3. 题目
+    question_base = _next_id(Question)
+    question_ids = np.arange(question_base, question_base + questions)
+    question_kps = kp_ids[rng.integers(0, knowledge_points, questions)]
+    difficulty = rng.choice(3, questions, p=DIFFICULTY_WEIGHTS)
+    question_types = rng.choice(len(QUESTION_TYPES), questions, p=QUESTION_TYPE_WEIGHTS)
+    estimated_minutes = np.maximum(
+        np.rint(DIFFICULTY_MINUTES[difficulty] * rng.lognormal(0.0, 0.3, questions)), 1
+    ).astype(int)
+    popularity = rng.lognormal(0.0, 1.0, questions)
+    letters = rng.integers(0, 4, questions)
+
+    correct_answers, wrong_answers = [], []
+    for i in range(questions):
+        question_type = QUESTION_TYPES[question_types[i]]
+        if question_type == "multiple_choice":
+            correct_answers.append("ABCD"[letters[i]])
+            wrong_answers.append("ABCD"[(letters[i] + 1) % 4])
+        elif question_type == "coding":
+            correct_answers.append("# 正确的代码实现\ndef solution():\n    return 'correct'")
+            wrong_answers.append("# 错误的代码实现\ndef solution():\n    return 'incorrect'")
+        else:
+            correct_answers.append(f"题目{question_ids[i]}的参考答案")
+            wrong_answers.append("错误的理论回答")
+
+    for offset in range(0, questions, chunk_size):
+        db.session.execute(insert(Question), [{
+            'id': int(question_ids[i]),
+            'title': f'知识点{question_kps[i]}练习题{question_ids[i]}',
+            'content': f'合成题目{question_ids[i]}：{DIFFICULTIES[difficulty[i]]} 难度的'
+                       f'{QUESTION_TYPES[question_types[i]]} 题',
+            'question_type': QUESTION_TYPES[question_types[i]],
+            'difficulty': DIFFICULTIES[difficulty[i]],
+            'estimated_time': int(estimated_minutes[i]),
+            'knowledge_point_id': int(question_kps[i]),
+            'options': CHOICE_OPTIONS if QUESTION_TYPES[question_types[i]] == "multiple_choice" else None,
+            'correct_answer': correct_answers[i],
+            'explanation': f'题目{question_ids[i]}的解析'
+        } for i in range(offset, min(offset + chunk_size, questions))])
+    _sync_id_sequences(KnowledgePoint, User, Question)
+    db.session.commit()
+
+    # 4. 学习记录：按时间顺序分块生成，每块覆盖 days 天中连续的一段
+    correct_answers = np.array(correct_answers, dtype=object)
+    wrong_answers = np.array(wrong_answers, dtype=object)
+    interaction_types = np.array(INTERACTION_TYPES, dtype=object)
+    user_weights = activity / activity.sum()
+    question_weights = popularity / popularity.sum()
+    estimated_seconds = estimated_minutes * 60
+    span_start = np.datetime64(datetime.utcnow().replace(microsecond=0) - timedelta(days=days), 's')
+    span_seconds = days * 86400
+    chunks = max(1, -(-records // chunk_size))
+
+    for index in range(chunks):
+        size = min(chunk_size, records - index * chunk_size)
+        if size <= 0:
+            break
+        user_index = rng.choice(users, size, p=user_weights)
+        question_index = rng.choice(questions, size, p=question_weights)
+
+        logit = ability[user_index] - DIFFICULTY_OFFSET[difficulty[question_index]] + 0.8
+        is_correct = rng.random(size) < 1.0 / (1.0 + np.exp(-logit))
+        time_spent = estimated_seconds[question_index] * rng.lognormal(0.0, 0.5, size)
+        time_spent = np.maximum(np.where(is_correct, time_spent, time_spent * 1.25), 5).astype(int)
+
+        window_start = span_seconds * index // chunks
+        window_end = span_seconds * (index + 1) // chunks
+        offsets = np.sort(rng.integers(window_start, max(window_end, window_start + 1), size))
+        completed = span_start + offsets.astype('timedelta64[s]')
+        started_at = completed - time_spent.astype('timedelta64[s]')
+        answers = np.where(is_correct, correct_answers[question_index], wrong_answers[question_index])
+
+        db.session.execute(insert(LearningRecord), [{
+            'user_id': user_id,
+            'question_id': question_id,
+            'is_correct': correct,
+            'time_spent': spent,
+            'user_answer': answer,
+            'interaction_type': interaction,
+            'started_at': start,
+            'completed_at': end
+        } for user_id, question_id, correct, spent, answer, interaction, start, end in zip(
+            user_ids[user_index].tolist(),
+            question_ids[question_index].tolist(),
+            is_correct.tolist(),
+            time_spent.tolist(),
+            answers.tolist(),
+            interaction_types[rng.integers(0, len(INTERACTION_TYPES), size)].tolist(),
+            started_at.astype('datetime64[us]').tolist(),
+            completed.astype('datetime64[us]').tolist()
+        )])
+        db.session.commit()
+    records_seconds = time.perf_counter() - started
+
+    # 5. 知识点统计和每日活动各用一条 GROUP BY 推导
+    rebuild_knowledge_stats()
+    rebuild_daily_activity()
+
+    return {
+        'users': users,
+        'knowledge_points': knowledge_points,
+        'questions': questions,
+        'learning_records': records,
+        'knowledge_stats': UserKnowledgeStats.query.count(),
+        'insert_seconds': round(records_seconds, 2),
+        'elapsed_seconds': round(time.perf_counter() - started, 2)
+    }
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='示例数据生成器')
+    subparsers = parser.add_subparsers(dest='command')
+    scale = subparsers.add_parser('scale', help='按规模生成合成数据')
+    scale.add_argument('--users', type=int, default=1000)
+    scale.add_argument('--questions', type=int, default=5000)
+    scale.add_argument('--knowledge-points', type=int, default=50)
+    scale.add_argument('--records', type=int, default=1000000)
+    scale.add_argument('--days', type=int, default=365, help='学习记录分布的天数')
+    scale.add_argument('--seed', type=int, default=42)
+    scale.add_argument('--chunk-size', type=int, default=SCALE_CHUNK_SIZE)
+    args = parser.parse_args()
+
     from app import app
+    from models import migrate_schema
+    from search import ensure_search_index
     with app.app_context():
         db.create_all()
-        generate_sample_data()
+        migrate_schema()
+        ensure_search_index()
+        if args.command != 'scale':
+            generate_sample_data()
+            return
+        report = generate_scale_data(args.users, args.questions, args.knowledge_points, args.records,
+                                     args.days, args.seed, args.chunk_size)
+
+    print("成功生成数据：")
+    print(f"- 用户: {report['users']} 个")
+    print(f"- 知识点: {report['knowledge_points']} 个")
+    print(f"- 题目: {report['questions']} 个")
+    print(f"- 学习记录: {report['learning_records']} 条（写入 {report['insert_seconds']}s）")
+    print(f"- 知识点统计: {report['knowledge_stats']} 条")
+    print(f"- 总耗时: {report['elapsed_seconds']}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+数据库连接层
+
+- init_database: 按 config.get_config() 的配置初始化 Flask-SQLAlchemy，检查数据库类型，
+  并为 SQLite 连接执行 SQLITE_PRAGMAS（WAL / synchronous=NORMAL / mmap 等）
+- RoutingSession + use_read_replica: 配置了 replica 绑定（DATABASE_REPLICA_URL）时，
+  被装饰的只读接口的查询走副本，写入和 flush 始终走主库
+- create_async_sessionmaker: 异步服务模式（asgi.py）只读接口使用的 AsyncSession，
+  连接地址由副本（未配置时为主库）地址换成异步驱动推导，也可用 ASYNC_DATABASE_URL 指定
+"""
+import sqlite3
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from flask import Response
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# 只读副本在 SQLALCHEMY_BINDS 中的键名
+REPLICA_BIND_KEY = 'replica'
+
+_read_replica = ContextVar('read_replica', default=False)
+
+# 支持的数据库：答题统计等写入路径依赖原子 upsert（models.upsert_insert）
+SUPPORTED_DIALECTS = ('postgresql', 'sqlite', 'mysql', 'mariadb')
+
+# 同步驱动到异步驱动的对应关系
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+class RoutingSession(Session):
+    """读写分离会话：处于只读上下文且未在 flush 时，把默认绑定的查询路由到副本"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _read_replica.get() and not self._flushing:
+            replica = self._db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+def use_read_replica(view):
+    """视图装饰器：请求期间的查询使用只读副本（未配置副本时不生效）
+
+    副本存在复制延迟，只用于不要求读到本次会话刚写入数据的接口。
+    流式响应的查询在视图返回后才执行，响应体的每次迭代同样处于只读上下文。
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _read_replica.set(True)
+        try:
+            rv = view(*args, **kwargs)
+        finally:
+            _read_replica.reset(token)
+        if isinstance(rv, Response) and rv.is_streamed:
+            rv.response = _iter_on_replica(rv.response)
+        return rv
+    return wrapper
+
+def _iter_on_replica(iterable):
+    # 每一步单独设置上下文变量：WSGI 服务器可能在不同的上下文中迭代响应体
+    iterator = iter(iterable)
+    try:
+        while True:
+            token = _read_replica.set(True)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _read_replica.reset(token)
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            if value is None or value == '':
+                continue
+            try:
+                cursor.execute(f'PRAGMA {name} = {value}')
+            except sqlite3.OperationalError as e:
+                # 如只读文件系统上无法切换到 WAL，保持 SQLite 默认设置
+                print(f"SQLite 参数 {name}={value} 设置失败: {e}")
+    finally:
+        cursor.close()
+
+def check_dialect(dialect_name: str):
+    """不支持的数据库在启动时报错，而不是在第一次写入时失败"""
+    if dialect_name not in SUPPORTED_DIALECTS:
+        raise ValueError(f"不支持的数据库: {dialect_name}（支持 PostgreSQL、SQLite、MySQL/MariaDB）")
+
+def init_database(app, db):
+    """初始化数据库扩展（app.config 需已加载 config.get_config() 的配置）"""
+    db.init_app(app)
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        for engine in db.engines.values():
+            check_dialect(engine.dialect.name)
+            if engine.dialect.name == 'sqlite' and pragmas:
+                event.listen(engine, 'connect', partial(_apply_sqlite_pragmas, pragmas=pragmas))
+
+def create_async_sessionmaker(app, db):
+    """创建只读接口使用的 async_sessionmaker（需先调用 init_database）"""
+    from sqlalchemy.engine import make_url
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    url = app.config.get('ASYNC_DATABASE_URL')
+    if url:
+        url = make_url(url)
+    else:
+        with app.app_context():
+            engine = db.engines.get(REPLICA_BIND_KEY) or db.engine
+            # 使用已解析的地址（SQLite 相对路径已由 Flask-SQLAlchemy 转换到 instance 目录）
+            url = engine.url
+        backend = url.get_backend_name()
+        if backend not in ASYNC_DRIVERS:
+            raise ValueError(f"数据库 {backend} 没有对应的异步驱动，请设置 ASYNC_DATABASE_URL")
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+
+    async_engine = create_async_engine(url, **(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}))
+
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if url.get_backend_name() == 'sqlite' and pragmas:
+        event.listen(async_engine.sync_engine, 'connect', partial(_apply_sqlite_pragmas, pragmas=pragmas))
+    return async_sessionmaker(async_engine, expire_on_commit=False)
@@ -0,0 +1,405 @@
+"""
+答题事件日志（write-behind）
+
+提交答案时只写入学习记录和一条答题事件，知识点统计和每日活动汇总
+由后台消费者批量处理，新增消费者不会增加提交接口的延迟。
+
+推荐引擎的用户画像每次请求时由知识点统计和学习记录现算，没有需要另行维护的画像状态；
+答题也不影响进程内缓存（题目目录只随题目和知识点变化，群体分析按 TTL 过期），
+因此目前只有这两个消费者。
+
+每个消费者在 event_consumer_offsets 表中记录自己处理到的事件ID，
+处理结果与位置更新在同一事务中提交，失败时整批回滚重试（至少一次语义）。
+位置更新使用比较并交换，多个工作进程同时运行时同一批事件只会被一个进程处理。
+
+- 自增ID的提交顺序可能与分配顺序不同（PostgreSQL、MySQL），处理位置只推进到
+  连续的ID为止，遇到ID空洞时等待较小ID的事务提交，超过 gap_timeout 秒才认为其已回滚
+- 单个消费者出错只记录日志，不影响其他消费者；整批失败后逐条重试，
+  同一事件连续失败 max_attempts 次后写入 answer_event_dead_letters 并跳过
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Float, case, cast, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import (db, AnswerEvent, AnswerEventDeadLetter, EventConsumerOffset, UserKnowledgeStats,
+                    DailyUserActivity, LearningRecord, Question, mastery_level_expression, union_learning_records)
+
+logger = logging.getLogger(__name__)
+
+def build_answer_event(learning_record, knowledge_point_id: int) -> AnswerEvent:
+    """为学习记录创建答题事件（由调用方加入同一事务）"""
+    return AnswerEvent(
+        learning_record=learning_record,
+        user_id=learning_record.user_id,
+        question_id=learning_record.question_id,
+        knowledge_point_id=knowledge_point_id,
+        is_correct=learning_record.is_correct,
+        time_spent=learning_record.time_spent,
+        completed_at=learning_record.completed_at
+    )
+
+def visible_prefix_length(offset: int, rows: Iterable[Tuple[int, Optional[datetime]]],
+                          gap_timeout: float) -> int:
+    """按ID升序的 (ID, 写入时间) 中可以推进处理位置的前缀长度
+
+    自增ID按分配顺序递增，但事务不一定按此顺序提交：空洞处可能是还未提交的行，
+    越过它推进处理位置会永久漏掉该行。空洞之后的行写入超过 gap_timeout 秒时
+    （写入时间未知的视为很早写入），空洞对应的事务只可能已回滚（或已被归档删除），此时越过空洞。
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=gap_timeout)
+    expected = offset + 1
+    length = 0
+    for row_id, written_at in rows:
+        if row_id != expected and written_at is not None and written_at > cutoff:
+            break
+        expected = row_id + 1
+        length += 1
+    return length
+
+class AnswerEventConsumer:
+    """答题事件消费者基类"""
+
+    name = None
+
+    def handle(self, events: List[AnswerEvent]):
+        """在事务内处理一批事件，抛出异常时整批回滚并重试"""
+        raise NotImplementedError
+
+class KnowledgeStatsConsumer(AnswerEventConsumer):
+    """按 (用户, 知识点) 聚合事件并更新 UserKnowledgeStats"""
+
+    name = 'knowledge_stats'
+
+    def handle(self, events: List[AnswerEvent]):
+        deltas = defaultdict(dict)
+        for event in events:
+            delta = deltas[event.user_id].setdefault(event.knowledge_point_id, {
+                'attempts': 0, 'correct': 0, 'time_spent': 0, 'practiced_at': event.completed_at
+            })
+            delta['attempts'] += 1
+            delta['correct'] += 1 if event.is_correct else 0
+            delta['time_spent'] += event.time_spent
+            delta['practiced_at'] = max(delta['practiced_at'], event.completed_at)
+
+        for user_id, user_deltas in deltas.items():
+            UserKnowledgeStats.apply_attempt_deltas(user_id, user_deltas)
+
+class DailyActivityConsumer(AnswerEventConsumer):
+    """按 (用户, 日期, 知识点) 聚合事件并累加到 daily_user_activity"""
+
+    name = 'daily_activity'
+
+    def handle(self, events: List[AnswerEvent]):
+        rows = {}
+        for event in events:
+            key = (event.user_id, event.completed_at.date(), event.knowledge_point_id)
+            row = rows.setdefault(key, {
+                'user_id': key[0],
+                'activity_date': key[1],
+                'knowledge_point_id': key[2],
+                'attempts': 0,
+                'correct_attempts': 0,
+                'time_spent': 0
+            })
+            row['attempts'] += 1
+            row['correct_attempts'] += 1 if event.is_correct else 0
+            row['time_spent'] += event.time_spent
+
+        DailyUserActivity.apply_deltas(list(rows.values()))
+
+def get_consumer_offset(consumer_name: str) -> int:
+    """读取消费者处理位置，不存在时初始化为0"""
+    offset = db.session.get(EventConsumerOffset, consumer_name, populate_existing=True)
+    if offset is None:
+        try:
+            db.session.add(EventConsumerOffset(consumer=consumer_name, last_event_id=0))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        offset = db.session.get(EventConsumerOffset, consumer_name, populate_existing=True)
+    return offset.last_event_id
+
+def rebuild_daily_activity():
+    """从学习记录（含已归档记录）全量重建 daily_user_activity
+
+    先在事务中锁定 daily_activity 消费者的处理位置，尚未消费的事件对应的记录
+    留给消费者累加，避免重建与增量维护重复计数。
+    """
+    consumer_name = DailyActivityConsumer.name
+    get_consumer_offset(consumer_name)
+
+    db.session.execute(
+        update(EventConsumerOffset)
+        .where(EventConsumerOffset.consumer == consumer_name)
+        .values(updated_at=datetime.utcnow())
+    )
+    offset = db.session.get(EventConsumerOffset, consumer_name, populate_existing=True).last_event_id
+    pending_record_ids = select(AnswerEvent.learning_record_id).where(AnswerEvent.id > offset)
+
+    # 已归档记录的事件都已被消费，与热表记录一并重新聚合
+    records = union_learning_records(
+        lambda records: select(records.user_id, records.question_id, records.is_correct,
+                               records.time_spent, records.completed_at)
+        .where(records.completed_at.isnot(None), records.id.notin_(pending_record_ids))
+    ).subquery()
+
+    activity_date = func.date(records.c.completed_at)
+    aggregated = select(
+        records.c.user_id,
+        activity_date,
+        Question.knowledge_point_id,
+        func.count(),
+        func.sum(case((records.c.is_correct, 1), else_=0)),
+        func.sum(records.c.time_spent)
+    ).join(Question, records.c.question_id == Question.id)\
+     .group_by(records.c.user_id, activity_date, Question.knowledge_point_id)
+
+    db.session.execute(delete(DailyUserActivity))
+    db.session.execute(insert(DailyUserActivity).from_select([
+        'user_id', 'activity_date', 'knowledge_point_id', 'attempts', 'correct_attempts', 'time_spent'
+    ], aggregated))
+    db.session.commit()
+
+def rebuild_knowledge_stats():
+    """从学习记录（含已归档记录）用一条 GROUP BY 全量重建 UserKnowledgeStats
+
+    与 rebuild_daily_activity 相同，尚未被 knowledge_stats 消费者处理的事件对应的记录
+    留给消费者累加。
+    """
+    consumer_name = KnowledgeStatsConsumer.name
+    get_consumer_offset(consumer_name)
+
+    db.session.execute(
+        update(EventConsumerOffset)
+        .where(EventConsumerOffset.consumer == consumer_name)
+        .values(updated_at=datetime.utcnow())
+    )
+    offset = db.session.get(EventConsumerOffset, consumer_name, populate_existing=True).last_event_id
+    pending_record_ids = select(AnswerEvent.learning_record_id).where(AnswerEvent.id > offset)
+
+    records = union_learning_records(
+        lambda records: select(records.user_id, records.question_id, records.is_correct,
+                               records.time_spent, records.completed_at)
+        .where(records.id.notin_(pending_record_ids))
+    ).subquery()
+
+    total = func.count()
+    correct = func.sum(case((records.c.is_correct, 1), else_=0))
+    time_total = func.sum(records.c.time_spent)
+    aggregated = select(
+        records.c.user_id,
+        Question.knowledge_point_id,
+        total,
+        correct,
+        time_total,
+        cast(time_total, Float) / total,
+        mastery_level_expression(correct, total),
+        func.max(records.c.completed_at)
+    ).join(Question, records.c.question_id == Question.id)\
+     .group_by(records.c.user_id, Question.knowledge_point_id)
+
+    db.session.execute(delete(UserKnowledgeStats))
+    db.session.execute(insert(UserKnowledgeStats).from_select([
+        'user_id', 'knowledge_point_id', 'total_attempts', 'correct_attempts', 'total_time_spent',
+        'average_time', 'mastery_level', 'last_practice_time'
+    ], aggregated))
+    db.session.commit()
+
+def backfill_daily_activity():
+    """汇总表为空而已有学习记录时（如升级已有数据库）执行一次全量重建"""
+    if DailyUserActivity.query.first() is None and LearningRecord.query.first() is not None:
+        rebuild_daily_activity()
+
+class AnswerEventProcessor:
+    """答题事件处理器，可在后台线程中运行，也可在请求内同步调用"""
+
+    def __init__(self, consumers: List[AnswerEventConsumer], batch_size: int = 500,
+                 poll_interval: float = 1.0, gap_timeout: float = 60.0, max_attempts: int = 3):
+        self.consumers = consumers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        # ID空洞（较小ID的事务未提交）之后的事件等待的最长时间，需大于写入答题事件的事务耗时
+        self.gap_timeout = gap_timeout
+        # 单个事件连续失败多少次后写入死信表并跳过
+        self.max_attempts = max_attempts
+        self.app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        # 消费者名 -> 逐条重试状态 {'until': 失败批次的最后事件ID, 'event_id': 最近失败的事件ID, 'attempts': 次数}
+        self._retrying = {}
+
+    def init_app(self, app):
+        self.app = app
+
+    def process_pending(self) -> int:
+        """处理所有消费者的积压事件，返回处理的事件数
+
+        某个消费者出错时记录日志并转到下一个消费者，出错的事件在下次调用时重试。
+        """
+        processed = 0
+        for consumer in self.consumers:
+            while True:
+                # 整批失败后逐条处理，找出无法处理的事件
+                limit = 1 if consumer.name in self._retrying else self.batch_size
+                try:
+                    count = self._process_batch(consumer, limit)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("答题事件消费者 %s 处理失败，稍后重试", consumer.name)
+                    break
+                processed += count
+                if count < limit:
+                    break
+        return processed
+
+    def _visible_prefix(self, offset: int, events: List[AnswerEvent]) -> List[AnswerEvent]:
+        """去掉第一个尚不能越过的ID空洞之后的事件"""
+        return events[:visible_prefix_length(offset, ((event.id, event.created_at) for event in events),
+                                             self.gap_timeout)]
+
+    def _process_batch(self, consumer: AnswerEventConsumer, limit: int) -> int:
+        """处理一个消费者的一批事件"""
+        offset = get_consumer_offset(consumer.name)
+
+        events = AnswerEvent.query.filter(AnswerEvent.id > offset)\
+                                  .order_by(AnswerEvent.id).limit(limit).all()
+        events = self._visible_prefix(offset, events)
+
+        if not events:
+            db.session.rollback()
+            return 0
+
+        # 比较并交换处理位置，其他进程已领取这批事件时放弃
+        claimed = db.session.execute(
+            update(EventConsumerOffset)
+            .where(EventConsumerOffset.consumer == consumer.name,
+                   EventConsumerOffset.last_event_id == offset)
+            .values(last_event_id=events[-1].id, updated_at=datetime.utcnow())
+        ).rowcount
+        if claimed != 1:
+            db.session.rollback()
+            return 0
+
+        # 事件只读：从会话分离，回滚后读取属性时不会逐条重新查询
+        for answer_event in events:
+            db.session.expunge(answer_event)
+        try:
+            consumer.handle(events)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            if not self._handle_failure(consumer, offset, events, e):
+                raise
+            return 1
+
+        retrying = self._retrying.get(consumer.name)
+        if retrying is not None and events[-1].id >= retrying['until']:
+            del self._retrying[consumer.name]
+        return len(events)
+
+    def _handle_failure(self, consumer: AnswerEventConsumer, offset: int, events: List[AnswerEvent],
+                        error: Exception) -> bool:
+        """记录失败；同一事件连续失败 max_attempts 次时写入死信表并跳过，返回是否已跳过"""
+        if len(events) > 1:
+            # 整批失败：之后逐条处理到这批的最后一个事件
+            self._retrying[consumer.name] = {'until': events[-1].id, 'event_id': None, 'attempts': 0}
+            return False
+
+        event = events[0]
+        retrying = self._retrying.setdefault(consumer.name, {'until': event.id, 'event_id': None, 'attempts': 0})
+        if retrying['event_id'] != event.id:
+            retrying['event_id'], retrying['attempts'] = event.id, 0
+        retrying['attempts'] += 1
+        if retrying['attempts'] < self.max_attempts:
+            return False
+
+        claimed = db.session.execute(
+            update(EventConsumerOffset)
+            .where(EventConsumerOffset.consumer == consumer.name,
+                   EventConsumerOffset.last_event_id == offset)
+            .values(last_event_id=event.id, updated_at=datetime.utcnow())
+        ).rowcount
+        if claimed == 1:
+            db.session.add(AnswerEventDeadLetter(consumer=consumer.name, event_id=event.id,
+                                                 error=f"{type(error).__name__}: {error}"))
+        db.session.commit()
+        retrying['event_id'], retrying['attempts'] = None, 0
+        if event.id >= retrying['until']:
+            del self._retrying[consumer.name]
+        logger.error("答题事件 %s 被消费者 %s 连续处理失败 %s 次，已写入死信表并跳过",
+                     event.id, consumer.name, self.max_attempts, exc_info=error)
+        return True
+
+    def get_lag(self) -> Dict:
+        """各消费者的积压情况：未处理事件数、最早未处理事件的等待秒数和死信事件数"""
+        latest_id = db.session.query(func.max(AnswerEvent.id)).scalar() or 0
+        dead_letters = dict(db.session.query(AnswerEventDeadLetter.consumer, func.count(AnswerEventDeadLetter.id))
+                                      .group_by(AnswerEventDeadLetter.consumer).all())
+        now = datetime.utcnow()
+
+        lag = {}
+        for consumer in self.consumers:
+            offset = get_consumer_offset(consumer.name)
+            oldest_pending = db.session.query(func.min(AnswerEvent.created_at))\
+                                       .filter(AnswerEvent.id > offset).scalar()
+            lag[consumer.name] = {
+                'last_event_id': offset,
+                'pending_events': max(latest_id - offset, 0),
+                'lag_seconds': (now - oldest_pending).total_seconds() if oldest_pending else 0.0,
+                'dead_letters': dead_letters.get(consumer.name, 0)
+            }
+        return lag
+
+    def ensure_started(self):
+        """启动后台处理线程（已启动时直接返回）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='answer-event-processor', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """停止后台处理线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    processed = self.process_pending()
+            except Exception:
+                logger.exception("处理答题事件时出错")
+                processed = 0
+
+            if not processed:
+                self._stop_event.wait(self.poll_interval)
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='答题事件日志维护')
+    parser.add_argument('command', choices=['process', 'rebuild-daily-activity', 'rebuild-knowledge-stats'],
+                        help='process: 处理一次积压事件; rebuild-daily-activity: 重建每日活动汇总表; '
+                             'rebuild-knowledge-stats: 重建知识点统计')
+    args = parser.parse_args()
+
+    from app import app, event_processor
+    with app.app_context():
+        if args.command == 'process':
+            print(f"处理事件: {event_processor.process_pending()} 条")
+        elif args.command == 'rebuild-knowledge-stats':
+            rebuild_knowledge_stats()
+            print(f"知识点统计重建完成: {UserKnowledgeStats.query.count()} 行")
+        else:
+            rebuild_daily_activity()
+            print(f"每日活动汇总重建完成: {DailyUserActivity.query.count()} 行")
@@ -0,0 +1,103 @@
+"""
+学习记录流式导出
+
+通过 Core 连接和 yield_per 分批读取（PostgreSQL 上为服务端游标），
+逐批编码为 CSV 或 NDJSON，可选 gzip 压缩，内存占用与导出规模无关。
+
+热表和归档表各自按主键顺序读取，在应用内归并为按记录ID排序的单一流，
+数据库不必对两表的 UNION ALL 整体排序。每个用户最近的记录无论多旧都留在热表，
+两表的ID区间会交错，因此不能简单地先导出归档表再导出热表。
+"""
+import csv
+import heapq
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+
+from models import db, ArchivedLearningRecord, LearningRecord, Question
+
+EXPORT_COLUMNS = [
+    'id', 'user_id', 'question_id', 'knowledge_point_id', 'question_type', 'difficulty',
+    'is_correct', 'time_spent', 'attempt_count', 'interaction_type', 'user_answer',
+    'started_at', 'completed_at'
+]
+
+def build_export_queries(user_ids: Optional[List[int]] = None, start: datetime = None, end: datetime = None):
+    """构造列投影的导出查询：[归档表, 热表]，各自按记录ID排序"""
+    def build(records):
+        stmt = select(
+            records.id.label('id'),
+            records.user_id,
+            records.question_id,
+            Question.knowledge_point_id,
+            Question.question_type,
+            Question.difficulty,
+            records.is_correct,
+            records.time_spent,
+            records.attempt_count,
+            records.interaction_type,
+            records.user_answer,
+            records.started_at,
+            records.completed_at
+        ).join(Question, records.question_id == Question.id)
+
+        if user_ids:
+            stmt = stmt.where(records.user_id.in_(user_ids))
+        if start:
+            stmt = stmt.where(records.completed_at >= start)
+        if end:
+            stmt = stmt.where(records.completed_at <= end)
+        return stmt.order_by(records.id)
+
+    return [build(ArchivedLearningRecord.__table__.c), build(LearningRecord.__table__.c)]
+
+def iter_record_batches(stmts, batch_size: int = 5000) -> Iterator[List[Dict]]:
+    """归并各个按ID排序的查询，按批次产出记录字典"""
+    connection = db.session.connection().execution_options(yield_per=batch_size)
+    rows = heapq.merge(*(connection.execute(stmt) for stmt in stmts), key=itemgetter(0))
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield [dict(zip(EXPORT_COLUMNS, row)) for row in batch]
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_csv(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    """编码为 CSV，每批输出一段文本"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for record in batch:
+            writer.writerow([_format_value(record[column]) for column in EXPORT_COLUMNS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def encode_ndjson(batches: Iterator[List[Dict]]) -> Iterator[str]:
+    """编码为 NDJSON（每行一个 JSON 对象）"""
+    for batch in batches:
+        yield ''.join(
+            json.dumps({key: _format_value(value) for key, value in record.items()}, ensure_ascii=False) + '\n'
+            for record in batch
+        )
+
+def gzip_stream(chunks: Iterator[str]) -> Iterator[bytes]:
+    """增量 gzip 压缩文本流"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
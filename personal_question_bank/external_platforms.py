@@ -1,8 +1,21 @@
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import os
+import time
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 import base64
+from urllib.parse import urlparse
+
+from metrics import JUDGE_REQUEST_SECONDS
+from resilience import AdaptiveConcurrencyLimiter, CircuitBreaker, ConcurrencyLimitExceeded
+
+try:
+    import httpx
+except ImportError:  # httpx 为可选依赖，仅异步服务模式（asgi.py）需要
+    httpx = None
 
 @dataclass
 class CodeExecutionResult:
@@ -14,6 +27,7 @@ class CodeExecutionResult:
     memory_usage: int = 0
     test_cases_passed: int = 0
     total_test_cases: int = 0
+    platform_error: bool = False  # 判题服务本身出错（网络、限流、熔断），而非代码问题
 
 class OnlineJudgeInterface:
     """在线评判系统接口基类"""
@@ -30,8 +44,22 @@ class OnlineJudgeInterface:
 class JudgeZeroAPI(OnlineJudgeInterface):
     """Judge0 API集成 - 免费的在线代码执行平台"""
     
-    def __init__(self, api_url: str = "https://judge0-ce.p.rapidapi.com"):
-        self.api_url = api_url
+    def __init__(self, api_url: str = "https://judge0-ce.p.rapidapi.com", timeout: float = 15.0,
+                 api_key: str = None):
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["X-RapidAPI-Key"] = api_key
+            self.headers["X-RapidAPI-Host"] = urlparse(self.api_url).netloc
+        
+        # 复用连接，避免每个测试用例都重新建立TCP/TLS连接
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=32))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=32))
+        # 异步客户端在首次异步调用时创建（绑定到当前事件循环）
+        self._async_client = None
+        self.async_max_connections = int(os.getenv('JUDGE0_ASYNC_MAX_CONNECTIONS', 100))
         self.language_map = {
             'python': 71,    # Python 3.8.1
             'java': 62,      # Java (OpenJDK 13.0.1)
@@ -46,98 +74,185 @@ class JudgeZeroAPI(OnlineJudgeInterface):
     def submit_code(self, code: str, language: str, problem_id: str = None) -> CodeExecutionResult:
         """提交代码执行"""
         if language not in self.language_map:
-            return CodeExecutionResult(
-                success=False,
-                output="",
-                error=f"不支持的编程语言: {language}"
-            )
+            return self._unsupported_language(language)
         
-        # 准备提交数据
-        submission_data = {
+        try:
+            reply = self._post_submission(self._submission_payload(code, self.language_map[language]))
+        except Exception as e:
+            reply = e
+        return self._submission_result(reply)
+    
+    def run_code(self, code: str, language: str, test_cases: List[Dict]) -> CodeExecutionResult:
+        """运行代码并测试用例"""
+        if not test_cases:
+            return self.submit_code(code, language)
+        
+        flow = self._test_case_flow(code, language, test_cases)
+        submission = next(flow)
+        while True:
+            try:
+                reply = self._post_submission(submission)
+            except Exception as e:
+                reply = e
+            try:
+                submission = flow.send(reply)
+            except StopIteration as stop:
+                return stop.value
+    
+    async def submit_code_async(self, code: str, language: str) -> CodeExecutionResult:
+        """submit_code 的异步版本（httpx.AsyncClient）"""
+        if language not in self.language_map:
+            return self._unsupported_language(language)
+        
+        try:
+            reply = await self._post_submission_async(self._submission_payload(code, self.language_map[language]))
+        except Exception as e:
+            reply = e
+        return self._submission_result(reply)
+    
+    async def run_code_async(self, code: str, language: str, test_cases: List[Dict]) -> CodeExecutionResult:
+        """run_code 的异步版本，测试用例仍按顺序提交"""
+        if not test_cases:
+            return await self.submit_code_async(code, language)
+        
+        flow = self._test_case_flow(code, language, test_cases)
+        submission = next(flow)
+        while True:
+            try:
+                reply = await self._post_submission_async(submission)
+            except Exception as e:
+                reply = e
+            try:
+                submission = flow.send(reply)
+            except StopIteration as stop:
+                return stop.value
+    
+    async def aclose(self):
+        """关闭异步HTTP客户端"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+    
+    def _submission_payload(self, code: str, language_id: int, stdin: str = "") -> Dict:
+        return {
             "source_code": base64.b64encode(code.encode()).decode(),
-            "language_id": self.language_map[language],
-            "stdin": base64.b64encode("".encode()).decode()
+            "language_id": language_id,
+            "stdin": base64.b64encode(stdin.encode()).decode()
         }
-        
+    
+    def _post_submission(self, submission_data: Dict):
+        """同步提交，返回 (状态码, 201 时的响应JSON)"""
+        started, status = time.perf_counter(), 'error'
+        try:
+            response = self.session.post(
+                f"{self.api_url}/submissions",
+                json=submission_data,
+                headers=self.headers,
+                params={"base64_encoded": "true", "wait": "true"},
+                timeout=self.timeout
+            )
+            status = response.status_code
+            return response.status_code, response.json() if response.status_code == 201 else None
+        finally:
+            JUDGE_REQUEST_SECONDS.observe(time.perf_counter() - started, str(status))
+    
+    async def _post_submission_async(self, submission_data: Dict):
+        """异步提交，返回值与 _post_submission 相同"""
+        if self._async_client is None:
+            if httpx is None:
+                raise RuntimeError("异步判题需要安装 httpx: pip install httpx")
+            self._async_client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.async_max_connections)
+            )
+        started, status = time.perf_counter(), 'error'
         try:
-            # 提交代码
-            response = requests.post(
+            response = await self._async_client.post(
                 f"{self.api_url}/submissions",
                 json=submission_data,
-                headers={"Content-Type": "application/json"},
+                headers=self.headers,
                 params={"base64_encoded": "true", "wait": "true"}
             )
-            
-            if response.status_code == 201:
-                result = response.json()
-                return self._parse_execution_result(result)
-            else:
-                return CodeExecutionResult(
-                    success=False,
-                    output="",
-                    error=f"提交失败: {response.status_code}"
-                )
-                
-        except Exception as e:
+            status = response.status_code
+            return response.status_code, response.json() if response.status_code == 201 else None
+        finally:
+            JUDGE_REQUEST_SECONDS.observe(time.perf_counter() - started, str(status))
+    
+    def _unsupported_language(self, language: str) -> CodeExecutionResult:
+        return CodeExecutionResult(
+            success=False,
+            output="",
+            error=f"不支持的编程语言: {language}"
+        )
+    
+    def _submission_result(self, reply) -> CodeExecutionResult:
+        """把单次提交的结果（(状态码, JSON) 或网络异常）转换为执行结果"""
+        if isinstance(reply, Exception):
             return CodeExecutionResult(
                 success=False,
                 output="",
-                error=f"网络错误: {str(e)}"
+                error=f"网络错误: {str(reply)}",
+                platform_error=True
             )
-    
-    def run_code(self, code: str, language: str, test_cases: List[Dict]) -> CodeExecutionResult:
-        """运行代码并测试用例"""
-        if not test_cases:
-            return self.submit_code(code, language)
         
+        status_code, result = reply
+        if status_code == 201:
+            return self._parse_execution_result(result)
+        return CodeExecutionResult(
+            success=False,
+            output="",
+            error=f"提交失败: {status_code}",
+            platform_error=True
+        )
+    
+    def _test_case_flow(self, code: str, language: str, test_cases: List[Dict]):
+        """逐个测试用例判题的流程（生成器，同步和异步客户端共用）
+
+        每次产出一份提交数据，调用方发送回 (状态码, 响应JSON) 或网络异常，
+        结束时通过 StopIteration.value 返回 CodeExecutionResult。
+        """
         passed_tests = 0
         total_tests = len(test_cases)
         all_outputs = []
         total_time = 0.0
+        platform_error = False
         
         for i, test_case in enumerate(test_cases):
             # 为每个测试用例准备输入
             test_input = test_case.get('input', '')
             expected_output = test_case.get('expected_output', '')
             
-            submission_data = {
-                "source_code": base64.b64encode(code.encode()).decode(),
-                "language_id": self.language_map.get(language, 71),
-                "stdin": base64.b64encode(test_input.encode()).decode()
-            }
+            reply = yield self._submission_payload(code, self.language_map.get(language, 71), test_input)
             
-            try:
-                response = requests.post(
-                    f"{self.api_url}/submissions",
-                    json=submission_data,
-                    headers={"Content-Type": "application/json"},
-                    params={"base64_encoded": "true", "wait": "true"}
-                )
+            if isinstance(reply, Exception):
+                all_outputs.append(f"测试用例 {i+1}: 网络错误 - {str(reply)}")
+                platform_error = True
+                break
+            
+            status_code, result = reply
+            if status_code == 201:
+                execution_result = self._parse_execution_result(result)
                 
-                if response.status_code == 201:
-                    result = response.json()
-                    execution_result = self._parse_execution_result(result)
+                if execution_result.success:
+                    actual_output = execution_result.output.strip()
+                    expected_output = expected_output.strip()
                     
-                    if execution_result.success:
-                        actual_output = execution_result.output.strip()
-                        expected_output = expected_output.strip()
-                        
-                        if actual_output == expected_output:
-                            passed_tests += 1
-                        
-                        all_outputs.append(f"测试用例 {i+1}: {'PASS' if actual_output == expected_output else 'FAIL'}")
-                        all_outputs.append(f"输入: {test_input}")
-                        all_outputs.append(f"期望输出: {expected_output}")
-                        all_outputs.append(f"实际输出: {actual_output}")
-                        all_outputs.append("---")
-                        
-                        total_time += execution_result.execution_time
-                    else:
-                        all_outputs.append(f"测试用例 {i+1}: ERROR - {execution_result.error}")
-                        break
-                        
-            except Exception as e:
-                all_outputs.append(f"测试用例 {i+1}: 网络错误 - {str(e)}")
+                    if actual_output == expected_output:
+                        passed_tests += 1
+                    
+                    all_outputs.append(f"测试用例 {i+1}: {'PASS' if actual_output == expected_output else 'FAIL'}")
+                    all_outputs.append(f"输入: {test_input}")
+                    all_outputs.append(f"期望输出: {expected_output}")
+                    all_outputs.append(f"实际输出: {actual_output}")
+                    all_outputs.append("---")
+                    
+                    total_time += execution_result.execution_time
+                else:
+                    all_outputs.append(f"测试用例 {i+1}: ERROR - {execution_result.error}")
+                    break
+            else:
+                all_outputs.append(f"测试用例 {i+1}: 提交失败 - {status_code}")
+                platform_error = True
                 break
         
         return CodeExecutionResult(
@@ -145,7 +260,8 @@ class JudgeZeroAPI(OnlineJudgeInterface):
             output="\n".join(all_outputs),
             execution_time=total_time,
             test_cases_passed=passed_tests,
-            total_test_cases=total_tests
+            total_test_cases=total_tests,
+            platform_error=platform_error
         )
     
     def _parse_execution_result(self, result: Dict) -> CodeExecutionResult:
@@ -228,6 +344,9 @@ class LeetCodeAPI:
         for slug, problem in self.problems.items():
             if difficulty and problem['difficulty'].lower() != difficulty.lower():
                 continue
+            # 模拟题库没有主题标签，按 slug/标题/描述做不区分大小写的子串匹配
+            if topic and topic.lower() not in ' '.join((slug, problem['title'], problem['description'])).lower():
+                continue
             problems.append({
                 'slug': slug,
                 'title': problem['title'],
@@ -239,15 +358,147 @@ class ExternalPlatformManager:
     """外部平台管理器"""
     
     def __init__(self):
-        self.judge_zero = JudgeZeroAPI()
+        # JUDGE0_API_URL 可指向自建 Judge0 或本地桩服务 (judge0_stub.py)
+        self.judge_zero = JudgeZeroAPI(
+            os.getenv('JUDGE0_API_URL', 'https://judge0-ce.p.rapidapi.com'),
+            api_key=os.getenv('RAPIDAPI_KEY')
+        )
         self.leetcode = LeetCodeAPI()
+        
+        # 备用判题服务（可选），主服务熔断或繁忙时使用
+        fallback_url = os.getenv('JUDGE0_FALLBACK_URL')
+        self.fallback_judge = JudgeZeroAPI(fallback_url, api_key=os.getenv('RAPIDAPI_KEY')) if fallback_url else None
+        
+        # 判题请求的自适应并发限制和熔断，防止Judge0变慢时阻塞所有工作线程
+        self.judge_limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=int(os.getenv('JUDGE0_INITIAL_CONCURRENCY', 4)),
+            max_limit=int(os.getenv('JUDGE0_MAX_CONCURRENCY', 32)),
+            latency_threshold=float(os.getenv('JUDGE0_LATENCY_THRESHOLD', 5.0)),
+            max_queue_depth=int(os.getenv('JUDGE0_MAX_QUEUE_DEPTH', 16)),
+            queue_timeout=float(os.getenv('JUDGE0_QUEUE_TIMEOUT', 2.0))
+        )
+        self.judge_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('JUDGE0_FAILURE_THRESHOLD', 5)),
+            reset_timeout=float(os.getenv('JUDGE0_RESET_TIMEOUT', 30.0))
+        )
     
     def execute_code(self, code: str, language: str, test_cases: List[Dict] = None) -> CodeExecutionResult:
         """执行代码"""
+        if not self.judge_breaker.allow_request():
+            return self._execute_fallback(code, language, test_cases, "判题服务暂时不可用，请稍后重试")
+        
+        # 没有记录调用结果就退出时（限流拒绝等）归还熔断器的半开试探名额
+        recorded = False
+        try:
+            try:
+                self.judge_limiter.acquire()
+            except ConcurrencyLimitExceeded:
+                return self._execute_fallback(code, language, test_cases, "判题服务繁忙，请稍后重试")
+            
+            start_time = time.monotonic()
+            result = None
+            try:
+                result = self._run_judge(self.judge_zero, code, language, test_cases)
+            finally:
+                self._record_judge_result(start_time, result)
+                recorded = True
+            
+            return result
+        finally:
+            if not recorded:
+                self.judge_breaker.release_probe()
+    
+    async def execute_code_async(self, code: str, language: str, test_cases: List[Dict] = None) -> CodeExecutionResult:
+        """execute_code 的异步版本：等待判题和排队时只挂起协程，不占用工作线程"""
+        if not self.judge_breaker.allow_request():
+            return await self._execute_fallback_async(code, language, test_cases, "判题服务暂时不可用，请稍后重试")
+        
+        # 没有记录调用结果就退出时（限流拒绝、排队或判题时请求被取消）归还熔断器的半开试探名额
+        recorded = False
+        try:
+            try:
+                await self.judge_limiter.acquire_async()
+            except ConcurrencyLimitExceeded:
+                return await self._execute_fallback_async(code, language, test_cases, "判题服务繁忙，请稍后重试")
+            
+            start_time = time.monotonic()
+            result = None
+            try:
+                result = await self._run_judge_async(self.judge_zero, code, language, test_cases)
+            except asyncio.CancelledError:
+                # 请求被取消（客户端断开、服务关闭）不说明判题服务异常，只归还并发名额
+                self.judge_limiter.release(time.monotonic() - start_time)
+                raise
+            except Exception:
+                self._record_judge_result(start_time, None)
+                recorded = True
+                raise
+            
+            self._record_judge_result(start_time, result)
+            recorded = True
+            return result
+        finally:
+            if not recorded:
+                self.judge_breaker.release_probe()
+    
+    def _record_judge_result(self, start_time: float, result: Optional[CodeExecutionResult]):
+        """归还并发名额，并把本次判题结果计入限流器和熔断器"""
+        success = result is not None and not result.platform_error
+        self.judge_limiter.release(time.monotonic() - start_time, success)
+        if success:
+            self.judge_breaker.record_success()
+        else:
+            self.judge_breaker.record_failure()
+    
+    def _run_judge(self, judge: OnlineJudgeInterface, code: str, language: str,
+                   test_cases: List[Dict] = None) -> CodeExecutionResult:
         if test_cases:
-            return self.judge_zero.run_code(code, language, test_cases)
+            return judge.run_code(code, language, test_cases)
         else:
-            return self.judge_zero.submit_code(code, language)
+            return judge.submit_code(code, language)
+    
+    async def _run_judge_async(self, judge: JudgeZeroAPI, code: str, language: str,
+                               test_cases: List[Dict] = None) -> CodeExecutionResult:
+        if test_cases:
+            return await judge.run_code_async(code, language, test_cases)
+        else:
+            return await judge.submit_code_async(code, language)
+    
+    def _execute_fallback(self, code: str, language: str, test_cases: List[Dict], reason: str) -> CodeExecutionResult:
+        """主判题服务不可用时使用备用服务，没有备用服务则快速失败"""
+        if self.fallback_judge:
+            return self._run_judge(self.fallback_judge, code, language, test_cases)
+        return CodeExecutionResult(
+            success=False,
+            output="",
+            error=reason,
+            platform_error=True
+        )
+    
+    async def _execute_fallback_async(self, code: str, language: str, test_cases: List[Dict],
+                                      reason: str) -> CodeExecutionResult:
+        if self.fallback_judge:
+            return await self._run_judge_async(self.fallback_judge, code, language, test_cases)
+        return CodeExecutionResult(
+            success=False,
+            output="",
+            error=reason,
+            platform_error=True
+        )
+    
+    async def aclose(self):
+        """关闭判题服务的异步HTTP客户端"""
+        for judge in (self.judge_zero, self.fallback_judge):
+            if judge is not None:
+                await judge.aclose()
+    
+    def get_judge_stats(self) -> Dict:
+        """获取判题请求的限流和熔断状态"""
+        return {
+            'limiter': self.judge_limiter.get_stats(),
+            'circuit_breaker': self.judge_breaker.get_stats(),
+            'fallback_enabled': self.fallback_judge is not None
+        }
     
     def get_leetcode_problem(self, problem_slug: str) -> Optional[Dict]:
         """获取LeetCode题目"""
@@ -0,0 +1,41 @@
+"""
+gunicorn 生产配置
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+环境变量: PORT（默认8000）、WEB_CONCURRENCY（工作进程数，默认 CPU 数 × 2 + 1）、
+GUNICORN_THREADS（每个工作进程的线程数，默认4）、GUNICORN_TIMEOUT（秒，默认60）。
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+
+# 主进程导入应用并预热后再 fork，工作进程写时复制共享已导入的模块和缓存
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+def post_fork(server, worker):
+    """丢弃从主进程继承的数据库连接，每个工作进程建立自己的连接池"""
+    from wsgi import app
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def post_worker_init(worker):
+    from wsgi import memory_usage
+
+    worker.log.info(f"工作进程 {worker.pid} 就绪，内存 {memory_usage()}")
+
+def worker_exit(server, worker):
+    from wsgi import memory_usage
+
+    server.log.info(f"工作进程 {worker.pid} 退出，内存 {memory_usage()}")
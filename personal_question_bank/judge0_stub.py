@@ -0,0 +1,299 @@
+"""
+本地 Judge0 兼容桩服务
+
+实现 Judge0 的 /submissions、/submissions/batch 和按 token 轮询接口，
+延迟、判题状态和 HTTP 错误按可配置的分布随机生成，
+用于在无网络、不消耗 RapidAPI 配额的情况下压测和集成测试判题路径。
+
+    python judge0_stub.py --port 2358 --latency 0.2 --status accepted=0.9,wrong_answer=0.1
+    JUDGE0_API_URL=http://127.0.0.1:2358 python app.py
+
+默认 echo 模式把标准输入原样作为输出；python 模式会在本机真实执行提交的
+Python 代码，只能用于可信的本地测试。
+"""
+import argparse
+import base64
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Judge0 状态码
+STATUSES = {
+    'in_queue': (1, 'In Queue'),
+    'processing': (2, 'Processing'),
+    'accepted': (3, 'Accepted'),
+    'wrong_answer': (4, 'Wrong Answer'),
+    'time_limit_exceeded': (5, 'Time Limit Exceeded'),
+    'compilation_error': (6, 'Compilation Error'),
+    'runtime_error': (11, 'Runtime Error (NZEC)'),
+    'internal_error': (13, 'Internal Error')
+}
+
+def parse_status_weights(spec: str) -> Dict[str, float]:
+    """解析 "accepted=0.9,wrong_answer=0.1" 形式的状态分布"""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in STATUSES:
+            raise ValueError(f"未知的判题状态: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认监听队列只有5，数百个并发连接时会被拒绝或重传 SYN
+    request_queue_size = 1024
+
+class Judge0Stub:
+    """Judge0 协议兼容的桩服务"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 2358, latency: float = 0.05,
+                 latency_dist: str = 'fixed', status_weights: Dict[str, float] = None,
+                 http_error_rate: float = 0.0, mode: str = 'echo', seed: int = None,
+                 result_ttl: float = 300.0):
+        self.latency = latency
+        self.latency_dist = latency_dist
+        self.status_weights = status_weights or {'accepted': 1.0}
+        self.http_error_rate = http_error_rate
+        self.mode = mode
+        self.random = random.Random(seed)
+
+        # token -> 提交，按创建顺序排列；按 token 取走已完成的结果后删除，
+        # 一直没有取走的（客户端超时放弃、批量轮询）在创建 result_ttl 秒后清理，压测时内存不会持续增长
+        self.submissions = OrderedDict()
+        self.result_ttl = result_ttl
+        self.submission_count = 0
+        self._lock = threading.Lock()
+
+        self.server = _StubHTTPServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """在后台线程中启动服务，返回服务地址"""
+        self._thread = threading.Thread(target=self.server.serve_forever, name='judge0-stub', daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _sample_latency(self) -> float:
+        with self._lock:
+            if self.latency_dist == 'uniform':
+                return self.random.uniform(0, 2 * self.latency)
+            if self.latency_dist == 'exponential':
+                return self.random.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+            return self.latency
+
+    def _sample_status(self) -> str:
+        with self._lock:
+            names = list(self.status_weights)
+            return self.random.choices(names, weights=[self.status_weights[n] for n in names])[0]
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.http_error_rate
+
+    def create_submission(self, data: Dict, base64_encoded: bool) -> str:
+        """登记一次提交，结果在采样的延迟之后才可见"""
+        source_code = data.get('source_code') or ''
+        stdin = data.get('stdin') or ''
+        if base64_encoded:
+            source_code = base64.b64decode(source_code).decode()
+            stdin = base64.b64decode(stdin).decode()
+
+        status = self._sample_status()
+        stdout, stderr = None, None
+        if status == 'accepted':
+            if self.mode == 'python' and data.get('language_id') == 71:
+                status, stdout, stderr = self._run_python(source_code, stdin)
+            else:
+                stdout = stdin
+        elif status in ('compilation_error', 'runtime_error'):
+            stderr = f"stub {status}"
+
+        token = uuid.uuid4().hex
+        created_at = time.monotonic()
+        ready_at = created_at + self._sample_latency()
+        with self._lock:
+            self._expire(created_at)
+            self.submission_count += 1
+            self.submissions[token] = {
+                'created_at': created_at,
+                'ready_at': ready_at,
+                'status': status,
+                'stdout': stdout,
+                'stderr': stderr
+            }
+        return token
+
+    def _expire(self, now: float):
+        """清理创建超过 result_ttl 秒的提交（调用方持有锁）"""
+        while self.submissions:
+            submission = next(iter(self.submissions.values()))
+            if now - submission['created_at'] < self.result_ttl:
+                break
+            self.submissions.popitem(last=False)
+
+    def _run_python(self, source_code: str, stdin: str):
+        try:
+            completed = subprocess.run(
+                [sys.executable, '-c', source_code], input=stdin,
+                capture_output=True, text=True, timeout=5
+            )
+        except subprocess.TimeoutExpired:
+            return 'time_limit_exceeded', None, None
+        if completed.returncode != 0:
+            return 'runtime_error', completed.stdout, completed.stderr
+        return 'accepted', completed.stdout, None
+
+    def wait_for(self, token: str):
+        submission = self.submissions.get(token)
+        if submission is None:
+            return
+        remaining = submission['ready_at'] - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def get_submission(self, token: str, base64_encoded: bool, consume: bool = False) -> Optional[Dict]:
+        """查询提交结果；consume 为 True 时返回已完成的结果后删除该提交"""
+        submission = self.submissions.get(token)
+        if submission is None:
+            return None
+
+        if time.monotonic() < submission['ready_at']:
+            status_id, description = STATUSES['processing']
+            return {'token': token, 'stdout': None, 'stderr': None, 'time': None, 'memory': None,
+                    'status': {'id': status_id, 'description': description}}
+
+        if consume:
+            with self._lock:
+                self.submissions.pop(token, None)
+
+        def encode(value):
+            if value is None or not base64_encoded:
+                return value
+            return base64.b64encode(value.encode()).decode()
+
+        status_id, description = STATUSES[submission['status']]
+        return {
+            'token': token,
+            'stdout': encode(submission['stdout']),
+            'stderr': encode(submission['stderr']),
+            'time': '0.01',
+            'memory': 1024,
+            'status': {'id': status_id, 'description': description}
+        }
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status_code: int, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'{}')
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                base64_encoded = params.get('base64_encoded', ['false'])[0] == 'true'
+                data = self._read_json()
+
+                if stub._should_fail():
+                    self._send_json(503, {'error': 'stub injected failure'})
+                    return
+
+                if url.path == '/submissions':
+                    token = stub.create_submission(data, base64_encoded)
+                    if params.get('wait', ['false'])[0] == 'true':
+                        stub.wait_for(token)
+                        self._send_json(201, stub.get_submission(token, base64_encoded, consume=True))
+                    else:
+                        self._send_json(201, {'token': token})
+                elif url.path == '/submissions/batch':
+                    tokens = [stub.create_submission(item, base64_encoded)
+                              for item in data.get('submissions', [])]
+                    self._send_json(201, [{'token': token} for token in tokens])
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                base64_encoded = params.get('base64_encoded', ['false'])[0] == 'true'
+
+                if url.path == '/submissions/batch':
+                    tokens = params.get('tokens', [''])[0].split(',')
+                    self._send_json(200, {'submissions': [
+                        stub.get_submission(token, base64_encoded) for token in tokens if token
+                    ]})
+                elif url.path.startswith('/submissions/'):
+                    result = stub.get_submission(url.path.rsplit('/', 1)[1], base64_encoded, consume=True)
+                    if result is None:
+                        self._send_json(404, {'error': 'not found'})
+                    else:
+                        self._send_json(200, result)
+                else:
+                    self._send_json(404, {'error': 'not found'})
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 Judge0 兼容桩服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2358)
+    parser.add_argument('--latency', type=float, default=0.05, help='平均判题延迟（秒）')
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'exponential'], default='fixed')
+    parser.add_argument('--status', default='accepted=1', help='判题状态分布，如 accepted=0.9,wrong_answer=0.1')
+    parser.add_argument('--http-error-rate', type=float, default=0.0, help='返回 HTTP 503 的概率')
+    parser.add_argument('--mode', choices=['echo', 'python'], default='echo')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--result-ttl', type=float, default=300.0, help='未被取走的判题结果保留的秒数')
+    args = parser.parse_args()
+
+    stub = Judge0Stub(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        status_weights=parse_status_weights(args.status),
+        http_error_rate=args.http_error_rate,
+        mode=args.mode,
+        seed=args.seed,
+        result_ttl=args.result_ttl
+    )
+    print(f"Judge0 桩服务已启动: {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+if __name__ == '__main__':
+    main()
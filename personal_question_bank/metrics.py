@@ -0,0 +1,212 @@
+"""
+请求监控指标（Prometheus 文本格式）
+
+- 接口: 按路由模板、方法和状态码统计请求耗时直方图，以及每个请求执行的 SQL 条数和 SQL 耗时
+- 数据库: 全局监听 Engine 的 cursor 事件，按语句类型（SELECT / INSERT / ...）统计条数和耗时，
+  同步、异步引擎和只读副本都会计入
+- 判题: Judge0 每次 HTTP 请求的耗时（按状态码）
+- 推荐: 推荐引擎各阶段（用户画像、候选题目、打分、多样性调整）的耗时
+
+指标保存在进程内，GET /metrics 输出当前进程的数据；gunicorn 多进程部署时每个工作进程各自计数。
+记录一次观测只是一次二分查找和几次加法，不依赖 prometheus_client。
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 每个请求 SQL 条数的分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """分桶直方图（桶内计数不累加，输出时再累加成 Prometheus 的 le 桶）"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # 标签值 -> [各桶计数..., +Inf 桶计数, 总和]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """统计 with 块的耗时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        lines = []
+        for labels, counts in sorted(values):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(counts[-1])}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    """指标注册表，render() 输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'http_request_duration_seconds', '接口请求耗时（秒）', ['method', 'route', 'status'])
+HTTP_REQUEST_QUERIES = REGISTRY.histogram(
+    'http_request_db_queries', '每个请求执行的 SQL 条数', ['route'], QUERY_COUNT_BUCKETS)
+HTTP_REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'http_request_db_duration_seconds', '每个请求执行 SQL 的总耗时（秒）', ['route'])
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'db_query_duration_seconds', 'SQL 语句耗时（秒）', ['operation'])
+JUDGE_REQUEST_SECONDS = REGISTRY.histogram(
+    'judge_request_duration_seconds', 'Judge0 HTTP 请求耗时（秒）', ['status'],
+    (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 15.0, 30.0))
+RECOMMENDATION_STAGE_SECONDS = REGISTRY.histogram(
+    'recommendation_stage_duration_seconds', '推荐引擎各阶段耗时（秒）', ['stage'])
+
+# 当前请求的 SQL 统计 [条数, 耗时]，不在请求中时为 None
+_request_queries: ContextVar[Optional[list]] = ContextVar('request_queries', default=None)
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip()[:8].split(None, 1)
+    return keyword[0].upper() if keyword else 'OTHER'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_query_started'].pop()
+    DB_QUERY_SECONDS.observe(elapsed, _operation(statement))
+    counters = _request_queries.get()
+    if counters is not None:
+        counters[0] += 1
+        counters[1] += elapsed
+
+def _handle_error(exception_context):
+    # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+    if exception_context.cursor is None or exception_context.connection is None:
+        return
+    started = exception_context.connection.info.get('metrics_query_started')
+    if started:
+        started.pop()
+
+def instrument_engines(enabled: bool = True):
+    """开始（或停止）监听所有 Engine（含异步引擎底层的同步引擎）的 SQL 执行，重复调用无副作用"""
+    if event.contains(Engine, 'before_cursor_execute', _before_cursor_execute) == enabled:
+        return
+    for name, listener in (('before_cursor_execute', _before_cursor_execute),
+                           ('after_cursor_execute', _after_cursor_execute),
+                           ('handle_error', _handle_error)):
+        if enabled:
+            event.listen(Engine, name, listener)
+        else:
+            event.remove(Engine, name, listener)
+
+def start_request():
+    """开始统计当前请求的 SQL，返回交给 finish_request 的令牌"""
+    counters = [0, 0.0]
+    _request_queries.set(counters)
+    return time.perf_counter(), counters
+
+def finish_request(token, method: str, route: str, status):
+    """记录请求耗时和 SQL 统计"""
+    started, counters = token
+    queries, query_seconds = counters
+    _request_queries.set(None)
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method, route, str(status))
+    HTTP_REQUEST_QUERIES.observe(queries, route)
+    HTTP_REQUEST_DB_SECONDS.observe(query_seconds, route)
+
+def set_enabled(app, enabled: bool):
+    """运行时开启或关闭请求和 SQL 统计"""
+    app.config['METRICS_ENABLED'] = enabled
+    instrument_engines(enabled)
+
+def init_app(app):
+    """为 Flask 应用注册请求统计钩子（METRICS_ENABLED 为 False 时钩子直接返回）"""
+    from flask import g, request
+
+    set_enabled(app, app.config.get('METRICS_ENABLED', True))
+
+    @app.before_request
+    def start_request_metrics():
+        if app.config['METRICS_ENABLED']:
+            g.metrics_token = start_request()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    # 流式响应在输出结束后才 teardown，请求耗时和 SQL 统计包含生成响应体的时间
+    @app.teardown_request
+    def finish_request_metrics(exc):
+        token = g.pop('metrics_token', None)
+        if token is None:
+            return
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = g.pop('metrics_status', 500)
+        finish_request(token, request.method, route, status)
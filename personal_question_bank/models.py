@@ -1,8 +1,16 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import Float, case, cast, func, inspect, text, union_all
+from sqlalchemy.dialects.mysql import Insert as MySQLInsert, insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
+from typing import Dict, List
 import json
 
-db = SQLAlchemy()
+from database import RoutingSession
+from serializers import serialize_question, serialize_record
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """用户模型"""
@@ -53,6 +61,15 @@ class KnowledgePoint(db.Model):
 class Question(db.Model):
     """题目模型"""
     __tablename__ = 'questions'
+    __table_args__ = (
+        # 题目列表按 类型/难度/知识点 过滤
+        db.Index('ix_questions_type_difficulty_kp', 'question_type', 'difficulty', 'knowledge_point_id'),
+        # 按知识点取题（学习路径中按难度排序）
+        db.Index('ix_questions_kp_difficulty', 'knowledge_point_id', 'difficulty'),
+        # 游标分页按 (过滤列, id) 定位
+        db.Index('ix_questions_type_id', 'question_type', 'id'),
+        db.Index('ix_questions_kp_id', 'knowledge_point_id', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -80,27 +97,17 @@ class Question(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'content': self.content,
-            'question_type': self.question_type,
-            'difficulty': self.difficulty,
-            'estimated_time': self.estimated_time,
-            'knowledge_point': self.knowledge_point.to_dict() if self.knowledge_point else None,
-            'options': json.loads(self.options) if self.options else None,
-            'correct_answer': self.correct_answer,
-            'explanation': self.explanation,
-            'programming_language': self.programming_language,
-            'starter_code': self.starter_code,
-            'test_cases': json.loads(self.test_cases) if self.test_cases else None,
-            'external_platform': self.external_platform,
-            'external_id': self.external_id
-        }
+        return serialize_question(self)
 
 class LearningRecord(db.Model):
     """学习记录模型"""
     __tablename__ = 'learning_records'
+    __table_args__ = (
+        # 用户最近记录、最近N天记录
+        db.Index('ix_learning_records_user_completed', 'user_id', 'completed_at'),
+        # 按时间范围导出和分析
+        db.Index('ix_learning_records_completed', 'completed_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -125,23 +132,84 @@ class LearningRecord(db.Model):
     question = db.relationship('Question', backref='learning_records')
     
     def to_dict(self):
-        return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'question_id': self.question_id,
-            'is_correct': self.is_correct,
-            'time_spent': self.time_spent,
-            'attempt_count': self.attempt_count,
-            'user_answer': self.user_answer,
-            'interaction_type': self.interaction_type,
-            'started_at': self.started_at.isoformat(),
-            'completed_at': self.completed_at.isoformat(),
-            'question': self.question.to_dict() if self.question else None
-        }
+        return serialize_record(self)
+
+class ArchivedLearningRecord(db.Model):
+    """已归档的学习记录（冷数据），列与 learning_records 相同并保留原记录ID
+
+    由 archive.py 从热表迁入，其统计贡献已计入 UserKnowledgeStats 和每日活动汇总。
+    """
+    __tablename__ = 'learning_records_archive'
+    __table_args__ = (
+        db.Index('ix_learning_records_archive_user_completed', 'user_id', 'completed_at'),
+        db.Index('ix_learning_records_archive_completed', 'completed_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
+    is_correct = db.Column(db.Boolean, nullable=False)
+    time_spent = db.Column(db.Integer, nullable=False)
+    attempt_count = db.Column(db.Integer, default=1)
+    user_answer = db.Column(db.Text)
+    interaction_type = db.Column(db.String(50))
+    started_at = db.Column(db.DateTime, nullable=False)
+    completed_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AnswerEvent(db.Model):
+    """答题事件（只追加的 outbox 日志），与学习记录在同一事务中写入"""
+    __tablename__ = 'answer_events'
+    __table_args__ = (
+        # 快照导出按学习记录关联写入时间，归档时按学习记录删除事件
+        db.Index('ix_answer_events_learning_record', 'learning_record_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    learning_record_id = db.Column(db.Integer, db.ForeignKey('learning_records.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
+    knowledge_point_id = db.Column(db.Integer, db.ForeignKey('knowledge_points.id'), nullable=False)
+    
+    is_correct = db.Column(db.Boolean, nullable=False)
+    time_spent = db.Column(db.Integer, nullable=False)  # 耗时(秒)
+    completed_at = db.Column(db.DateTime, nullable=False)  # 答题完成时间
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)  # 事件写入时间
+    
+    # 关联
+    learning_record = db.relationship('LearningRecord')
+
+class EventConsumerOffset(db.Model):
+    """事件消费者的处理位置"""
+    __tablename__ = 'event_consumer_offsets'
+    
+    consumer = db.Column(db.String(50), primary_key=True)
+    last_event_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AnswerEventDeadLetter(db.Model):
+    """消费者多次重试仍无法处理的答题事件（跳过后记录在此，修复后可手动重放）"""
+    __tablename__ = 'answer_event_dead_letters'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    consumer = db.Column(db.String(50), nullable=False)
+    event_id = db.Column(db.Integer, nullable=False)
+    error = db.Column(db.Text)
+    failed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CatalogVersion(db.Model):
+    """题目目录版本号（单行），题目或知识点变更提交时加一，供各工作进程判断目录缓存是否过期"""
+    __tablename__ = 'catalog_version'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
 
 class UserKnowledgeStats(db.Model):
     """用户知识点统计模型"""
     __tablename__ = 'user_knowledge_stats'
+    __table_args__ = (
+        db.Index('uq_user_knowledge_stats_user_kp', 'user_id', 'knowledge_point_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -180,3 +248,237 @@ class UserKnowledgeStats(db.Model):
             'mastery_level': self.mastery_level,
             'last_practice_time': self.last_practice_time.isoformat() if self.last_practice_time else None
         }
+    
+    @classmethod
+    def projected_dict(cls, user_id: int, knowledge_point_id: int, is_correct: bool, time_spent: int,
+                       practiced_at: datetime, knowledge_point: Dict = None) -> Dict:
+        """已有统计计入一次答题后的 to_dict() 结果（不写入数据库）
+
+        用于答题事件异步处理时的提交响应；knowledge_point 为知识点的序列化结果。
+        """
+        stats = cls.query.filter_by(user_id=user_id, knowledge_point_id=knowledge_point_id).first()
+        total = (stats.total_attempts or 0 if stats else 0) + 1
+        correct = (stats.correct_attempts or 0 if stats else 0) + (1 if is_correct else 0)
+        time_total = (stats.total_time_spent or 0 if stats else 0) + time_spent
+        last_practice_time = practiced_at
+        if stats and stats.last_practice_time and stats.last_practice_time > practiced_at:
+            last_practice_time = stats.last_practice_time
+        return {
+            'id': stats.id if stats else None,
+            'user_id': user_id,
+            'knowledge_point': knowledge_point,
+            'total_attempts': total,
+            'correct_attempts': correct,
+            'accuracy_rate': correct / total,
+            'total_time_spent': time_total,
+            'average_time': time_total / total,
+            'mastery_level': calculate_mastery_level(correct, total),
+            'last_practice_time': last_practice_time.isoformat()
+        }
+    
+    @classmethod
+    def apply_attempts(cls, user_id: int, knowledge_point_id: int, attempts: int,
+                       correct: int, time_spent: int, practiced_at: datetime = None):
+        """原子地累加单个知识点的答题统计并返回更新后的行"""
+        return cls.apply_attempt_deltas(user_id, {
+            knowledge_point_id: {
+                'attempts': attempts,
+                'correct': correct,
+                'time_spent': time_spent,
+                'practiced_at': practiced_at
+            }
+        })[0]
+    
+    @classmethod
+    def apply_attempt_deltas(cls, user_id: int, deltas: Dict[int, Dict]) -> List['UserKnowledgeStats']:
+        """原子地累加一个用户多个知识点的答题统计并返回更新后的行
+
+        deltas 以知识点ID为键，值包含 attempts、correct、time_spent 和可选的 practiced_at。
+        使用单条多行 INSERT ... ON CONFLICT DO UPDATE（MySQL 为 ON DUPLICATE KEY UPDATE），计数、平均耗时和掌握程度
+        全部在数据库内计算，并发提交不会丢失更新。
+        """
+        rows = []
+        for knowledge_point_id, delta in deltas.items():
+            attempts = delta['attempts']
+            correct = delta['correct']
+            rows.append({
+                'user_id': user_id,
+                'knowledge_point_id': knowledge_point_id,
+                'total_attempts': attempts,
+                'correct_attempts': correct,
+                'total_time_spent': delta['time_spent'],
+                'average_time': delta['time_spent'] / attempts,
+                'mastery_level': calculate_mastery_level(correct, attempts),
+                'last_practice_time': delta.get('practiced_at') or datetime.utcnow()
+            })
+        
+        stmt = upsert_insert(cls).values(rows)
+        excluded = excluded_values(stmt)
+        
+        # 每个表达式都基于旧值+增量；MySQL 按顺序赋值，派生列排在计数列之前，读到的仍是旧值
+        total = func.coalesce(cls.total_attempts, 0) + excluded.total_attempts
+        correct_total = func.coalesce(cls.correct_attempts, 0) + excluded.correct_attempts
+        time_total = func.coalesce(cls.total_time_spent, 0) + excluded.total_time_spent
+        
+        stmt = on_conflict_update(stmt, [cls.user_id, cls.knowledge_point_id], {
+            'average_time': cast(time_total, Float) / total,
+            'mastery_level': mastery_level_expression(correct_total, total),
+            # 离线同步的记录可能早于已有的练习时间，只保留较晚的一个
+            'last_practice_time': case(
+                (cls.last_practice_time.is_(None), excluded.last_practice_time),
+                (excluded.last_practice_time > cls.last_practice_time,
+                 excluded.last_practice_time),
+                else_=cls.last_practice_time
+            ),
+            'total_attempts': total,
+            'correct_attempts': correct_total,
+            'total_time_spent': time_total
+        })
+        
+        if supports_upsert_returning():
+            return db.session.scalars(
+                stmt.returning(cls), execution_options={'populate_existing': True}
+            ).all()
+        
+        # 不支持 RETURNING 时在同一事务内读回（行已被本事务锁定）
+        db.session.execute(stmt)
+        rows_by_kp = {row.knowledge_point_id: row for row in cls.query.filter(
+            cls.user_id == user_id, cls.knowledge_point_id.in_(list(deltas))
+        ).populate_existing()}
+        return [rows_by_kp[knowledge_point_id] for knowledge_point_id in deltas]
+
+class DailyUserActivity(db.Model):
+    """按天预聚合的用户学习活动（用户, 日期, 知识点）"""
+    __tablename__ = 'daily_user_activity'
+    __table_args__ = (
+        db.Index('uq_daily_user_activity_user_date_kp', 'user_id', 'activity_date', 'knowledge_point_id', unique=True),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    activity_date = db.Column(db.Date, nullable=False)
+    knowledge_point_id = db.Column(db.Integer, db.ForeignKey('knowledge_points.id'), nullable=False)
+    
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct_attempts = db.Column(db.Integer, nullable=False, default=0)
+    time_spent = db.Column(db.Integer, nullable=False, default=0)  # 总耗时(秒)
+    
+    @classmethod
+    def apply_deltas(cls, rows: List[Dict]):
+        """原子地累加多行活动增量
+
+        rows 中每项包含 user_id、activity_date、knowledge_point_id、attempts、correct_attempts 和 time_spent。
+        """
+        stmt = upsert_insert(cls).values(rows)
+        excluded = excluded_values(stmt)
+        stmt = on_conflict_update(stmt, [cls.user_id, cls.activity_date, cls.knowledge_point_id], {
+            'attempts': cls.attempts + excluded.attempts,
+            'correct_attempts': cls.correct_attempts + excluded.correct_attempts,
+            'time_spent': cls.time_spent + excluded.time_spent
+        })
+        db.session.execute(stmt)
+
+# 各数据库方言支持 upsert 的 INSERT 构造（与 database.SUPPORTED_DIALECTS 一致，启动时已检查）
+UPSERT_INSERTS = {
+    'postgresql': postgresql_insert,
+    'sqlite': sqlite_insert,
+    'mysql': mysql_insert,
+    'mariadb': mysql_insert,
+}
+
+def upsert_insert(model):
+    """返回当前数据库方言的 INSERT 构造，配合 excluded_values 和 on_conflict_update 生成 upsert"""
+    return UPSERT_INSERTS[db.session.get_bind().dialect.name](model)
+
+def excluded_values(stmt):
+    """upsert 中待插入的新值（PostgreSQL/SQLite 的 excluded，MySQL 的 VALUES()）"""
+    if isinstance(stmt, MySQLInsert):
+        return stmt.inserted
+    return stmt.excluded
+
+def on_conflict_update(stmt, index_elements, set_: Dict):
+    """唯一键冲突时按 set_ 更新已有行
+
+    MySQL 的 ON DUPLICATE KEY UPDATE 没有冲突目标（任一唯一键冲突都会更新），且按顺序赋值，
+    后面的表达式读到的是前面已更新的列；set_ 中依赖旧值的列要排在被它引用的列之前。
+    """
+    if isinstance(stmt, MySQLInsert):
+        return stmt.on_duplicate_key_update(list(set_.items()))
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+
+def supports_upsert_returning() -> bool:
+    """当前数据库能否在 upsert 语句上使用 RETURNING（MySQL 不支持）"""
+    return db.session.get_bind().dialect.name in ('postgresql', 'sqlite')
+
+def union_learning_records(build_select):
+    """对学习记录热表和归档表分别构造查询并 UNION ALL，用于跨冷热数据的读取
+
+    build_select(records) 接收表的列集合（records.id、records.user_id 等），
+    返回结果列一致的 select；需要排序时为排序列加标签（如 records.id.label('id')），
+    再在返回的复合查询上按 selected_columns 排序。
+    """
+    return union_all(build_select(LearningRecord.__table__.c),
+                     build_select(ArchivedLearningRecord.__table__.c))
+
+def calculate_mastery_level(correct_attempts: int, total_attempts: int) -> float:
+    """计算掌握程度 (简单算法: 正确率 * 0.7 + 练习频率 * 0.3)"""
+    if total_attempts == 0:
+        return 0.0
+    accuracy = correct_attempts / total_attempts
+    practice_frequency = min(total_attempts / 10.0, 1.0)  # 最多10次达到满分
+    return accuracy * 0.7 + practice_frequency * 0.3
+
+def mastery_level_expression(correct_attempts, total_attempts):
+    """calculate_mastery_level 的 SQL 表达式版本（total_attempts 须大于0）"""
+    return (cast(correct_attempts, Float) / total_attempts) * 0.7 \
+        + case((total_attempts >= 10, 1.0), else_=cast(total_attempts, Float) / 10.0) * 0.3
+
+def _merge_duplicate_knowledge_stats():
+    """合并同一 (用户, 知识点) 的重复统计行，为唯一索引腾出空间"""
+    duplicates = db.session.query(
+        UserKnowledgeStats.user_id, UserKnowledgeStats.knowledge_point_id
+    ).group_by(
+        UserKnowledgeStats.user_id, UserKnowledgeStats.knowledge_point_id
+    ).having(func.count(UserKnowledgeStats.id) > 1).all()
+    
+    for user_id, knowledge_point_id in duplicates:
+        rows = UserKnowledgeStats.query.filter_by(
+            user_id=user_id, knowledge_point_id=knowledge_point_id
+        ).order_by(UserKnowledgeStats.id).all()
+        keep = rows[0]
+        for row in rows[1:]:
+            keep.total_attempts = (keep.total_attempts or 0) + (row.total_attempts or 0)
+            keep.correct_attempts = (keep.correct_attempts or 0) + (row.correct_attempts or 0)
+            keep.total_time_spent = (keep.total_time_spent or 0) + (row.total_time_spent or 0)
+            if row.last_practice_time and (not keep.last_practice_time or
+                                           row.last_practice_time > keep.last_practice_time):
+                keep.last_practice_time = row.last_practice_time
+            db.session.delete(row)
+        if keep.total_attempts:
+            keep.average_time = keep.total_time_spent / keep.total_attempts
+        keep.mastery_level = calculate_mastery_level(keep.correct_attempts, keep.total_attempts)
+    
+    db.session.commit()
+
+def migrate_schema():
+    """为已有数据库补齐索引和约束
+
+    db.create_all() 只会创建缺失的表，不会修改已存在的表，
+    因此在其之后调用本函数补建模型中声明的索引。
+    """
+    _merge_duplicate_knowledge_stats()
+    
+    bind = db.engine
+    inspector = inspect(bind)
+    created = False
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind)
+                created = True
+    
+    # 新建索引后刷新查询规划器的统计信息
+    if created:
+        with bind.begin() as connection:
+            connection.execute(text('ANALYZE'))
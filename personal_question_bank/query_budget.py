@@ -0,0 +1,263 @@
+"""
+SQL 查询预算与 N+1 检测
+
+- QueryCounter: 监听 Engine 的 cursor 事件，记录 with 块内（当前线程）执行的 SQL 语句
+- query_budget / assert_query_budget: 上下文管理器和装饰器，语句总数超过预算，
+  或同一语句形状（去掉字面量、IN 列表折叠后的 SQL）重复执行超过 max_repeats 次时
+  抛出 QueryBudgetExceeded，报告中列出重复的语句形状，一般就是循环里的懒加载
+- ROUTE_BUDGETS + check_routes: app.py 中每个路由的示例请求和查询预算；
+  命令行运行时在临时数据库中生成数据，逐个路由清空进程内缓存后请求两次，
+  冷请求和命中缓存的请求分别检查预算，有路由没有预算或超出预算时退出码为1
+
+    python query_budget.py
+    python query_budget.py --verbose    # 同时输出每个路由的语句数和重复的语句形状
+
+修改接口导致查询数变化时，确认没有引入逐行查询后再更新 ROUTE_BUDGETS。
+"""
+import argparse
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 同一语句形状默认允许的最多执行次数，超过视为 N+1
+DEFAULT_MAX_REPEATS = 3
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))*\s*\)')
+_POSTCOMPILE = re.compile(r'__\[POSTCOMPILE_\w+\]')
+_WHITESPACE = re.compile(r'\s+')
+
+def statement_shape(statement: str) -> str:
+    """语句形状：字面量替换为 ?，IN 列表折叠为 (?)，空白合并"""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _POSTCOMPILE.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+class QueryBudgetExceeded(AssertionError):
+    """SQL 语句数超出预算或存在重复执行的语句形状"""
+    pass
+
+class QueryCounter:
+    """统计 with 块内当前线程执行的 SQL（后台线程如答题事件处理不计入）"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._thread_id = None
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        event.listen(Engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(Engine, 'before_cursor_execute', self._record)
+        return False
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def shapes(self) -> Counter:
+        return Counter(statement_shape(statement) for statement in self.statements)
+
+    def repeated(self, max_repeats: int = DEFAULT_MAX_REPEATS) -> Dict[str, int]:
+        """执行次数超过 max_repeats 的语句形状"""
+        return {shape: count for shape, count in self.shapes().items() if count > max_repeats}
+
+    def check(self, max_queries: Optional[int] = None, max_repeats: Optional[int] = DEFAULT_MAX_REPEATS,
+              label: str = ''):
+        """检查预算，超出时抛出 QueryBudgetExceeded"""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"执行了 {self.count} 条 SQL，预算 {max_queries} 条")
+        repeated = self.repeated(max_repeats) if max_repeats is not None else {}
+        if repeated:
+            problems.append(f"以下语句重复执行超过 {max_repeats} 次（疑似 N+1）:")
+            problems.extend(f"  x{count} {shape[:300]}" for shape, count in
+                            sorted(repeated.items(), key=lambda item: -item[1]))
+        if problems:
+            raise QueryBudgetExceeded('\n'.join([label] + problems if label else problems))
+
+@contextmanager
+def query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = DEFAULT_MAX_REPEATS,
+                 label: str = ''):
+    """with 块内的 SQL 超出预算或出现 N+1 时抛出 QueryBudgetExceeded"""
+    with QueryCounter() as counter:
+        yield counter
+    counter.check(max_queries, max_repeats, label)
+
+def assert_query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = DEFAULT_MAX_REPEATS):
+    """装饰器版本的 query_budget"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(max_queries, max_repeats, label=func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# ==================== 路由预算 ====================
+
+# (方法, 路由模板) -> 示例请求（path，可选 json 请求体）和查询预算：
+# max_queries 为缓存命中时的预算，max_cold_queries 为清空缓存后首次请求的预算（缺省同 max_queries），
+# 可选 max_repeats
+ROUTE_BUDGETS = {
+    ('GET', '/'): {'path': '/', 'max_queries': 0},
+    ('GET', '/dashboard/<int:user_id>'): {'path': '/dashboard/1', 'max_queries': 0},
+    ('GET', '/practice/<int:user_id>'): {'path': '/practice/1', 'max_queries': 0},
+    ('GET', '/metrics'): {'path': '/metrics', 'max_queries': 0},
+    ('GET', '/api/users'): {'path': '/api/users', 'max_queries': 1},
+    ('GET', '/api/users/<int:user_id>'): {'path': '/api/users/1', 'max_queries': 1},
+    ('GET', '/api/users/<int:user_id>/stats'): {'path': '/api/users/1/stats', 'max_queries': 4},
+    ('GET', '/api/users/<int:user_id>/activity'): {'path': '/api/users/1/activity?days=30', 'max_queries': 2},
+    ('GET', '/api/questions'): {'path': '/api/questions?per_page=20', 'max_queries': 2},
+    ('GET', '/api/questions/search'): {'path': '/api/questions/search?q=algorithm', 'max_queries': 2},
+    # 冷请求：目录版本号、全部知识点（建立快照）、题目
+    ('GET', '/api/questions/<int:question_id>'): {'path': '/api/questions/1', 'max_queries': 0,
+                                                  'max_cold_queries': 3},
+    ('POST', '/api/questions/import'): {
+        'path': '/api/questions/import?dry_run=1',
+        'json': [{'title': '查询预算检查题目', 'content': '用于检查导入接口的查询数',
+                  'question_type': 'theory', 'difficulty': 'easy', 'knowledge_point_id': 1}],
+        'max_queries': 2
+    },
+    ('GET', '/api/recommendations/<int:user_id>'): {'path': '/api/recommendations/1', 'max_queries': 6},
+    ('GET', '/api/knowledge-points'): {'path': '/api/knowledge-points', 'max_queries': 0, 'max_cold_queries': 2},
+    ('GET', '/api/knowledge-points/<int:kp_id>/questions'): {
+        'path': '/api/knowledge-points/1/questions', 'max_queries': 1, 'max_cold_queries': 3},
+    ('POST', '/api/learning-records'): {
+        'path': '/api/learning-records',
+        'json': {'user_id': 1, 'question_id': 1, 'user_answer': 'A', 'time_spent': 30,
+                 'interaction_type': 'practice'},
+        # 含两个答题事件消费者各自的领取、读取和提交
+        'max_queries': 16
+    },
+    ('POST', '/api/learning-records/batch'): {
+        'path': '/api/learning-records/batch',
+        'json': {'records': [{'user_id': 1, 'question_id': question_id, 'user_answer': 'A', 'time_spent': 30,
+                              'interaction_type': 'practice'} for question_id in range(1, 11)]},
+        # 题目、用户、学习记录、答题事件，加上两个答题事件消费者各自的领取、读取和提交；
+        # SQLite 上按参数顺序返回主键的 INSERT ... RETURNING 逐条执行（示例中 7 道非编程题）
+        'max_queries': 18,
+        'max_repeats': 7
+    },
+    ('GET', '/api/learning-records/events/lag'): {'path': '/api/learning-records/events/lag', 'max_queries': 6},
+    ('POST', '/api/code/run'): {
+        'path': '/api/code/run',
+        'json': {'code': 'print(input())', 'language': 'python',
+                 'test_cases': [{'input': '1', 'expected_output': '1'}]},
+        'max_queries': 0
+    },
+    ('GET', '/api/code/judge-status'): {'path': '/api/code/judge-status', 'max_queries': 0},
+    ('GET', '/api/external/leetcode/problems'): {'path': '/api/external/leetcode/problems', 'max_queries': 0},
+    ('GET', '/api/external/leetcode/problems/<problem_slug>'): {
+        'path': '/api/external/leetcode/problems/two-sum', 'max_queries': 0},
+    # 冷请求：学习记录聚合（热表+归档表）、题目、知识点、用户
+    ('GET', '/api/analytics/cohort'): {'path': '/api/analytics/cohort', 'max_queries': 0, 'max_cold_queries': 4},
+    ('GET', '/api/export/learning-records'): {
+        # 归档表和热表各一条，在应用内按ID归并
+        'path': '/api/export/learning-records?user_id=1&format=ndjson', 'max_queries': 2},
+}
+
+def app_routes(app) -> List[tuple]:
+    """应用中需要预算的 (方法, 路由模板)，不含静态文件"""
+    routes = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        routes.extend((method, rule.rule) for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}))
+    return sorted(routes)
+
+def check_routes(app, verbose: bool = False) -> List[str]:
+    """逐个请求 ROUTE_BUDGETS 中的示例（清空缓存后的冷请求和随后命中缓存的请求），返回失败信息列表"""
+    from app import clear_process_caches
+
+    failures = [f"{method} {rule} 没有查询预算" for method, rule in app_routes(app)
+                if (method, rule) not in ROUTE_BUDGETS]
+    client = app.test_client()
+
+    for (method, rule), spec in ROUTE_BUDGETS.items():
+        kwargs = {'method': method}
+        if 'json' in spec:
+            kwargs['json'] = spec['json']
+
+        # 目录、题目总数、群体分析等缓存只在首次请求时查询，冷请求单独计算预算
+        clear_process_caches()
+        budgets = [('冷请求', spec.get('max_cold_queries', spec['max_queries'])),
+                   ('缓存命中', spec['max_queries'])]
+        for phase, max_queries in budgets:
+            with QueryCounter() as counter:
+                response = client.open(spec['path'], **kwargs)
+                response.get_data()
+                response.close()
+
+            if verbose:
+                print(f"{method} {rule} [{phase}]: {response.status_code}，"
+                      f"{counter.count} 条 SQL（预算 {max_queries}）")
+                for shape, count in counter.shapes().items():
+                    if count > 1:
+                        print(f"    x{count} {shape[:160]}")
+            if response.status_code >= 400:
+                failures.append(f"{method} {spec['path']} 返回 {response.status_code}")
+                break
+            try:
+                counter.check(max_queries, spec.get('max_repeats', DEFAULT_MAX_REPEATS),
+                              label=f"{method} {spec['path']} [{phase}]")
+            except QueryBudgetExceeded as e:
+                failures.append(str(e))
+    return failures
+
+def main():
+    import os
+    import tempfile
+
+    parser = argparse.ArgumentParser(description='检查每个路由的 SQL 查询预算')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_budget.db')}"
+    # 答题事件在请求内同步处理（计入提交接口的预算），目录版本只在本进程失效（查询数确定）
+    os.environ['ANSWER_EVENTS_ASYNC'] = 'false'
+    os.environ['CATALOG_VERSION_CHECK_SECONDS'] = '0'
+
+    from judge0_stub import Judge0Stub
+    stub = Judge0Stub(port=0, latency=0.0, seed=1)
+    os.environ['JUDGE0_API_URL'] = stub.start()
+
+    from app import app
+    from data_generator import generate_scale_data
+    from models import db, migrate_schema
+    from search import ensure_search_index
+
+    try:
+        with app.app_context():
+            db.create_all()
+            migrate_schema()
+            ensure_search_index()
+            generate_scale_data(users=20, questions=200, knowledge_points=10, records=2000)
+
+        failures = check_routes(app, verbose=args.verbose)
+    finally:
+        stub.stop()
+
+    for failure in failures:
+        print(failure)
+    print(f"检查 {len(ROUTE_BUDGETS)} 个路由，{len(failures)} 项未通过")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,464 @@
+"""
+题目批量导入
+
+流式读取 JSON 数组 / NDJSON / CSV，逐行校验后按块用 executemany 批量插入，
+内存占用与文件大小无关。导入前先为题库中已有题目建立去重索引：
+
+- 规范化后的标题+内容完全相同的题目直接判为重复
+- 其余按字符 3-gram 计算 MinHash 签名，用 LSH 分桶找出候选，
+  签名估计的 Jaccard 相似度不低于阈值即判为近似重复
+
+同一文件内的重复题目同样会被跳过，因此重复导入同一题库不会产生重复题目。
+
+    python question_import.py questions.ndjson
+    python question_import.py questions.csv --dry-run
+    cat questions.json | python question_import.py - --format json
+"""
+import csv
+import gzip
+import hashlib
+import io
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from models import db, KnowledgePoint, Question
+
+IMPORT_FORMATS = ('ndjson', 'csv', 'json')
+
+QUESTION_TYPES = ('theory', 'coding', 'multiple_choice', 'practical')
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+# 可选的文本字段
+TEXT_FIELDS = ('correct_answer', 'explanation', 'programming_language', 'starter_code',
+               'external_platform', 'external_id')
+
+# 近似重复判定的默认 Jaccard 相似度阈值
+DEFAULT_THRESHOLD = 0.85
+
+# 报告中最多列出的错误和重复明细条数
+MAX_REPORTED_ROWS = 100
+
+# ==================== 流式解析 ====================
+
+def iter_ndjson(stream) -> Iterator[Tuple[int, object]]:
+    """逐行解析 NDJSON，产出 (行号, 字典或 ValueError)"""
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"JSON 格式错误: {e}")
+
+def iter_csv(stream) -> Iterator[Tuple[int, object]]:
+    """解析带表头的 CSV，空字符串视为未填写"""
+    reader = csv.DictReader(stream)
+    for row_number, row in enumerate(reader, 2):
+        yield row_number, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+def iter_json_array(stream, chunk_size: int = 1 << 16) -> Iterator[Tuple[int, object]]:
+    """增量解析顶层为数组的 JSON，每次只在缓冲区中保留未解析完的元素
+
+    数组结构本身损坏时抛出 ValueError。
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, eof = '', 0, False
+    started = False
+    index = 0
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n' + (',' if started else ''):
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                raise ValueError('JSON 数组不完整')
+            fill()
+            continue
+
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError('JSON 导入文件的顶层必须是数组')
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise ValueError(f"第 {index + 1} 个元素 JSON 格式错误")
+            fill()
+            continue
+        index += 1
+        position = end
+        yield index, item
+
+PARSERS = {'ndjson': iter_ndjson, 'csv': iter_csv, 'json': iter_json_array}
+
+def iter_rows(stream, import_format: str) -> Iterator[Tuple[int, object]]:
+    """按格式解析文本流"""
+    if import_format not in PARSERS:
+        raise ValueError(f"不支持的导入格式: {import_format}")
+    return PARSERS[import_format](stream)
+
+# ==================== 校验 ====================
+
+def _parse_json_list(value, field: str) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            raise ValueError(f"{field} 不是合法的 JSON")
+    if not isinstance(value, list):
+        raise ValueError(f"{field} 必须是列表")
+    return json.dumps(value, ensure_ascii=False)
+
+def validate_question(row, knowledge_points: Dict[int, str], knowledge_point_ids_by_name: Dict[str, int]) -> Dict:
+    """校验一行导入数据并转换为 questions 表的列值，不合法时抛出 ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('每行必须是对象')
+
+    title = str(row.get('title') or '').strip()
+    content = str(row.get('content') or '').strip()
+    if not title:
+        raise ValueError('缺少标题 title')
+    if len(title) > 200:
+        raise ValueError('标题超过200个字符')
+    if not content:
+        raise ValueError('缺少内容 content')
+
+    question_type = row.get('question_type')
+    if question_type not in QUESTION_TYPES:
+        raise ValueError(f"题目类型 question_type 必须是 {', '.join(QUESTION_TYPES)} 之一")
+    difficulty = row.get('difficulty')
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"难度 difficulty 必须是 {', '.join(DIFFICULTIES)} 之一")
+
+    # 知识点可按ID或名称指定
+    if row.get('knowledge_point_id') is not None:
+        try:
+            knowledge_point_id = int(row['knowledge_point_id'])
+        except (TypeError, ValueError):
+            raise ValueError('knowledge_point_id 必须是整数')
+        if knowledge_point_id not in knowledge_points:
+            raise ValueError(f"知识点 {knowledge_point_id} 不存在")
+    elif row.get('knowledge_point'):
+        knowledge_point_id = knowledge_point_ids_by_name.get(str(row['knowledge_point']).strip())
+        if knowledge_point_id is None:
+            raise ValueError(f"知识点 {row['knowledge_point']} 不存在")
+    else:
+        raise ValueError('缺少知识点 knowledge_point_id 或 knowledge_point')
+
+    estimated_time = row.get('estimated_time')
+    if estimated_time is not None:
+        try:
+            estimated_time = int(estimated_time)
+        except (TypeError, ValueError):
+            raise ValueError('estimated_time 必须是整数（分钟）')
+        if estimated_time <= 0:
+            raise ValueError('estimated_time 必须大于0')
+
+    question = {
+        'title': title,
+        'content': content,
+        'question_type': question_type,
+        'difficulty': difficulty,
+        'estimated_time': estimated_time,
+        'knowledge_point_id': knowledge_point_id,
+        'options': _parse_json_list(row.get('options'), 'options'),
+        'test_cases': _parse_json_list(row.get('test_cases'), 'test_cases'),
+    }
+    if question_type == 'multiple_choice' and not question['options']:
+        raise ValueError('选择题必须提供 options')
+    for field in TEXT_FIELDS:
+        value = row.get(field)
+        question[field] = str(value) if value is not None else None
+    return question
+
+# ==================== 去重 ====================
+
+_NON_WORD_PATTERN = re.compile(r'\W+')
+
+# MinHash 排列使用的梅森素数
+_MERSENNE_PRIME = (1 << 31) - 1
+
+def normalize_text(title: str, content: str) -> str:
+    """去掉空白和标点并转为小写，只保留文字和数字"""
+    return _NON_WORD_PATTERN.sub('', f'{title} {content}'.lower())
+
+class MinHashIndex:
+    """MinHash + LSH 近似重复索引
+
+    签名的每 rows 个值组成一个分带，任一分带完全相同的题目成为候选，
+    再用签名估计的 Jaccard 相似度确认。签名按批向量化计算。
+    默认 8 个分带 × 8 行：相似度 0.85 的题目约 92% 成为候选，0.9 以上约 99%，
+    同时模板化题目不会挤进同一个桶，候选比较次数保持很少。
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 8, threshold: float = DEFAULT_THRESHOLD,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError('num_perm 必须能被 bands 整除')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.int64)[:, None]
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.int64)[:, None]
+        # 字符 n-gram 滚动哈希的各位置系数，以及把分带压成一个整数键的系数
+        self._shingle_weights = rng.integers(1, _MERSENNE_PRIME, shingle_size, dtype=np.int64)
+        self._band_weights = rng.integers(1, 1 << 63, self.rows, dtype=np.uint64)
+
+        self._exact = {}
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._keys = []
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """计算一批文本字符 n-gram 集合的 MinHash 签名，返回 (文本数, num_perm) 数组"""
+        size = self.shingle_size
+        # 不足 n 个字符的文本补零，保证每个文本至少有一个 n-gram
+        codes = [np.frombuffer(text.ljust(size, '\0').encode('utf-32-le'), dtype=np.uint32) for text in texts]
+        lengths = np.fromiter((len(code) for code in codes), dtype=np.int64, count=len(codes))
+        joined = np.concatenate(codes).astype(np.int64)
+
+        hashes = sum(joined[i:len(joined) - size + 1 + i] * weight
+                     for i, weight in enumerate(self._shingle_weights)) % _MERSENNE_PRIME
+        # 跨越文本边界的 n-gram 不参与计算
+        shingle_counts = lengths - size + 1
+        position_in_text = np.arange(len(joined)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        valid = (position_in_text < np.repeat(shingle_counts, lengths))[:len(hashes)]
+        offsets = np.concatenate(([0], np.cumsum(shingle_counts)[:-1]))
+
+        permuted = (self._a * hashes[valid] + self._b) % _MERSENNE_PRIME
+        return np.minimum.reduceat(permuted, offsets, axis=1).T.astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> List[List[int]]:
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        return (bands * self._band_weights).sum(axis=2).tolist()
+
+    def _query(self, signature: np.ndarray, band_keys: List[int]):
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        if not candidates:
+            return None
+        positions = sorted(candidates)
+        matches = np.count_nonzero(self._signatures[positions] == signature, axis=1)
+        best = int(matches.argmax())
+        return self._keys[positions[best]] if matches[best] >= self.threshold * self.num_perm else None
+
+    def _insert(self, key, digest: bytes, signature: np.ndarray, band_keys: List[int]):
+        position = len(self._keys)
+        if position == len(self._signatures):
+            self._signatures = np.resize(self._signatures, (position * 2, self.num_perm))
+        self._signatures[position] = signature
+        self._keys.append(key)
+        self._exact.setdefault(digest, key)
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket[band_key].append(position)
+
+    def add_many(self, keys: List, texts: List[str]):
+        """不查重直接加入索引"""
+        if not texts:
+            return
+        signatures = self.signatures(texts)
+        for key, text, signature, band_keys in zip(keys, texts, signatures, self._band_keys(signatures)):
+            self._insert(key, _digest(text), signature, band_keys)
+
+    def deduplicate(self, keys: List, texts: List[str]) -> List:
+        """按顺序查重并把不重复的项加入索引，返回每项重复对象的键（不重复为 None）
+
+        同一批内靠后的项会与靠前的项比较。
+        """
+        if not texts:
+            return []
+        signatures = self.signatures(texts)
+        duplicates = []
+        for key, text, signature, band_keys in zip(keys, texts, signatures, self._band_keys(signatures)):
+            digest = _digest(text)
+            duplicate = self._exact.get(digest)
+            if duplicate is None:
+                duplicate = self._query(signature, band_keys)
+            if duplicate is None:
+                self._insert(key, digest, signature, band_keys)
+            duplicates.append(duplicate)
+        return duplicates
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+# ==================== 导入流程 ====================
+
+class QuestionImporter:
+    """流式题目导入（需在应用上下文中调用 run）"""
+
+    def __init__(self, chunk_size: int = 1000, threshold: float = DEFAULT_THRESHOLD, dry_run: bool = False):
+        self.chunk_size = chunk_size
+        self.threshold = threshold
+        self.dry_run = dry_run
+
+    def build_index(self) -> MinHashIndex:
+        """为题库中已有题目建立去重索引"""
+        index = MinHashIndex(threshold=self.threshold)
+        result = db.session.connection().execution_options(yield_per=self.chunk_size).execute(
+            select(Question.id, Question.title, Question.content)
+        )
+        for partition in result.partitions():
+            index.add_many([('question', question_id) for question_id, _, _ in partition],
+                           [normalize_text(title, content) for _, title, content in partition])
+        return index
+
+    def run(self, rows: Iterable[Tuple[int, object]]) -> Dict:
+        """校验、去重并分块插入，返回导入报告"""
+        started = time.perf_counter()
+        knowledge_points = dict(db.session.execute(select(KnowledgePoint.id, KnowledgePoint.name)).all())
+        knowledge_point_ids_by_name = {name: kp_id for kp_id, name in knowledge_points.items()}
+        index = self.build_index()
+        indexed_at = time.perf_counter()
+
+        report = {
+            'received': 0,
+            'imported': 0,
+            'duplicates': 0,
+            'invalid': 0,
+            'errors': [],
+            'duplicate_rows': [],
+            'dry_run': self.dry_run
+        }
+        chunk = []
+        try:
+            for row_number, row in rows:
+                report['received'] += 1
+                try:
+                    if isinstance(row, ValueError):
+                        raise row
+                    chunk.append((row_number, validate_question(row, knowledge_points, knowledge_point_ids_by_name)))
+                except ValueError as e:
+                    report['invalid'] += 1
+                    if len(report['errors']) < MAX_REPORTED_ROWS:
+                        report['errors'].append({'row': row_number, 'error': str(e)})
+                    continue
+
+                if len(chunk) >= self.chunk_size:
+                    self._flush(index, chunk, report)
+                    chunk = []
+        except ValueError as e:
+            # 文件结构损坏，已解析的有效行照常导入
+            report['error'] = str(e)
+
+        if chunk:
+            self._flush(index, chunk, report)
+
+        elapsed = time.perf_counter() - started
+        report['index_seconds'] = round(indexed_at - started, 3)
+        report['elapsed_seconds'] = round(elapsed, 3)
+        report['rows_per_second'] = round(report['received'] / elapsed, 1) if elapsed > 0 else None
+        return report
+
+    def _flush(self, index: MinHashIndex, chunk: List[Tuple[int, Dict]], report: Dict):
+        """去重后一次 executemany 插入一块题目并提交"""
+        duplicates = index.deduplicate(
+            [('row', row_number) for row_number, _ in chunk],
+            [normalize_text(question['title'], question['content']) for _, question in chunk]
+        )
+
+        questions = []
+        for (row_number, question), duplicate in zip(chunk, duplicates):
+            if duplicate is None:
+                questions.append(question)
+                continue
+            report['duplicates'] += 1
+            if len(report['duplicate_rows']) < MAX_REPORTED_ROWS:
+                kind, key = duplicate
+                report['duplicate_rows'].append(
+                    {'row': row_number, 'duplicate_of_question' if kind == 'question' else 'duplicate_of_row': key}
+                )
+
+        if questions and not self.dry_run:
+            try:
+                db.session.execute(insert(Question), questions)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        report['imported'] += len(questions)
+
+def import_questions(stream, import_format: str, **options) -> Dict:
+    """从文本流导入题目，options 传给 QuestionImporter"""
+    return QuestionImporter(**options).run(iter_rows(stream, import_format))
+
+def detect_format(filename: str) -> Optional[str]:
+    """按文件扩展名推断导入格式"""
+    name = filename.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for extension, import_format in (('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.csv', 'csv'),
+                                     ('.json', 'json')):
+        if name.endswith(extension):
+            return import_format
+    return None
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='题目批量导入')
+    parser.add_argument('path', help='导入文件（支持 .gz），- 表示标准输入')
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help='缺省时按扩展名推断')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='近似重复的相似度阈值')
+    parser.add_argument('--dry-run', action='store_true', help='只校验和去重，不写入数据库')
+    args = parser.parse_args()
+
+    import_format = args.format or detect_format(args.path)
+    if import_format is None:
+        parser.error('无法从文件名推断格式，请指定 --format')
+
+    if args.path == '-':
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    elif args.path.lower().endswith('.gz'):
+        stream = gzip.open(args.path, 'rt', encoding='utf-8', newline='')
+    else:
+        stream = open(args.path, encoding='utf-8', newline='')
+
+    from app import app
+    with app.app_context(), stream:
+        report = import_questions(stream, import_format, chunk_size=args.chunk_size,
+                                  threshold=args.threshold, dry_run=args.dry_run)
+
+    print(f"读取 {report['received']} 行：导入 {report['imported']}，重复 {report['duplicates']}，"
+          f"无效 {report['invalid']}；耗时 {report['elapsed_seconds']}s"
+          f"（建立去重索引 {report['index_seconds']}s），{report['rows_per_second']} 行/秒")
+    for error in report['errors'][:20]:
+        print(f"  第 {error['row']} 行: {error['error']}")
+    if report.get('error'):
+        print(f"导入中止: {report['error']}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -8,12 +8,17 @@ import json
 from typing import List, Dict, Tuple
 from collections import defaultdict
 
+from sqlalchemy.orm import joinedload, load_only
+
+from metrics import RECOMMENDATION_STAGE_SECONDS
 from models import db, User, Question, LearningRecord, KnowledgePoint, UserKnowledgeStats
 
 class RecommendationEngine:
     """个性化推荐引擎"""
     
-    def __init__(self):
+    def __init__(self, catalog=None):
+        # 题目目录缓存（catalog.CatalogCache），未提供时学习路径直接查询数据库
+        self.catalog = catalog
         self.user_profiles = {}
         self.question_features = {}
         self.difficulty_weights = {'easy': 1, 'medium': 2, 'hard': 3}
@@ -23,16 +28,20 @@ class RecommendationEngine:
         """为用户推荐个性化题目"""
         
         # 1. 构建用户画像
-        user_profile = self._build_user_profile(user_id)
+        with RECOMMENDATION_STAGE_SECONDS.time('profile'):
+            user_profile = self._build_user_profile(user_id)
         
         # 2. 获取候选题目
-        candidate_questions = self._get_candidate_questions(user_id, user_profile)
+        with RECOMMENDATION_STAGE_SECONDS.time('candidates'):
+            candidate_questions = self._get_candidate_questions(user_id, user_profile)
         
         # 3. 计算推荐分数
-        scored_questions = self._score_questions(user_profile, candidate_questions)
+        with RECOMMENDATION_STAGE_SECONDS.time('scoring'):
+            scored_questions = self._score_questions(user_profile, candidate_questions)
         
         # 4. 多样性调整
-        final_questions = self._diversify_recommendations(scored_questions, count)
+        with RECOMMENDATION_STAGE_SECONDS.time('diversify'):
+            final_questions = self._diversify_recommendations(scored_questions, count)
         
         return final_questions
     
@@ -53,6 +62,8 @@ class RecommendationEngine:
         # 学习历史分析
         recent_records = LearningRecord.query.filter_by(user_id=user_id)\
                                            .filter(LearningRecord.completed_at >= datetime.utcnow() - timedelta(days=30))\
+                                           .options(joinedload(LearningRecord.question)
+                                                    .load_only(Question.knowledge_point_id))\
                                            .all()
         
         if recent_records:
@@ -104,6 +115,7 @@ class RecommendationEngine:
     def _analyze_learning_pattern(self, user_id: int) -> Dict:
         """分析用户学习模式"""
         records = LearningRecord.query.filter_by(user_id=user_id)\
+                                    .options(joinedload(LearningRecord.question).load_only(Question.question_type))\
                                     .order_by(LearningRecord.completed_at.desc())\
                                     .limit(50).all()
         
@@ -166,7 +178,10 @@ class RecommendationEngine:
                                       .filter(LearningRecord.completed_at >= datetime.utcnow() - timedelta(days=7))\
                                       .subquery()
         
-        query = Question.query.filter(~Question.id.in_(recent_question_ids))
+        # 打分只用到这几列，不加载题目内容、代码和测试用例
+        scoring_columns = load_only(Question.id, Question.question_type, Question.difficulty,
+                                    Question.knowledge_point_id, Question.estimated_time)
+        query = Question.query.options(scoring_columns).filter(~Question.id.in_(recent_question_ids))
         
         # 基于用户偏好过滤
         preferred_types = user_profile.get('preferred_types', [])
@@ -177,7 +192,8 @@ class RecommendationEngine:
         
         # 如果候选题目太少，放宽限制
         if len(candidates) < 20:
-            candidates = Question.query.filter(~Question.id.in_(recent_question_ids)).all()
+            candidates = Question.query.options(scoring_columns)\
+                                       .filter(~Question.id.in_(recent_question_ids)).all()
         
         return candidates
     
@@ -362,18 +378,27 @@ class RecommendationEngine:
         learning_path = []
         
         for kp_id in weak_kps[:3]:  # 最多3个薄弱知识点
-            kp = KnowledgePoint.query.get(kp_id)
-            if not kp:
-                continue
+            if self.catalog is not None:
+                kp_data = self.catalog.get_knowledge_point(kp_id)
+                if not kp_data:
+                    continue
+                # 该知识点的前5道题，按难度排序
+                sequence = self.catalog.get_knowledge_point_questions(kp_id, limit=5)
+            else:
+                kp = KnowledgePoint.query.get(kp_id)
+                if not kp:
+                    continue
+                kp_data = kp.to_dict()
                 
-            # 获取该知识点的题目，按难度排序
-            kp_questions = Question.query.filter_by(knowledge_point_id=kp_id)\
-                                       .order_by(Question.difficulty).all()
+                # 获取该知识点的题目，按难度排序
+                kp_questions = Question.query.filter_by(knowledge_point_id=kp_id)\
+                                           .order_by(Question.difficulty, Question.id).limit(5).all()
+                sequence = [q.to_dict() for q in kp_questions]
             
             path_item = {
-                'knowledge_point': kp.to_dict(),
-                'recommended_sequence': [q.to_dict() for q in kp_questions[:5]],  # 推荐5道题
-                'estimated_time': sum(q.estimated_time or 10 for q in kp_questions[:5]),
+                'knowledge_point': kp_data,
+                'recommended_sequence': sequence,  # 推荐5道题
+                'estimated_time': sum(q['estimated_time'] or 10 for q in sequence),
                 'priority': 'high' if kp_id in weak_kps else 'medium'
             }
             
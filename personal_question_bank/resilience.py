@@ -0,0 +1,193 @@
+"""
+外部服务调用的保护机制：自适应并发限制器和熔断器
+"""
+import asyncio
+import threading
+import time
+
+class ConcurrencyLimitExceeded(Exception):
+    """等待队列已满或排队超时"""
+    pass
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD 自适应并发限制器
+
+    调用成功且延迟低于阈值时并发上限加性增长（每个上限周期约 +1），
+    调用失败或延迟超过阈值时乘性下降；超过上限的调用进入有界等待队列，
+    队列已满或等待超时时立即拒绝，避免所有工作线程阻塞在慢速的下游服务上。
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 latency_threshold: float = 5.0, backoff_ratio: float = 0.7,
+                 max_queue_depth: int = 16, queue_timeout: float = 2.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.backoff_ratio = backoff_ratio
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+        # 异步模式下排队的协程: (事件循环, future)，名额释放时唤醒
+        self._async_waiters = []
+
+    def acquire(self):
+        """获取一个并发名额，无法获取时抛出 ConcurrencyLimitExceeded"""
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            if self.waiting >= self.max_queue_depth:
+                self.rejected += 1
+                raise ConcurrencyLimitExceeded("等待队列已满")
+
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise ConcurrencyLimitExceeded("排队超时")
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.waiting -= 1
+
+    async def acquire_async(self):
+        """acquire 的协程版本：排队时不占用线程，只挂起当前协程"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+
+            if self.waiting >= self.max_queue_depth:
+                self.rejected += 1
+                raise ConcurrencyLimitExceeded("等待队列已满")
+            self.waiting += 1
+
+        deadline = loop.time() + self.queue_timeout
+        waiter = None
+        try:
+            while True:
+                with self._condition:
+                    if self.in_flight < int(self.limit):
+                        self.in_flight += 1
+                        return
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise ConcurrencyLimitExceeded("排队超时")
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self.waiting -= 1
+                if waiter is not None and (loop, waiter) in self._async_waiters:
+                    self._async_waiters.remove((loop, waiter))
+
+    def release(self, latency: float, success: bool = True):
+        """归还名额并根据本次调用的延迟和结果调整并发上限"""
+        with self._condition:
+            self.in_flight -= 1
+
+            if success and latency <= self.latency_threshold:
+                # 加性增长：只有名额接近用满时才提升上限
+                if self.in_flight + 1 >= int(self.limit):
+                    self.limit = min(self.limit + 1.0 / self.limit, self.max_limit)
+            else:
+                self.limit = max(self.limit * self.backoff_ratio, self.min_limit)
+
+            self._condition.notify_all()
+            for loop, waiter in self._async_waiters:
+                loop.call_soon_threadsafe(_wake, waiter)
+            self._async_waiters.clear()
+
+    def get_stats(self) -> dict:
+        with self._condition:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'rejected': self.rejected
+            }
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败达到阈值后进入打开状态，期间所有调用直接失败；
+    冷却时间过后进入半开状态，只放行一个试探调用，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """判断当前是否允许调用下游服务"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+
+            # 半开状态只放行一个试探调用
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """放行后既没有 record_success 也没有 record_failure 时调用（限流拒绝、请求取消等），
+        归还半开状态的试探名额，否则熔断器会一直停留在半开状态"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures
+            }
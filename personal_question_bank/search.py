@@ -0,0 +1,276 @@
+"""
+题目全文检索
+
+SQLite 使用 FTS5 外部内容表（trigram 分词器），PostgreSQL 使用带权重的 tsvector 列
+和 GIN 索引，均由数据库触发器与 questions 表保持同步，题目的任何写入路径都无需额外处理。
+
+中文等 CJK 文本没有空格分词：trigram 分词器按三字滑窗建索引，三字及以上的
+检索词可直接命中；不足三字的词（如“排序”）退化为在检索表上做子串匹配。
+PostgreSQL 的分词器同样不切分 CJK 文本，含 CJK 字符的检索词改用 ILIKE 子串匹配，
+数据库支持 pg_trgm 时为其建立三元组索引。
+
+其他数据库（如 MySQL）没有检索索引，退化为对题目表逐行做子串匹配，结果按ID排序。
+"""
+import html
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, null, or_, select, text
+from sqlalchemy.exc import OperationalError
+
+from models import db, Question
+
+# 片段高亮标记
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+# 数据库生成片段时使用的占位标记：片段整体做 HTML 转义后再替换为高亮标记，
+# 题目内容中的标签不会原样输出（内容本身含占位字符时最多多出一对 <mark>）
+_SENTINEL_START = '\x02'
+_SENTINEL_END = '\x03'
+
+# trigram 分词器可直接索引的最短检索词长度
+MIN_TRIGRAM_LENGTH = 3
+
+_CJK_PATTERN = re.compile(r'[぀-ヿ㐀-䶿一-鿿豈-﫿가-힯]')
+
+def ensure_search_index():
+    """建立检索索引和同步触发器（已存在时跳过），首次建立时为已有题目补建索引"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        try:
+            _ensure_sqlite_fts()
+        except OperationalError as e:
+            # 个别 SQLite 构建未启用 FTS5 或版本低于 3.34（不支持 trigram）
+            print(f"未能建立 FTS5 检索索引，题目检索接口不可用: {e}")
+    elif dialect == 'postgresql':
+        _ensure_postgresql_tsvector()
+    else:
+        print(f"数据库 {dialect} 不支持全文检索，题目检索接口使用子串匹配（顺序扫描）")
+
+def _ensure_sqlite_fts():
+    with db.engine.begin() as connection:
+        trigger = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'questions_search_ai'"
+        )).first()
+        if trigger:
+            return
+
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS question_search USING fts5("
+            "title, content, explanation, content='questions', content_rowid='id', tokenize='trigram')"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER questions_search_ai AFTER INSERT ON questions BEGIN "
+            "INSERT INTO question_search(rowid, title, content, explanation) "
+            "VALUES (new.id, new.title, new.content, new.explanation); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER questions_search_ad AFTER DELETE ON questions BEGIN "
+            "INSERT INTO question_search(question_search, rowid, title, content, explanation) "
+            "VALUES ('delete', old.id, old.title, old.content, old.explanation); END"
+        ))
+        connection.execute(text(
+            "CREATE TRIGGER questions_search_au AFTER UPDATE OF title, content, explanation ON questions BEGIN "
+            "INSERT INTO question_search(question_search, rowid, title, content, explanation) "
+            "VALUES ('delete', old.id, old.title, old.content, old.explanation); "
+            "INSERT INTO question_search(rowid, title, content, explanation) "
+            "VALUES (new.id, new.title, new.content, new.explanation); END"
+        ))
+        # 触发器缺失期间（如重建 questions 表后）写入的题目需要全量重建索引
+        connection.execute(text("INSERT INTO question_search(question_search) VALUES ('rebuild')"))
+
+def _ensure_postgresql_tsvector():
+    with db.engine.begin() as connection:
+        trigger = connection.execute(text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'questions_search_vector_update'"
+        )).first()
+        if trigger:
+            return
+
+        connection.execute(text("ALTER TABLE questions ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_questions_search_vector ON questions USING GIN (search_vector)"
+        ))
+        connection.execute(text("""
+            CREATE OR REPLACE FUNCTION questions_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector :=
+                    setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.content, '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce(NEW.explanation, '')), 'C');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """))
+        connection.execute(text(
+            "CREATE TRIGGER questions_search_vector_update "
+            "BEFORE INSERT OR UPDATE OF title, content, explanation ON questions "
+            "FOR EACH ROW EXECUTE FUNCTION questions_search_vector_update()"
+        ))
+        connection.execute(text("""
+            UPDATE questions SET search_vector =
+                setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(content, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(explanation, '')), 'C')
+        """))
+
+    # CJK 子串匹配的三元组索引（需要 pg_trgm 扩展，没有权限安装时跳过）
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_questions_search_trgm ON questions USING GIN "
+                "((title || ' ' || content || ' ' || coalesce(explanation, '')) gin_trgm_ops)"
+            ))
+    except Exception as e:
+        print(f"未能建立 pg_trgm 索引，中文短词检索将使用顺序扫描: {e}")
+
+def parse_search_terms(query: str) -> List[str]:
+    """按空白切分检索词，去重并保持顺序"""
+    return list(dict.fromkeys(term for term in query.split() if term))
+
+def search_questions(query: str, limit: int = 20, question_type: str = None, difficulty: str = None,
+                     knowledge_point_id: int = None) -> List[Dict]:
+    """检索题目，返回按相关度排序的 [{'id', 'score', 'snippet'}]
+
+    多个检索词之间为“与”关系。
+    """
+    terms = parse_search_terms(query)
+    if not terms:
+        return []
+
+    filters, params = [], {'limit': limit}
+    if question_type:
+        filters.append('questions.question_type = :question_type')
+        params['question_type'] = question_type
+    if difficulty:
+        filters.append('questions.difficulty = :difficulty')
+        params['difficulty'] = difficulty
+    if knowledge_point_id:
+        filters.append('questions.knowledge_point_id = :knowledge_point_id')
+        params['knowledge_point_id'] = knowledge_point_id
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        rows = _search_sqlite(terms, filters, params)
+    elif dialect == 'postgresql':
+        rows = _search_postgresql(terms, filters, params)
+    else:
+        rows = _search_like(terms, filters, params)
+
+    results = []
+    for question_id, score, snippet, content in rows:
+        results.append({
+            'id': question_id,
+            'score': float(score) if score is not None else None,
+            'snippet': highlight_html(snippet) if snippet is not None else make_snippet(content, terms)
+        })
+    return results
+
+def highlight_html(snippet: str) -> str:
+    """将带占位标记的数据库片段转义为 HTML，占位标记替换为高亮标记"""
+    return html.escape(snippet).replace(_SENTINEL_START, HIGHLIGHT_START).replace(_SENTINEL_END, HIGHLIGHT_END)
+
+def _escape_like(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _search_sqlite(terms: List[str], filters: List[str], params: Dict):
+    indexed_terms = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    short_terms = [term for term in terms if len(term) < MIN_TRIGRAM_LENGTH]
+
+    conditions = list(filters)
+    if indexed_terms:
+        # 每个词作为短语，内部的双引号转义
+        params['match'] = ' '.join('"' + term.replace('"', '""') + '"' for term in indexed_terms)
+        conditions.append('question_search MATCH :match')
+    for i, term in enumerate(short_terms):
+        params[f'like_{i}'] = f'%{_escape_like(term)}%'
+        conditions.append(
+            f"(question_search.title LIKE :like_{i} ESCAPE '\\' OR question_search.content LIKE :like_{i} ESCAPE '\\' "
+            f"OR question_search.explanation LIKE :like_{i} ESCAPE '\\')"
+        )
+
+    if indexed_terms:
+        # 标题权重最高；bm25 越小越相关，取负值作为得分
+        columns = (f"-bm25(question_search, 10.0, 2.0, 1.0) AS score, "
+                   f"snippet(question_search, -1, :highlight_start, :highlight_end, '…', 16) AS snippet, "
+                   f"NULL AS content")
+        order_by = 'bm25(question_search, 10.0, 2.0, 1.0)'
+        params.update(highlight_start=_SENTINEL_START, highlight_end=_SENTINEL_END)
+    else:
+        columns = ("NULL AS score, NULL AS snippet, "
+                   "question_search.content || ' ' || coalesce(question_search.explanation, '') AS content")
+        # 两者取值相同，只影响驱动表：有过滤条件时按 (过滤列, id) 索引遍历题目表，
+        # 否则按 rowid 顺序扫描检索表，均在取够 LIMIT 条后停止
+        order_by = 'questions.id' if filters else 'question_search.rowid'
+
+    stmt = text(
+        f"SELECT questions.id, {columns} FROM question_search "
+        f"JOIN questions ON questions.id = question_search.rowid "
+        f"WHERE {' AND '.join(conditions)} ORDER BY {order_by} LIMIT :limit"
+    )
+    return db.session.execute(stmt, params).all()
+
+def _search_postgresql(terms: List[str], filters: List[str], params: Dict):
+    word_terms = [term for term in terms if not _CJK_PATTERN.search(term)]
+    cjk_terms = [term for term in terms if _CJK_PATTERN.search(term)]
+
+    conditions = list(filters)
+    if word_terms:
+        params['tsquery'] = ' '.join(word_terms)
+        conditions.append("questions.search_vector @@ plainto_tsquery('simple', :tsquery)")
+    for i, term in enumerate(cjk_terms):
+        params[f'like_{i}'] = f'%{_escape_like(term)}%'
+        conditions.append(
+            f"(questions.title || ' ' || questions.content || ' ' || coalesce(questions.explanation, '')) "
+            f"ILIKE :like_{i}"
+        )
+
+    if word_terms:
+        columns = (f"ts_rank_cd(questions.search_vector, plainto_tsquery('simple', :tsquery)) AS score, "
+                   f"ts_headline('simple', questions.content, plainto_tsquery('simple', :tsquery), "
+                   f":headline_options) AS snippet, "
+                   f"questions.content AS content")
+        order_by = 'score DESC, questions.id'
+        params['headline_options'] = f'StartSel={_SENTINEL_START}, StopSel={_SENTINEL_END}, MaxWords=24, MinWords=8'
+    else:
+        columns = "NULL AS score, NULL AS snippet, questions.content || ' ' || coalesce(questions.explanation, '') AS content"
+        order_by = 'questions.id'
+
+    stmt = text(
+        f"SELECT questions.id, {columns} FROM questions "
+        f"WHERE {' AND '.join(conditions)} ORDER BY {order_by} LIMIT :limit"
+    )
+    return db.session.execute(stmt, params).all()
+
+def _search_like(terms: List[str], filters: List[str], params: Dict):
+    """没有检索索引的数据库：每个检索词在标题、内容或解析中子串匹配"""
+    explanation = func.coalesce(Question.explanation, '')
+    stmt = select(Question.id, null().label('score'), null().label('snippet'),
+                  (Question.content + ' ' + explanation).label('content'))
+    for term in terms:
+        # autoescape 按方言转义 % 和 _
+        stmt = stmt.where(or_(*(column.contains(term, autoescape=True)
+                                for column in (Question.title, Question.content, explanation))))
+    for condition in filters:
+        stmt = stmt.where(text(condition))
+    stmt = stmt.order_by(Question.id).limit(params.pop('limit'))
+    return db.session.execute(stmt, params).all()
+
+def make_snippet(content: Optional[str], terms: List[str], width: int = 24) -> Optional[str]:
+    """在内容中截取第一个检索词附近的片段并高亮（用于子串匹配的结果），返回转义后的 HTML"""
+    if not content:
+        return None
+
+    lowered = content.lower()
+    positions = [(lowered.find(term.lower()), term) for term in terms]
+    positions = [(position, term) for position, term in positions if position >= 0]
+    if not positions:
+        return html.escape(content[:width * 2]) + ('…' if len(content) > width * 2 else '')
+
+    position, term = min(positions)
+    start, end = max(position - width, 0), min(position + len(term) + width, len(content))
+    return (('…' if start > 0 else '') + html.escape(content[start:position]) + HIGHLIGHT_START +
+            html.escape(content[position:position + len(term)]) + HIGHLIGHT_END +
+            html.escape(content[position + len(term):end]) + ('…' if end < len(content) else ''))
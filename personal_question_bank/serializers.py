@@ -0,0 +1,222 @@
+"""
+JSON 序列化层
+
+- parse_json_column: 解析 options / test_cases 等 JSON 文本列，按原文缓存只读的解析结果，
+  同一题目被反复序列化时不再重复 json.loads
+- ModelSerializer: 预编译的行序列化器，用一次 attrgetter 取出所有列
+- serialize_questions / serialize_records: 列表序列化，同一知识点、同一题目只序列化一次
+- parse_question_fields / question_load_options: ?fields= 稀疏字段集，只查询和输出请求的列
+- FastJSONProvider: 安装了 orjson 时用它替换 Flask 的 JSON 编码（输出格式保持一致）
+"""
+import json
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import joinedload, load_only
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖
+    orjson = None
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError('parse_json_column 返回的对象在多次调用间共享，不能修改；需要修改时先 copy.deepcopy')
+
+class FrozenList(list):
+    """只读 list：JSON 编码与 list 相同，修改时抛出 TypeError，deepcopy 得到普通 list"""
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __deepcopy__(self, memo):
+        return _thaw(self)
+
+class FrozenDict(dict):
+    """只读 dict：JSON 编码与 dict 相同，修改时抛出 TypeError，deepcopy 得到普通 dict"""
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __deepcopy__(self, memo):
+        return _thaw(self)
+
+def _freeze(value):
+    if isinstance(value, list):
+        return FrozenList(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return FrozenDict((key, _freeze(item)) for key, item in value.items())
+    return value
+
+def _thaw(value):
+    if isinstance(value, list):
+        return [_thaw(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _thaw(item) for key, item in value.items()}
+    return value
+
+@lru_cache(maxsize=8192)
+def parse_json_column(raw: str):
+    """解析 JSON 文本列
+
+    结果按原文缓存并在多次调用间共享，因此以只读的 FrozenList / FrozenDict 返回，
+    修改会抛出 TypeError 而不会改坏缓存；序列化时与普通 list / dict 相同，不需要每次复制。
+    """
+    return _freeze(json.loads(raw)) if raw else None
+
+class ModelSerializer:
+    """预编译的行序列化器"""
+
+    def __init__(self, fields: Sequence[str], json_fields: Sequence[str] = ()):
+        self.fields = tuple(fields)
+        self.json_fields = tuple(json_fields)
+        getter = attrgetter(*self.fields)
+        # attrgetter 在只有一个字段时返回单个值，统一包装为元组
+        self._get_fields = getter if len(self.fields) > 1 else (lambda obj: (getter(obj),))
+        self._get_json_fields = [attrgetter(name) for name in self.json_fields]
+
+    def __call__(self, obj) -> Dict:
+        data = dict(zip(self.fields, self._get_fields(obj)))
+        for name, getter in zip(self.json_fields, self._get_json_fields):
+            data[name] = parse_json_column(getter(obj))
+        return data
+
+knowledge_point_serializer = ModelSerializer(
+    ['id', 'name', 'category', 'description', 'difficulty_level']
+)
+
+question_serializer = ModelSerializer(
+    ['id', 'title', 'content', 'question_type', 'difficulty', 'estimated_time', 'correct_answer',
+     'explanation', 'programming_language', 'starter_code', 'external_platform', 'external_id'],
+    json_fields=['options', 'test_cases']
+)
+
+record_serializer = ModelSerializer(
+    ['id', 'user_id', 'question_id', 'is_correct', 'time_spent', 'attempt_count', 'user_answer',
+     'interaction_type']
+)
+
+# 题目可请求的字段（knowledge_point_name 为只含知识点名称的精简字段）
+QUESTION_FIELDS = question_serializer.fields + question_serializer.json_fields + \
+    ('knowledge_point', 'knowledge_point_name')
+
+# 列表视图常用的精简字段集（fields=summary）
+QUESTION_SUMMARY_FIELDS = ('id', 'title', 'question_type', 'difficulty', 'knowledge_point_name')
+
+def parse_question_fields(spec: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """解析 ?fields= 参数，未指定时返回 None（输出全部字段），含未知字段时抛出 ValueError"""
+    if not spec:
+        return None
+    if spec == 'summary':
+        return QUESTION_SUMMARY_FIELDS
+
+    fields = tuple(dict.fromkeys(field.strip() for field in spec.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in QUESTION_FIELDS]
+    if unknown:
+        raise ValueError(f"未知字段: {', '.join(unknown)}")
+    # 始终包含 id
+    return fields if 'id' in fields else ('id',) + fields
+
+def question_load_options(fields: Optional[Tuple[str, ...]] = None) -> List:
+    """按请求的字段生成 SQLAlchemy 加载选项，未请求的列不查询"""
+    from models import Question, KnowledgePoint  # 避免与 models 循环导入
+
+    if fields is None:
+        return [joinedload(Question.knowledge_point)]
+
+    columns = [getattr(Question, field) for field in fields
+               if field in question_serializer.fields or field in question_serializer.json_fields]
+    options = [load_only(*columns)]
+    if 'knowledge_point' in fields:
+        options.append(joinedload(Question.knowledge_point))
+    elif 'knowledge_point_name' in fields:
+        options.append(joinedload(Question.knowledge_point).load_only(KnowledgePoint.name))
+    return options
+
+@lru_cache(maxsize=64)
+def _projected_question_serializer(fields: Tuple[str, ...]) -> ModelSerializer:
+    return ModelSerializer(
+        [field for field in fields if field in question_serializer.fields],
+        json_fields=[field for field in fields if field in question_serializer.json_fields]
+    )
+
+def serialize_question(question, knowledge_point_cache: Dict = None,
+                       fields: Optional[Tuple[str, ...]] = None) -> Dict:
+    """序列化题目（fields 为 None 时与 Question.to_dict() 输出一致）"""
+    if fields is not None:
+        data = _projected_question_serializer(fields)(question)
+        if 'knowledge_point_name' in fields:
+            data['knowledge_point_name'] = question.knowledge_point.name if question.knowledge_point else None
+        if 'knowledge_point' not in fields:
+            return data
+    else:
+        data = question_serializer(question)
+
+    knowledge_point = question.knowledge_point
+    if knowledge_point is None:
+        data['knowledge_point'] = None
+    elif knowledge_point_cache is None:
+        data['knowledge_point'] = knowledge_point_serializer(knowledge_point)
+    else:
+        cached = knowledge_point_cache.get(knowledge_point.id)
+        if cached is None:
+            cached = knowledge_point_cache[knowledge_point.id] = knowledge_point_serializer(knowledge_point)
+        data['knowledge_point'] = cached
+    return data
+
+def serialize_questions(questions: Iterable, fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+    """序列化题目列表，同一知识点只序列化一次"""
+    knowledge_point_cache = {}
+    return [serialize_question(question, knowledge_point_cache, fields) for question in questions]
+
+def serialize_record(record, question_cache: Dict = None, knowledge_point_cache: Dict = None) -> Dict:
+    """序列化学习记录（与 LearningRecord.to_dict() 输出一致）"""
+    data = record_serializer(record)
+    data['started_at'] = record.started_at.isoformat()
+    data['completed_at'] = record.completed_at.isoformat()
+
+    question = record.question
+    if question is None:
+        data['question'] = None
+    elif question_cache is None:
+        data['question'] = serialize_question(question, knowledge_point_cache)
+    else:
+        cached = question_cache.get(question.id)
+        if cached is None:
+            cached = question_cache[question.id] = serialize_question(question, knowledge_point_cache)
+        data['question'] = cached
+    return data
+
+def serialize_records(records: Iterable) -> List[Dict]:
+    """序列化学习记录列表，同一题目只序列化一次"""
+    question_cache, knowledge_point_cache = {}, {}
+    return [serialize_record(record, question_cache, knowledge_point_cache) for record in records]
+
+class FastJSONProvider(DefaultJSONProvider):
+    """优先使用 orjson 编码的 Flask JSON 提供者
+
+    日期等类型仍交给 Flask 默认的转换函数处理，保证输出与标准实现一致；
+    未安装 orjson 时行为与 DefaultJSONProvider 相同。
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        return self._orjson_dumps(obj, **kwargs).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._orjson_dumps(obj, indent=2 if indent else None) + b'\n', mimetype=self.mimetype
+        )
+
+    def _orjson_dumps(self, obj, **kwargs) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option)
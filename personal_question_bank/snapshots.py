@@ -0,0 +1,287 @@
+"""
+学习记录列式快照
+
+按记录ID水位增量导出新的学习记录，按完成月份分区写入 Parquet（压缩，默认）
+或 Arrow IPC（不压缩，可零拷贝内存映射）文件，列类型固定。离线训练任务
+（聚类、IRT、矩阵分解等）通过读取接口直接加载 NumPy/pandas 列，无需访问业务数据库。
+
+目录结构:
+    <快照目录>/_manifest.json
+    <快照目录>/month=2024-05/part-000000000001-000000100000.parquet
+
+清单文件是唯一可信来源：数据文件先写入，清单最后原子替换，
+中途失败时未登记的文件会在下次导出时被清理，不会重复读取。
+
+    python snapshots.py export --format parquet
+    python snapshots.py info
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import String, select, type_coerce
+
+from event_log import visible_prefix_length
+from models import db, AnswerEvent, Question, union_learning_records
+
+DEFAULT_SNAPSHOT_DIR = os.getenv(
+    'LEARNING_SNAPSHOT_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots', 'learning_records')
+)
+
+MANIFEST_NAME = '_manifest.json'
+
+FILE_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# 快照列类型（不含 user_answer 等大文本字段）
+SNAPSHOT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('user_id', pa.int64()),
+    ('question_id', pa.int64()),
+    ('knowledge_point_id', pa.int64()),
+    ('question_type', pa.dictionary(pa.int8(), pa.string())),
+    ('difficulty', pa.dictionary(pa.int8(), pa.string())),
+    ('is_correct', pa.bool_()),
+    ('time_spent', pa.int32()),
+    ('attempt_count', pa.int16()),
+    ('interaction_type', pa.dictionary(pa.int8(), pa.string())),
+    ('started_at', pa.timestamp('us')),
+    ('completed_at', pa.timestamp('us'))
+])
+
+class LearningSnapshot:
+    """学习记录快照目录的增量导出与读取"""
+
+    def __init__(self, directory: str = DEFAULT_SNAPSHOT_DIR, file_format: str = 'parquet'):
+        if file_format not in FILE_EXTENSIONS:
+            raise ValueError(f"不支持的快照格式: {file_format}")
+        self.directory = directory
+        self.file_format = file_format
+
+    # ---------- 清单 ----------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def load_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {'version': 1, 'format': self.file_format, 'last_record_id': 0, 'row_count': 0, 'files': []}
+
+        with open(self.manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['format'] != self.file_format:
+            raise ValueError(f"快照目录已使用 {manifest['format']} 格式，不能以 {self.file_format} 格式追加")
+        return manifest
+
+    def _save_manifest(self, manifest: Dict):
+        manifest['updated_at'] = datetime.utcnow().isoformat()
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    # ---------- 导出 ----------
+
+    def export(self, batch_size: int = 200000, gap_timeout: float = 60.0) -> int:
+        """导出水位之后的新记录，返回新增行数（需在应用上下文中调用）
+
+        PostgreSQL 等数据库中自增ID可能乱序提交，水位只推进到连续的ID为止，规则与答题事件的
+        处理位置相同（event_log.visible_prefix_length）：ID空洞之后的记录在 gap_timeout 秒内写入时
+        停在空洞之前，等较小ID的事务提交后再导出。写入时间取答题事件的 created_at
+        （批量提交的 completed_at 由客户端提供，可能早于写入时间）。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self.load_manifest()
+        self._remove_orphan_files(manifest)
+
+        sqlite = db.session.get_bind().dialect.name == 'sqlite'
+
+        def build(records):
+            started_at, completed_at = records.started_at, records.completed_at
+            if sqlite:
+                # SQLite 中时间以文本存储，直接交给 Arrow 解析，省去逐行创建 datetime 对象
+                started_at, completed_at = type_coerce(started_at, String), type_coerce(completed_at, String)
+
+            stmt = select(
+                records.id.label('id'),
+                records.user_id,
+                records.question_id,
+                Question.knowledge_point_id,
+                Question.question_type,
+                Question.difficulty,
+                records.is_correct,
+                records.time_spent,
+                records.attempt_count,
+                records.interaction_type,
+                started_at,
+                completed_at,
+                # 末列为写入时间（不写入快照）；归档记录的事件已删除，为 NULL
+                AnswerEvent.created_at.label('written_at')
+            ).join(Question, records.question_id == Question.id)\
+             .outerjoin(AnswerEvent, AnswerEvent.learning_record_id == records.id)\
+             .where(records.id > manifest['last_record_id'], records.completed_at.isnot(None))
+            return stmt
+
+        # 尚未导出就被归档的记录从归档表读取
+        stmt = union_learning_records(build)
+        exported = 0
+        result = db.session.connection().execution_options(yield_per=batch_size)\
+                                        .execute(stmt.order_by(stmt.selected_columns.id))
+        for partition in result.partitions():
+            visible = visible_prefix_length(manifest['last_record_id'],
+                                            ((row[0], row[-1]) for row in partition), gap_timeout)
+            if visible:
+                table = self._build_table(partition[:visible])
+
+                manifest['files'].extend(self._write_partitions(table))
+                manifest['last_record_id'] = int(partition[visible - 1][0])
+                manifest['row_count'] += table.num_rows
+                # 每批写完即更新清单，大规模导出中断后可从上一批继续
+                self._save_manifest(manifest)
+                exported += table.num_rows
+            if visible < len(partition):
+                # 遇到尚不能越过的ID空洞，下次导出时再继续
+                result.close()
+                break
+
+        db.session.rollback()
+        return exported
+
+    def _build_table(self, rows) -> pa.Table:
+        """按列转换一批数据库行（忽略快照列之后的多余列），低基数字符串列做字典编码"""
+        columns = []
+        for values, field in zip(zip(*rows), SNAPSHOT_SCHEMA):
+            if pa.types.is_dictionary(field.type):
+                columns.append(pc.dictionary_encode(pa.array(values, pa.string())).cast(field.type))
+            elif pa.types.is_timestamp(field.type):
+                columns.append(pa.array(values).cast(field.type))
+            else:
+                columns.append(pa.array(values, field.type))
+        return pa.Table.from_arrays(columns, schema=SNAPSHOT_SCHEMA)
+
+    def _write_partitions(self, table: pa.Table) -> List[Dict]:
+        """按完成月份拆分一批记录并写入各分区"""
+        months = pc.strftime(table.column('completed_at'), format='%Y-%m')
+        files = []
+        for month in pc.unique(months).to_pylist():
+            part = table.filter(pc.equal(months, month))
+            ids = part.column('id')
+            min_id, max_id = pc.min(ids).as_py(), pc.max(ids).as_py()
+            relative_path = f"month={month}/part-{min_id:012d}-{max_id:012d}{FILE_EXTENSIONS[self.file_format]}"
+            path = os.path.join(self.directory, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            temp_path = path + '.tmp'
+            if self.file_format == 'parquet':
+                pq.write_table(part, temp_path, compression='zstd')
+            else:
+                with pa.OSFile(temp_path, 'wb') as sink, pa.ipc.new_file(sink, SNAPSHOT_SCHEMA) as writer:
+                    writer.write_table(part)
+            os.replace(temp_path, path)
+
+            completed_at = part.column('completed_at')
+            files.append({
+                'path': relative_path,
+                'month': month,
+                'rows': part.num_rows,
+                'min_id': min_id,
+                'max_id': max_id,
+                'min_completed_at': pc.min(completed_at).as_py().isoformat(),
+                'max_completed_at': pc.max(completed_at).as_py().isoformat()
+            })
+        return files
+
+    def _remove_orphan_files(self, manifest: Dict):
+        """删除未登记到清单中的数据文件（上次导出中断留下的）"""
+        registered = {os.path.normpath(entry['path']) for entry in manifest['files']}
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.startswith('part-'):
+                    continue
+                path = os.path.join(root, filename)
+                if os.path.normpath(os.path.relpath(path, self.directory)) not in registered:
+                    os.remove(path)
+
+    # ---------- 读取 ----------
+
+    def read_table(self, columns: Optional[List[str]] = None,
+                   start: datetime = None, end: datetime = None) -> pa.Table:
+        """读取快照为 Arrow 表，按完成时间过滤时先用清单裁剪分区文件"""
+        manifest = self.load_manifest()
+        read_columns = list(columns) if columns else SNAPSHOT_SCHEMA.names
+        if (start or end) and 'completed_at' not in read_columns:
+            read_columns.append('completed_at')
+
+        tables = []
+        for entry in manifest['files']:
+            if start and datetime.fromisoformat(entry['max_completed_at']) < start:
+                continue
+            if end and datetime.fromisoformat(entry['min_completed_at']) > end:
+                continue
+            tables.append(self._read_file(os.path.join(self.directory, entry['path']), read_columns))
+
+        if not tables:
+            return SNAPSHOT_SCHEMA.empty_table().select(read_columns)
+
+        table = pa.concat_tables(tables)
+        if start:
+            table = table.filter(pc.greater_equal(table.column('completed_at'), pa.scalar(start, pa.timestamp('us'))))
+        if end:
+            table = table.filter(pc.less_equal(table.column('completed_at'), pa.scalar(end, pa.timestamp('us'))))
+        return table.select(list(columns) if columns else SNAPSHOT_SCHEMA.names)
+
+    def _read_file(self, path: str, columns: List[str]) -> pa.Table:
+        if self.file_format == 'parquet':
+            return pq.read_table(path, columns=columns, memory_map=True)
+        # Arrow IPC 文件不压缩，内存映射后读取不复制数据
+        with pa.ipc.open_file(pa.memory_map(path, 'r')) as reader:
+            return reader.read_all().select(columns)
+
+    def to_pandas(self, columns: Optional[List[str]] = None,
+                  start: datetime = None, end: datetime = None):
+        """读取为 pandas DataFrame，字典编码列转为 category 类型"""
+        return self.read_table(columns, start, end).to_pandas()
+
+    def to_numpy(self, columns: Optional[List[str]] = None,
+                 start: datetime = None, end: datetime = None) -> Dict[str, np.ndarray]:
+        """读取为 {列名: NumPy 数组}，字典编码列返回取值字符串数组"""
+        table = self.read_table(columns, start, end)
+        arrays = {}
+        for name in table.column_names:
+            column = table.column(name)
+            if pa.types.is_dictionary(column.type):
+                column = column.cast(column.type.value_type)
+            arrays[name] = column.to_numpy()
+        return arrays
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='学习记录列式快照')
+    parser.add_argument('command', choices=['export', 'info'],
+                        help='export: 增量导出新记录; info: 查看快照清单')
+    parser.add_argument('--dir', default=DEFAULT_SNAPSHOT_DIR, help='快照目录')
+    parser.add_argument('--format', choices=list(FILE_EXTENSIONS), default='parquet')
+    parser.add_argument('--batch-size', type=int, default=200000)
+    args = parser.parse_args()
+
+    snapshot = LearningSnapshot(args.dir, args.format)
+    if args.command == 'info':
+        manifest = snapshot.load_manifest()
+        print(f"格式: {manifest['format']}  行数: {manifest['row_count']}  "
+              f"文件数: {len(manifest['files'])}  水位: {manifest['last_record_id']}")
+        return
+
+    from app import app
+    with app.app_context():
+        exported = snapshot.export(batch_size=args.batch_size)
+    print(f"导出新记录: {exported} 条")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+流式 JSON 响应
+
+大列表接口不再先构造完整列表再 jsonify：
+
+- iter_json_array: 把逐批产出的对象编码为 JSON 数组文本（可带外层对象的前缀/后缀），
+  每批输出一段，首字节在第一批查询返回后即可发送，内存占用与结果规模无关
+- negotiate_encoding / compress_stream: 按 Accept-Encoding 协商 br（安装了 brotli 时）或 gzip，
+  每批数据后刷新压缩器，客户端可以边接收边解析
+- json_stream_response: 组装流式响应，设置 Content-Encoding 和 Vary 头
+"""
+import zlib
+from typing import Callable, Iterable, Iterator, Optional
+
+from flask import Response, current_app, request, stream_with_context
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+# 流式接口每批从数据库读取的行数
+STREAM_BATCH_SIZE = 500
+
+def iter_json_array(batches: Iterable[Iterable], serialize: Callable = None,
+                    prefix: str = '', suffix: str = '') -> Iterator[str]:
+    """把逐批产出的对象编码为 JSON 数组，每批输出一段文本
+
+    prefix/suffix 用于把数组嵌入外层对象，如 prefix='{"items":', suffix='}'。
+    """
+    dumps = current_app.json.dumps
+    yield prefix + '['
+    first = True
+    for batch in batches:
+        items = [dumps(serialize(item) if serialize else item) for item in batch]
+        if not items:
+            continue
+        yield (',' if not first else '') + ','.join(items)
+        first = False
+    yield ']' + suffix
+
+def negotiate_encoding(accept_encodings=None) -> Optional[str]:
+    """按请求的 Accept-Encoding（含 q 值）选择 br 或 gzip，都不接受时返回 None"""
+    accept_encodings = accept_encodings if accept_encodings is not None else request.accept_encodings
+    offers = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offers)
+
+def compress_stream(chunks: Iterable[str], encoding: str) -> Iterator[bytes]:
+    """增量压缩文本流，每段输入后刷新，已编码的数据立即发出"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            compressed = compressor.process(chunk.encode('utf-8')) + compressor.flush()
+            if compressed:
+                yield compressed
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def json_stream_response(chunks: Iterable[str], status: int = 200) -> Response:
+    """返回流式 JSON 响应，按请求协商压缩"""
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = negotiate_encoding()
+    if encoding:
+        chunks = compress_stream(chunks, encoding)
+        headers['Content-Encoding'] = encoding
+    else:
+        chunks = (chunk.encode('utf-8') for chunk in chunks)
+    return Response(stream_with_context(chunks), status=status, mimetype='application/json', headers=headers)
@@ -0,0 +1,52 @@
+"""
+测试公共配置
+
+测试使用临时 SQLite 数据库和本地 Judge0 桩服务，答题事件在请求内同步处理：
+
+    cd personal_question_bank && python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+_judge0_stub = None
+
+def pytest_configure(config):
+    """在导入应用（读取配置、创建判题客户端）之前设置环境变量"""
+    global _judge0_stub
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}"
+    os.environ['ANSWER_EVENTS_ASYNC'] = 'false'
+    os.environ['CATALOG_VERSION_CHECK_SECONDS'] = '0'
+
+    from judge0_stub import Judge0Stub
+    _judge0_stub = Judge0Stub(port=0, latency=0.0, seed=1)
+    os.environ['JUDGE0_API_URL'] = _judge0_stub.start()
+
+def pytest_unconfigure(config):
+    if _judge0_stub is not None:
+        _judge0_stub.stop()
+
+@pytest.fixture(scope='session')
+def app():
+    """建表、迁移并生成小规模数据的应用（整个测试会话共用一个数据库）"""
+    from app import app as flask_app
+    from data_generator import generate_scale_data
+    from models import db, migrate_schema
+    from search import ensure_search_index
+
+    with flask_app.app_context():
+        db.create_all()
+        migrate_schema()
+        ensure_search_index()
+        generate_scale_data(users=20, questions=200, knowledge_points=10, records=2000)
+    return flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,24 @@
+"""
+异步服务模式的答题提交：与同步接口共用 validate_submission，错误输入返回 400
+"""
+import pytest
+
+starlette_testclient = pytest.importorskip('starlette.testclient')
+
+VALID = {'user_id': 1, 'question_id': 1, 'user_answer': 'A', 'time_spent': 30, 'interaction_type': 'quick_answer'}
+
+def test_async_submit_rejects_invalid_input(app):
+    from asgi import application
+
+    invalid_items = [
+        {'user_id': 1},
+        {**VALID, 'question_id': 'abc'},
+        {**VALID, 'time_spent': 10 ** 20},
+        {**VALID, 'user_answer': ['A']},
+    ]
+    with starlette_testclient.TestClient(application) as client:
+        for item in invalid_items:
+            response = client.post('/api/learning-records', json=item)
+            assert response.status_code == 400
+            assert response.json()['error']
+        assert client.post('/api/learning-records', json=[VALID]).json()['error'] == '缺少必要字段'
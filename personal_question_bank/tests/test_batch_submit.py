@@ -0,0 +1,79 @@
+"""
+批量提交答案：逐条校验字段类型，学习记录ID与提交顺序一致
+"""
+from datetime import datetime
+
+from app import MAX_TIME_SPENT
+from models import db, AnswerEvent, LearningRecord, Question
+
+def theory_questions(app, count):
+    with app.app_context():
+        return [question.id for question in
+                Question.query.filter(Question.question_type != 'coding').order_by(Question.id).limit(count)]
+
+def item(user_id, question_id, **overrides):
+    record = {'user_id': user_id, 'question_id': question_id, 'user_answer': 'A', 'time_spent': 30,
+              'interaction_type': 'practice'}
+    record.update(overrides)
+    return record
+
+def test_invalid_item_types_are_rejected_per_item(app, client):
+    question_id = theory_questions(app, 1)[0]
+    response = client.post('/api/learning-records/batch', json={'records': [
+        item([1], question_id),
+        item(1, {'id': question_id}),
+        item(True, question_id),
+        item(1, question_id, time_spent=True),
+        item(1, question_id, time_spent=-1),
+        item(1, question_id, time_spent=10 ** 12),
+        item(1, question_id, user_answer=3),
+        item(1, question_id, interaction_type=None),
+        item(1, question_id, time_spent=60, completed_at='0001-01-01T00:00:00'),
+        item(1, question_id),
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['accepted'] == 1
+    errors = [result.get('error') for result in body['results']]
+    assert errors[:3] == ['user_id 和 question_id 必须是整数'] * 3
+    assert errors[3:6] == [f'time_spent 必须是 0 到 {MAX_TIME_SPENT} 之间的整数'] * 3
+    assert errors[6:8] == ['user_answer 和 interaction_type 必须是字符串'] * 2
+    assert errors[8] == 'completed_at 超出范围'
+    assert errors[9] is None
+
+def test_single_submit_validates_types(client):
+    response = client.post('/api/learning-records', json=item(1, 1, user_answer=3))
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'user_answer 和 interaction_type 必须是字符串'
+
+def submit_in_order(app, client):
+    question_ids = theory_questions(app, 6)
+    records = [item(user_id, question_id, user_answer=f'答案{index}')
+               for index, (user_id, question_id) in enumerate(zip([1, 2, 1, 3, 2, 1], question_ids))]
+    records.insert(2, item(1, 10 ** 9))  # 题目不存在，不影响其余记录的ID对应关系
+    # 同一用户、同一题目的两条记录按答案区分
+    records.append(item(1, question_ids[0], user_answer='重复作答'))
+
+    started = datetime.utcnow()
+    body = client.post('/api/learning-records/batch', json={'records': records}).get_json()
+    assert body['accepted'] == 7
+
+    with app.app_context():
+        for result, record in zip(body['results'], records):
+            if 'error' in result:
+                continue
+            learning_record = db.session.get(LearningRecord, result['learning_record_id'])
+            assert (learning_record.user_id, learning_record.question_id, learning_record.user_answer) == \
+                (record['user_id'], record['question_id'], record['user_answer'])
+            event = AnswerEvent.query.filter_by(learning_record_id=learning_record.id).one()
+            assert event.created_at >= started
+
+def test_record_ids_follow_submission_order(app, client):
+    submit_in_order(app, client)
+
+def test_record_ids_without_returning(app, client, monkeypatch):
+    """不支持 RETURNING 的数据库（MySQL）逐行插入并读取各自的主键"""
+    with app.app_context():
+        monkeypatch.setattr(db.engine.dialect, 'insert_returning', False)
+    submit_in_order(app, client)
@@ -0,0 +1,122 @@
+"""
+答题事件处理：ID空洞之后的事件等待较小ID提交，出错的消费者不影响其他消费者，
+无法处理的事件重试后写入死信表；异步处理时提交响应仍返回更新后的统计
+"""
+from datetime import datetime, timedelta
+
+from event_log import AnswerEventConsumer, AnswerEventProcessor, get_consumer_offset
+from models import (db, AnswerEvent, AnswerEventDeadLetter, EventConsumerOffset, LearningRecord, Question,
+                    UserKnowledgeStats)
+
+class RecordingConsumer(AnswerEventConsumer):
+    """记录处理过的事件ID，遇到 poison 中的事件时抛出异常"""
+
+    def __init__(self, name, poison=()):
+        self.name = name
+        self.poison = set(poison)
+        self.handled = []
+
+    def handle(self, events):
+        for event in events:
+            if event.id in self.poison:
+                raise ValueError(f'无法处理事件 {event.id}')
+        self.handled.extend(event.id for event in events)
+
+def start_at_latest(*consumers):
+    """新消费者从当前最新事件之后开始处理"""
+    latest_id = db.session.query(db.func.max(AnswerEvent.id)).scalar() or 0
+    for consumer in consumers:
+        db.session.add(EventConsumerOffset(consumer=consumer.name, last_event_id=latest_id))
+    db.session.commit()
+    return latest_id
+
+def add_event(event_id=None, created_at=None) -> int:
+    record = LearningRecord.query.first()
+    event = AnswerEvent(id=event_id, learning_record_id=record.id, user_id=record.user_id,
+                        question_id=record.question_id, knowledge_point_id=1, is_correct=True,
+                        time_spent=10, completed_at=datetime.utcnow(), created_at=created_at)
+    db.session.add(event)
+    db.session.commit()
+    return event.id
+
+def test_cursor_waits_for_id_gap(app):
+    with app.app_context():
+        consumer = RecordingConsumer('test_gap')
+        latest_id = start_at_latest(consumer)
+        processor = AnswerEventProcessor([consumer], gap_timeout=60)
+
+        # latest_id + 1 尚未提交（或已回滚），之后的事件刚刚写入：不能越过空洞
+        after_gap = add_event(latest_id + 2)
+        assert processor.process_pending() == 0
+        assert get_consumer_offset(consumer.name) == latest_id
+
+        # 较小ID的事件提交后按顺序处理
+        before_gap = add_event(latest_id + 1)
+        assert processor.process_pending() == 2
+        assert consumer.handled == [before_gap, after_gap]
+
+        # 空洞之后的事件写入已超过 gap_timeout：空洞对应的事务只可能已回滚
+        stale = add_event(after_gap + 2, created_at=datetime.utcnow() - timedelta(seconds=120))
+        assert processor.process_pending() == 1
+        assert consumer.handled[-1] == stale
+        assert get_consumer_offset(consumer.name) == stale
+
+def test_poison_event_is_dead_lettered(app, caplog):
+    with app.app_context():
+        healthy = RecordingConsumer('test_healthy')
+        start_at_latest(healthy)
+        event_ids = [add_event() for _ in range(3)]
+        failing = RecordingConsumer('test_poison', poison=[event_ids[1]])
+        db.session.add(EventConsumerOffset(consumer=failing.name, last_event_id=event_ids[0] - 1))
+        db.session.commit()
+        processor = AnswerEventProcessor([failing, healthy], max_attempts=2)
+
+        # 整批失败只记录日志，其他消费者照常处理
+        processor.process_pending()
+        assert healthy.handled == event_ids
+        assert failing.handled == []
+        assert '答题事件消费者 test_poison 处理失败' in caplog.text
+
+        # 逐条重试：第一条成功，出错的事件第一次重试失败
+        processor.process_pending()
+        assert failing.handled == event_ids[:1]
+        assert get_consumer_offset(failing.name) == event_ids[0]
+
+        # 达到 max_attempts 后写入死信表并跳过，继续处理后面的事件
+        processor.process_pending()
+        assert failing.handled == [event_ids[0], event_ids[2]]
+        assert get_consumer_offset(failing.name) == event_ids[2]
+        dead_letter = AnswerEventDeadLetter.query.filter_by(consumer=failing.name).one()
+        assert dead_letter.event_id == event_ids[1]
+        assert 'ValueError' in dead_letter.error
+        assert processor.get_lag()[failing.name]['dead_letters'] == 1
+
+def test_async_submit_keeps_updated_stats(app, client, monkeypatch):
+    """异步处理答题事件时，提交响应仍包含计入本次答题后的 updated_stats"""
+    from app import event_processor
+
+    monkeypatch.setitem(app.config, 'ANSWER_EVENTS_ASYNC', True)
+    monkeypatch.setattr(event_processor, 'ensure_started', lambda: None)
+    with app.app_context():
+        event_processor.process_pending()
+        question = Question.query.filter(Question.question_type != 'coding').first()
+        before = UserKnowledgeStats.query.filter_by(
+            user_id=1, knowledge_point_id=question.knowledge_point_id).first()
+        attempts_before = before.total_attempts if before else 0
+
+    body = client.post('/api/learning-records', json={
+        'user_id': 1, 'question_id': question.id, 'user_answer': question.correct_answer or 'A',
+        'time_spent': 40, 'interaction_type': 'practice'}).get_json()
+    assert body['stats_pending'] is True
+    projected = body['updated_stats']
+    assert projected['total_attempts'] == attempts_before + 1
+    assert projected['knowledge_point']['id'] == question.knowledge_point_id
+
+    # 后台消费者处理后的统计与响应中的一致
+    with app.app_context():
+        event_processor.process_pending()
+        stats = UserKnowledgeStats.query.filter_by(
+            user_id=1, knowledge_point_id=question.knowledge_point_id).one().to_dict()
+    for key in ('id', 'total_attempts', 'correct_attempts', 'total_time_spent', 'average_time', 'accuracy_rate'):
+        assert stats[key] == projected[key]
+    assert abs(stats['mastery_level'] - projected['mastery_level']) < 1e-9
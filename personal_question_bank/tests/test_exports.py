@@ -0,0 +1,57 @@
+"""
+学习记录导出：热表和归档表各自按ID顺序读取后归并，不对 UNION ALL 整体排序
+"""
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func
+
+from database import _read_replica
+from models import db, ArchivedLearningRecord, LearningRecord
+from query_budget import QueryCounter
+
+def test_export_merges_archive_and_live_in_id_order(app, client):
+    with app.app_context():
+        template = LearningRecord.query.order_by(LearningRecord.id).first()
+        max_id = db.session.query(func.max(LearningRecord.id)).scalar()
+        # 热表保留的旧记录可能晚于归档：归档记录的ID大于所有热表ID，先导出归档表会乱序
+        archived_ids = [max_id + 100]
+        for record_id in archived_ids:
+            db.session.add(ArchivedLearningRecord(
+                id=record_id, user_id=template.user_id, question_id=template.question_id, is_correct=True,
+                time_spent=10, started_at=datetime.utcnow() - timedelta(days=400),
+                completed_at=datetime.utcnow() - timedelta(days=400)))
+        db.session.commit()
+        expected = db.session.query(func.count(LearningRecord.id)).scalar() + len(archived_ids)
+
+    try:
+        with QueryCounter() as counter:
+            response = client.get('/api/export/learning-records?format=ndjson')
+            ids = [json.loads(line)['id'] for line in response.get_data(as_text=True).splitlines()]
+
+        assert len(ids) == expected
+        assert ids == sorted(ids)
+        assert set(archived_ids) <= set(ids)
+        assert not any('UNION' in statement for statement in counter.statements)
+    finally:
+        with app.app_context():
+            ArchivedLearningRecord.query.filter(ArchivedLearningRecord.id.in_(archived_ids)).delete()
+            db.session.commit()
+
+def test_streamed_export_reads_from_replica_context(app, client):
+    """导出的查询在视图返回后随响应体执行，迭代期间仍处于只读副本上下文"""
+    flags = []
+
+    def record_flag(conn, cursor, statement, parameters, context, executemany):
+        flags.append(_read_replica.get())
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record_flag)
+    try:
+        response = client.get('/api/export/learning-records?format=csv')
+        assert response.status_code == 200 and response.get_data()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_flag)
+    assert flags and all(flags)
+    assert not _read_replica.get()
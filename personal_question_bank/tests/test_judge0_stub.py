@@ -0,0 +1,36 @@
+"""
+Judge0 桩服务：已取走或过期的提交不会一直保留在内存中
+"""
+import requests
+
+from judge0_stub import Judge0Stub
+
+def test_finished_submission_is_removed_after_fetch():
+    stub = Judge0Stub(port=0, latency=0.0, seed=1)
+    base_url = stub.start()
+    try:
+        for _ in range(20):
+            response = requests.post(f'{base_url}/submissions', params={'wait': 'true'},
+                                     json={'source_code': 'print(1)', 'language_id': 71, 'stdin': '1'})
+            assert response.json()['stdout'] == '1'
+        assert len(stub.submissions) == 0
+
+        token = requests.post(f'{base_url}/submissions', json={'stdin': '2'}).json()['token']
+        assert requests.get(f'{base_url}/submissions/{token}').json()['stdout'] == '2'
+        assert requests.get(f'{base_url}/submissions/{token}').status_code == 404
+    finally:
+        stub.stop()
+
+def test_unfetched_submissions_expire():
+    stub = Judge0Stub(port=0, latency=10.0, seed=1, result_ttl=0.0)
+    try:
+        tokens = [stub.create_submission({'stdin': str(i)}, False) for i in range(5)]
+        assert list(stub.submissions) == tokens[-1:]
+
+        # 未完成的结果查询后保留
+        stub.result_ttl = 300.0
+        token = stub.create_submission({'stdin': 'x'}, False)
+        assert stub.get_submission(token, False, consume=True)['status']['description'] == 'Processing'
+        assert token in stub.submissions
+    finally:
+        stub.server.server_close()
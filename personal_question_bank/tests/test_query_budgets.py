@@ -0,0 +1,15 @@
+"""
+路由查询预算：每个路由都有预算，清空缓存后的冷请求和命中缓存的请求都不超出预算
+"""
+from query_budget import ROUTE_BUDGETS, app_routes, check_routes
+
+def test_every_route_has_budget(app):
+    assert [route for route in app_routes(app) if route not in ROUTE_BUDGETS] == []
+
+def test_route_query_budgets(app):
+    from app import event_processor
+
+    # 其他测试直接写入的答题事件先处理掉，否则会计入第一次提交的查询数
+    with app.app_context():
+        event_processor.process_pending()
+    assert check_routes(app) == []
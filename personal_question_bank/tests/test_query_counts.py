@@ -0,0 +1,50 @@
+"""
+热点接口的 SQL 条数：固定条数，不随用户的学习记录和知识点统计数量增长
+"""
+import pytest
+
+from models import db, LearningRecord
+from query_budget import QueryCounter, query_budget
+
+# (路径模板, 最多 SQL 条数)；{user_id} 替换为不同数据量的用户
+HOT_ENDPOINTS = [
+    # 用户、学习记录条件聚合（热表+归档表一条 UNION ALL）、知识点统计+知识点、最近记录+题目+知识点
+    ('/api/users/{user_id}/stats', 4),
+    ('/api/users/{user_id}', 1),
+    ('/api/users/{user_id}/activity?days=30', 2),
+    ('/api/questions?per_page=20', 2),
+]
+
+def users_by_record_count(app):
+    """学习记录最少和最多的两个用户"""
+    with app.app_context():
+        counts = db.session.query(LearningRecord.user_id, db.func.count(LearningRecord.id))\
+                           .group_by(LearningRecord.user_id)\
+                           .order_by(db.func.count(LearningRecord.id)).all()
+    return [counts[0][0], counts[-1][0]]
+
+@pytest.mark.parametrize('path, max_queries', HOT_ENDPOINTS)
+def test_hot_endpoint_query_count(app, client, path, max_queries):
+    counts = []
+    for user_id in users_by_record_count(app):
+        url = path.format(user_id=user_id)
+        client.get(url).close()  # 预热计数缓存等
+        with query_budget(max_queries=max_queries, max_repeats=1, label=url) as counter:
+            response = client.get(url)
+            assert response.status_code == 200
+        counts.append(counter.count)
+
+    # 记录多的用户与记录少的用户执行相同条数的 SQL
+    assert counts[0] == counts[1]
+
+def test_user_stats_loads_relations_eagerly(app, client):
+    """序列化知识点统计和最近记录时不再懒加载知识点或题目"""
+    user_id = users_by_record_count(app)[-1]
+    with QueryCounter() as counter:
+        body = client.get(f'/api/users/{user_id}/stats').get_json()
+
+    assert body['knowledge_stats'] and body['recent_records']
+    assert all(stat['knowledge_point'] is not None for stat in body['knowledge_stats'])
+    assert not any('FROM questions' in statement and 'WHERE questions.id =' in statement
+                   for statement in counter.statements)
+    assert not any('WHERE knowledge_points.id =' in statement for statement in counter.statements)
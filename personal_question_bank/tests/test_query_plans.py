@@ -0,0 +1,23 @@
+"""
+热点查询的执行计划：每个查询都命中预期的索引，models.py 声明的每个组合索引都有对应的热点查询
+"""
+import pytest
+
+from benchmarks.explain_hot_queries import explain, hot_queries
+import models
+
+HOT_QUERIES = hot_queries(models)
+
+@pytest.mark.parametrize('description, stmt, expected_indexes', HOT_QUERIES,
+                         ids=[description for description, _, _ in HOT_QUERIES])
+def test_hot_query_uses_index(app, description, stmt, expected_indexes):
+    with app.app_context():
+        with models.db.engine.connect() as connection:
+            plan = explain(connection, stmt)
+    assert any(index in plan for index in expected_indexes), plan
+
+def test_every_composite_index_is_checked():
+    checked = {index for _, _, expected_indexes in HOT_QUERIES for index in expected_indexes}
+    declared = {index.name for table in models.db.metadata.tables.values()
+                for index in table.indexes if len(index.columns) > 1}
+    assert declared - checked == set()
@@ -0,0 +1,116 @@
+"""
+熔断器与判题并发限制：半开状态的试探名额在调用未记录结果时必须归还
+"""
+import asyncio
+
+import pytest
+
+from external_platforms import CodeExecutionResult, ExternalPlatformManager
+from resilience import AdaptiveConcurrencyLimiter, CircuitBreaker
+
+class FakeJudge:
+    """按顺序返回预设结果的判题服务；result 为 None 时挂起（模拟慢速判题）"""
+
+    def __init__(self, result=None):
+        self.result = result
+        self.calls = 0
+
+    def submit_code(self, code, language):
+        self.calls += 1
+        return self.result
+
+    async def submit_code_async(self, code, language):
+        self.calls += 1
+        if self.result is None:
+            await asyncio.sleep(3600)
+        return self.result
+
+def half_open_manager(judge) -> ExternalPlatformManager:
+    """熔断器已打开且冷却结束（下一次调用为试探调用）的管理器"""
+    manager = ExternalPlatformManager()
+    manager.judge_zero = judge
+    manager.fallback_judge = None
+    manager.judge_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    manager.judge_breaker.record_failure()
+    return manager
+
+def saturate(manager):
+    """占满判题并发名额且不允许排队，下一次 acquire 立即被拒绝"""
+    manager.judge_limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1, max_queue_depth=0)
+    manager.judge_limiter.acquire()
+
+def ok_result():
+    return CodeExecutionResult(success=True, output='1')
+
+def test_probe_released_when_limiter_rejects():
+    manager = half_open_manager(FakeJudge(ok_result()))
+    saturate(manager)
+
+    result = manager.execute_code('print(1)', 'python')
+    assert result.platform_error
+    assert manager.judge_breaker.get_stats()['state'] == CircuitBreaker.HALF_OPEN
+
+    # 名额归还后下一次试探调用可以放行，成功后熔断器关闭
+    manager.judge_limiter.release(0.0)
+    result = manager.execute_code('print(1)', 'python')
+    assert result.success
+    assert manager.judge_zero.calls == 1
+    assert manager.judge_breaker.get_stats()['state'] == CircuitBreaker.CLOSED
+
+def test_probe_released_when_async_limiter_rejects():
+    manager = half_open_manager(FakeJudge(ok_result()))
+    saturate(manager)
+
+    result = asyncio.run(manager.execute_code_async('print(1)', 'python'))
+    assert result.platform_error
+
+    manager.judge_limiter.release(0.0)
+    result = asyncio.run(manager.execute_code_async('print(1)', 'python'))
+    assert result.success
+    assert manager.judge_breaker.get_stats()['state'] == CircuitBreaker.CLOSED
+
+def test_probe_released_when_async_probe_cancelled():
+    manager = half_open_manager(FakeJudge(None))
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(manager.execute_code_async('print(1)', 'python'))
+        await asyncio.sleep(0.01)
+        assert manager.judge_zero.calls == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+
+    # 取消不计为判题失败：并发名额已归还，熔断器仍为半开且可以再次试探
+    assert manager.judge_limiter.get_stats()['in_flight'] == 0
+    assert manager.judge_breaker.get_stats()['state'] == CircuitBreaker.HALF_OPEN
+    manager.judge_zero.result = ok_result()
+    result = asyncio.run(manager.execute_code_async('print(1)', 'python'))
+    assert result.success
+    assert manager.judge_breaker.get_stats()['state'] == CircuitBreaker.CLOSED
+
+def test_probe_released_when_cancelled_while_queued():
+    manager = half_open_manager(FakeJudge(ok_result()))
+    manager.judge_limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=1, queue_timeout=3600)
+    manager.judge_limiter.acquire()
+
+    async def cancel_queued():
+        task = asyncio.ensure_future(manager.execute_code_async('print(1)', 'python'))
+        await asyncio.sleep(0.01)
+        assert manager.judge_limiter.get_stats()['waiting'] == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_queued())
+
+    assert manager.judge_limiter.get_stats()['waiting'] == 0
+    assert manager.judge_breaker.allow_request()
+
+def test_failed_probe_reopens_breaker():
+    manager = half_open_manager(FakeJudge(CodeExecutionResult(success=False, output='', platform_error=True)))
+
+    result = manager.execute_code('print(1)', 'python')
+    assert result.platform_error
+    assert manager.judge_breaker.get_stats()['state'] == CircuitBreaker.OPEN
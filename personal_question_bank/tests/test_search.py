@@ -0,0 +1,52 @@
+"""
+题目检索的高亮片段：题目内容做 HTML 转义，只保留 <mark> 高亮标签
+"""
+from models import db, Question
+from search import make_snippet, search_questions
+
+XSS_CONTENT = '防注入检索 <script>alert(1)</script> 与 <img src=x onerror=alert(2)> 混合内容'
+
+def add_question(app, content: str) -> int:
+    with app.app_context():
+        question = Question(title='检索转义测试', content=content, question_type='theory',
+                            difficulty='easy', knowledge_point_id=1)
+        db.session.add(question)
+        db.session.commit()
+        return question.id
+
+def search_snippet(client, query: str, question_id: int) -> str:
+    body = client.get('/api/questions/search', query_string={'q': query, 'limit': 50}).get_json()
+    return next(result['snippet'] for result in body['results'] if result['id'] == question_id)
+
+def test_fts_snippet_escapes_content(app, client):
+    question_id = add_question(app, XSS_CONTENT)
+
+    snippet = search_snippet(client, '防注入检索', question_id)
+    assert '<script>' not in snippet and '<img' not in snippet
+    assert '&lt;script&gt;' in snippet
+    assert '<mark>防注入检索</mark>' in snippet
+
+def test_substring_snippet_escapes_content(app, client):
+    question_id = add_question(app, '<b>粗体</b> 冒泡 <script>x</script>')
+
+    # 不足三字的检索词走子串匹配，片段由 make_snippet 生成
+    snippet = search_snippet(client, '冒泡', question_id)
+    assert snippet.startswith('&lt;b&gt;粗体&lt;/b&gt; <mark>冒泡</mark> &lt;script&gt;x&lt;/script&gt;')
+
+def test_make_snippet_escapes_highlighted_term():
+    assert make_snippet('a <b> c', ['<b>']) == 'a <mark>&lt;b&gt;</mark> c'
+    assert make_snippet('<i>无匹配</i>', ['xyz']) == '&lt;i&gt;无匹配&lt;/i&gt;'
+
+def test_search_without_index_falls_back_to_substring_match(app, monkeypatch):
+    """没有检索索引的数据库（如 MySQL）不报错，按子串匹配并生成片段"""
+    question_id = add_question(app, '子串回退 100%_匹配 <i>斜体</i>')
+    with app.app_context():
+        monkeypatch.setattr(db.session.get_bind().dialect, 'name', 'mysql')
+        hits = search_questions('100%_匹配', question_type='theory')
+        hits_by_id = {hit['id']: hit for hit in hits}
+        assert question_id in hits_by_id
+        assert hits_by_id[question_id]['score'] is None
+        assert '<mark>100%_匹配</mark>' in hits_by_id[question_id]['snippet']
+        assert '&lt;i&gt;' in hits_by_id[question_id]['snippet']
+        # % 和 _ 按字面匹配
+        assert search_questions('100%x') == []
@@ -0,0 +1,38 @@
+"""
+JSON 列解析缓存：共享的解析结果不能被调用方改坏
+"""
+import copy
+import json
+
+import pytest
+
+from serializers import parse_json_column
+
+RAW = '[{"input": [1, 2], "expected_output": "3"}, {"input": [2, 2], "expected_output": "4"}]'
+
+def test_cached_value_cannot_be_mutated():
+    value = parse_json_column(RAW)
+    with pytest.raises(TypeError):
+        value.append({})
+    with pytest.raises(TypeError):
+        value[0]['input'] = 'changed'
+    with pytest.raises(TypeError):
+        value[0]['input'].append(3)
+    with pytest.raises(TypeError):
+        value[0].update(extra=1)
+
+    assert parse_json_column(RAW) == json.loads(RAW)
+
+def test_deepcopy_returns_plain_mutable_objects():
+    value = copy.deepcopy(parse_json_column(RAW))
+    assert type(value) is list and type(value[0]) is dict and type(value[0]['input']) is list
+    value[0]['input'].append(3)
+    assert parse_json_column(RAW)[0]['input'] == [1, 2]
+
+def test_serializes_like_plain_json(app):
+    assert json.loads(json.dumps(parse_json_column(RAW))) == json.loads(RAW)
+    assert json.loads(app.json.dumps(parse_json_column(RAW))) == json.loads(RAW)
+
+def test_parse_json_column_empty():
+    assert parse_json_column(None) is None
+    assert parse_json_column('') is None
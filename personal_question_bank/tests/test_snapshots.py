@@ -0,0 +1,46 @@
+"""
+学习记录快照：水位只推进到连续的ID为止，不按客户端提供的 completed_at 跳过未提交的记录
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from models import db, AnswerEvent, LearningRecord
+from snapshots import LearningSnapshot
+
+def add_record(record_id: int, written_at: datetime):
+    """写入一条完成时间很早（如离线批量提交）的学习记录及其答题事件"""
+    completed_at = datetime.utcnow() - timedelta(days=30)
+    template = LearningRecord.query.order_by(LearningRecord.id).first()
+    record = LearningRecord(id=record_id, user_id=template.user_id, question_id=template.question_id,
+                            is_correct=True, time_spent=10, started_at=completed_at, completed_at=completed_at)
+    db.session.add(record)
+    db.session.add(AnswerEvent(learning_record=record, user_id=record.user_id, question_id=record.question_id,
+                               knowledge_point_id=1, is_correct=True, time_spent=10,
+                               completed_at=completed_at, created_at=written_at))
+    db.session.commit()
+
+def test_watermark_stops_at_id_gap(app, tmp_path):
+    snapshot = LearningSnapshot(str(tmp_path), 'arrow')
+    with app.app_context():
+        snapshot.export(gap_timeout=0)
+        last_id = db.session.query(func.max(LearningRecord.id)).scalar()
+        assert snapshot.load_manifest()['last_record_id'] == last_id
+
+        # last_id + 1 尚未提交，之后的记录刚刚写入：水位不能越过空洞
+        add_record(last_id + 2, datetime.utcnow())
+        assert snapshot.export() == 0
+        assert snapshot.load_manifest()['last_record_id'] == last_id
+
+        # 较小ID提交后两条一起导出
+        add_record(last_id + 1, datetime.utcnow())
+        assert snapshot.export() == 2
+        assert snapshot.load_manifest()['last_record_id'] == last_id + 2
+
+        # 空洞之后的记录写入已超过 gap_timeout：空洞对应的事务只可能已回滚
+        add_record(last_id + 4, datetime.utcnow() - timedelta(seconds=120))
+        assert snapshot.export() == 1
+        assert snapshot.load_manifest()['last_record_id'] == last_id + 4
+
+    ids = snapshot.to_numpy(['id'])['id']
+    assert list(ids[-3:]) == [last_id + 1, last_id + 2, last_id + 4]
@@ -0,0 +1,113 @@
+"""
+知识点统计的原子 upsert：并发提交不丢失更新，每个 (用户, 知识点) 只有一行
+"""
+import threading
+
+import pytest
+from sqlalchemy.dialects import mysql
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+import models
+from database import SUPPORTED_DIALECTS, check_dialect
+from models import db, DailyUserActivity, KnowledgePoint, UPSERT_INSERTS, UserKnowledgeStats, on_conflict_update
+
+THREADS = 8
+ATTEMPTS_PER_THREAD = 25
+
+def new_knowledge_point(name: str) -> int:
+    knowledge_point = KnowledgePoint(name=name, category='测试', difficulty_level=1)
+    db.session.add(knowledge_point)
+    db.session.commit()
+    return knowledge_point.id
+
+def test_concurrent_apply_attempts(app):
+    with app.app_context():
+        knowledge_point_id = new_knowledge_point('并发upsert测试')
+
+    barrier = threading.Barrier(THREADS)
+    errors = []
+
+    def submit(index):
+        try:
+            with app.app_context():
+                barrier.wait()
+                for attempt in range(ATTEMPTS_PER_THREAD):
+                    UserKnowledgeStats.apply_attempts(1, knowledge_point_id, 1, attempt % 2, 10)
+                    db.session.commit()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    with app.app_context():
+        rows = UserKnowledgeStats.query.filter_by(user_id=1, knowledge_point_id=knowledge_point_id).all()
+        assert len(rows) == 1
+        stats = rows[0]
+        total = THREADS * ATTEMPTS_PER_THREAD
+        assert stats.total_attempts == total
+        assert stats.correct_attempts == THREADS * (ATTEMPTS_PER_THREAD // 2)
+        assert stats.total_time_spent == total * 10
+        assert stats.average_time == 10
+        assert abs(stats.mastery_level - models.calculate_mastery_level(stats.correct_attempts, total)) < 1e-9
+
+def test_apply_attempt_deltas_without_returning(app, monkeypatch):
+    """不支持 RETURNING 的数据库（MySQL）在同一事务内读回更新后的行"""
+    monkeypatch.setattr(models, 'supports_upsert_returning', lambda: False)
+    with app.app_context():
+        first = new_knowledge_point('无RETURNING测试1')
+        second = new_knowledge_point('无RETURNING测试2')
+        UserKnowledgeStats.apply_attempts(2, first, 1, 1, 20)
+
+        rows = UserKnowledgeStats.apply_attempt_deltas(2, {
+            second: {'attempts': 2, 'correct': 0, 'time_spent': 30},
+            first: {'attempts': 3, 'correct': 3, 'time_spent': 40},
+        })
+        db.session.commit()
+
+        assert [row.knowledge_point_id for row in rows] == [second, first]
+        assert (rows[0].total_attempts, rows[0].correct_attempts, rows[0].average_time) == (2, 0, 15)
+        assert (rows[1].total_attempts, rows[1].correct_attempts, rows[1].average_time) == (4, 4, 15)
+
+@pytest.mark.filterwarnings('ignore:Datatype FLOAT does not support CAST')
+def test_mysql_upsert_assigns_derived_columns_first(app, monkeypatch):
+    """MySQL 按顺序赋值：平均耗时和掌握程度必须在计数列更新之前计算"""
+    statements = []
+
+    def capture(stmt, *args, **kwargs):
+        statements.append(str(stmt.compile(dialect=mysql.dialect())))
+        raise RuntimeError('只编译不执行')
+
+    monkeypatch.setattr(models, 'upsert_insert', mysql_insert)
+    monkeypatch.setattr(models, 'supports_upsert_returning', lambda: False)
+    with app.app_context():
+        monkeypatch.setattr(db.session, 'execute', capture)
+        with pytest.raises(RuntimeError):
+            UserKnowledgeStats.apply_attempts(1, 1, 1, 1, 10)
+
+    sql = statements[0]
+    assert 'ON DUPLICATE KEY UPDATE' in sql
+    assignments = sql.split('ON DUPLICATE KEY UPDATE', 1)[1]
+    assert 'VALUES(total_attempts)' in assignments
+    for derived in ('average_time =', 'mastery_level =', 'last_practice_time ='):
+        assert assignments.index(derived) < assignments.index('total_attempts =')
+
+def test_mysql_on_conflict_update():
+    stmt = mysql_insert(DailyUserActivity).values(
+        user_id=1, activity_date='2024-01-01', knowledge_point_id=1, attempts=1, correct_attempts=1, time_spent=5)
+    stmt = on_conflict_update(stmt, [DailyUserActivity.user_id], {
+        'attempts': DailyUserActivity.attempts + models.excluded_values(stmt).attempts
+    })
+    sql = str(stmt.compile(dialect=mysql.dialect()))
+    assert 'ON DUPLICATE KEY UPDATE attempts = (daily_user_activity.attempts + VALUES(attempts))' in sql
+
+def test_upsert_dialects_checked_at_startup():
+    assert set(UPSERT_INSERTS) == set(SUPPORTED_DIALECTS)
+    for dialect in SUPPORTED_DIALECTS:
+        check_dialect(dialect)
+    with pytest.raises(ValueError, match='不支持的数据库: mssql'):
+        check_dialect('mssql')
@@ -0,0 +1,92 @@
+"""
+生产环境 WSGI 入口
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+gunicorn.conf.py 开启 preload_app：主进程导入应用（NumPy / pandas / scikit-learn 等）、
+初始化数据库并预热缓存后再 fork 工作进程，只读内存页由各工作进程写时复制共享。
+预热完成后调用 gc.freeze()，避免垃圾回收遍历继承的对象时改写共享页。
+
+预热内容：
+- 题目目录缓存：知识点快照和按ID预取的题目（最多 CATALOG_CACHE_MAX_QUESTIONS 道）
+- 代表性只读请求：SQLAlchemy 语句编译缓存、Jinja 模板、JSON 编码器和推荐引擎的导入路径
+"""
+import gc
+import os
+import time
+
+_started = time.perf_counter()
+
+# 未指定配置环境时使用生产配置（需在导入应用、加载配置之前设置）
+os.environ.setdefault('FLASK_ENV', 'production')
+
+from sqlalchemy import select
+
+from app import app, catalog_cache, init_for_deployment
+from models import db, Question, User
+
+_imported = time.perf_counter()
+
+# 预取题目时每次查询的ID数
+PREFETCH_BATCH_SIZE = 500
+
+def memory_usage() -> dict:
+    """当前进程的内存占用（MB）：rss，以及 Linux 上的 pss（按共享进程数均摊）和与其他进程共享的部分"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty'):
+                    usage[name.lower()] = int(value.split()[0]) / 1024
+        usage['shared'] = usage.pop('shared_clean', 0) + usage.pop('shared_dirty', 0)
+    except OSError:
+        import resource
+        # 非 Linux 系统只能取到峰值 RSS（macOS 单位为字节，Linux 为KB）
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        usage['rss'] = maxrss / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024)
+    return {name: round(value, 1) for name, value in usage.items()}
+
+def warm_up() -> dict:
+    """预热目录缓存和常用只读接口，返回预热的题目数和请求结果"""
+    with app.app_context():
+        catalog_cache.snapshot()
+        question_ids = db.session.execute(
+            select(Question.id).order_by(Question.id).limit(catalog_cache.max_questions)
+        ).scalars().all()
+        for offset in range(0, len(question_ids), PREFETCH_BATCH_SIZE):
+            catalog_cache.get_questions(question_ids[offset:offset + PREFETCH_BATCH_SIZE])
+        user_id = db.session.execute(select(User.id).order_by(User.id).limit(1)).scalar()
+        db.session.remove()
+
+    paths = ['/', '/api/knowledge-points', '/api/questions?per_page=20',
+             '/api/questions?per_page=20&fields=summary']
+    if user_id is not None:
+        paths += [f'/api/users/{user_id}/stats', f'/api/recommendations/{user_id}']
+
+    client = app.test_client()
+    requests = {}
+    for path in paths:
+        response = client.get(path)
+        response.close()
+        requests[path] = response.status_code
+    return {'questions': len(question_ids), 'requests': requests}
+
+def preload():
+    """初始化数据库、预热缓存并冻结当前对象（在 fork 工作进程之前调用一次）"""
+    init_for_deployment()
+    warmed_at = time.perf_counter()
+    report = warm_up()
+    gc.freeze()
+
+    failed = {path: status for path, status in report['requests'].items() if status >= 400}
+    print(f"应用预加载完成: 导入 {_imported - _started:.2f}s，初始化 {warmed_at - _imported:.2f}s，"
+          f"预热 {time.perf_counter() - warmed_at:.2f}s（题目 {report['questions']} 道），"
+          f"内存 {memory_usage()}")
+    if failed:
+        print(f"预热请求失败: {failed}")
+
+# 由 gunicorn 主进程（preload_app）或各工作进程在导入时执行
+preload()
+
+application = app